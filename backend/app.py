@@ -8,6 +8,9 @@ from flask_migrate import Migrate
 from extensions import db, bcrypt, login_manager, jwt, mail
 from modules.routes import register_routes
 from modules.logging_util import setup_logger, cleanup_old_logs
+from modules.services.analysis_client import init_analysis_client_registry
+from modules.services.background_service.extraction_jobs import validate_job_backend
+from modules.azure_rate_limiter import validate_rate_limit_backend
 from dotenv import load_dotenv
 
 # Load environment variables from .env
@@ -52,6 +55,14 @@ def create_app():
     # Initialize Flask-Migrate
     migrate = Migrate(app, db)
 
+    # Shared Azure Document Intelligence client (pooled connections, retry policy)
+    app.config['ANALYSIS_CLIENT_REGISTRY'] = init_analysis_client_registry(app.config['AZURE_ENDPOINT'], app.config['AZURE_KEY'])
+
+    # Celery workers report progress through Redis; refuse to start without it
+    validate_job_backend()
+    # A shared Azure rate limit bucket needs its Redis URL; fail here, not on the first analysis
+    validate_rate_limit_backend()
+
     # Register routes
     register_routes(app)
 
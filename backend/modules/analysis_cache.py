@@ -0,0 +1,152 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from azure.ai.formrecognizer import AnalyzeResult
+from modules.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() in ['true', '1', 'yes']
+ANALYSIS_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", os.path.join("uploads", ".analysis_cache"))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", 512 * 1024 * 1024))  # 512 MB
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", 24 * 60 * 60))  # 1 day
+
+CACHE_FILE_SUFFIX = ".json.gz"
+
+
+class AnalysisResultCache:
+    """
+    Content-addressed, on-disk cache of Azure `AnalyzeResult` objects.
+
+    Entries are keyed by a hash of the exact bytes sent to Azure plus the model id,
+    stored as gzipped JSON, expire a TTL after they were written (the creation time is
+    stored in the entry, so hits do not extend it) and are evicted least-recently-used
+    first (by file atime, set on every hit) once the cache exceeds its size budget.
+    The mtime is left at the write time and only used to drop expired entries in `evict`.
+    """
+
+    def __init__(self, cache_dir, max_bytes, ttl_seconds):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(document_bytes, model_id):
+        """
+        Builds the cache key for a document payload analyzed with a given model.
+        """
+        digest = hashlib.sha256()
+        digest.update(model_id.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(document_bytes)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}{CACHE_FILE_SUFFIX}")
+
+    def get(self, key):
+        """
+        Returns the cached AnalyzeResult for `key`, or None on a miss or expired entry.
+        """
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as cache_file:
+                entry = json.load(cache_file)
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                logger.info(f"Analysis cache entry {key[:12]} expired, removing it.")
+                self._remove(path)
+                return None
+            result = AnalyzeResult.from_dict(entry["result"])
+            os.utime(path, (time.time(), stat.st_mtime))  # Mark as recently used, keep the write time
+            logger.info(f"Analysis cache hit for {key[:12]}")
+            return result
+        except Exception as e:
+            logger.warning(f"Discarding unreadable analysis cache entry {key[:12]}: {e}")
+            self._remove(path)
+            return None
+
+    def put(self, key, result):
+        """
+        Stores an AnalyzeResult under `key` and enforces the size budget.
+        """
+        temp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(delete=False, dir=self.cache_dir, suffix=".tmp") as temp_file:
+                temp_path = temp_file.name
+            with gzip.open(temp_path, "wt", encoding="utf-8") as cache_file:
+                json.dump({"created_at": time.time(), "result": result.to_dict()}, cache_file)
+            os.replace(temp_path, self._path(key))
+            logger.info(f"Stored analysis result in cache as {key[:12]}")
+        except Exception as e:
+            logger.warning(f"Failed to store analysis result in cache: {e}")
+            if temp_path:
+                self._remove(temp_path)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """
+        Removes expired entries (by write time), then least-recently-used entries (by last hit)
+        until the cache fits in `max_bytes`.
+        """
+        with self.lock:
+            entries = []
+            now = time.time()
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(CACHE_FILE_SUFFIX):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.ttl_seconds:
+                    self._remove(path)
+                else:
+                    entries.append((stat.st_atime, stat.st_size, path))
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_bytes:
+                    break
+                self._remove(path)
+                total_size -= size
+                logger.info(f"Evicted analysis cache entry {os.path.basename(path)}")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_analysis_cache = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache():
+    """
+    Returns the process-wide analysis cache, or None when caching is disabled.
+    """
+    global _analysis_cache
+    if not ANALYSIS_CACHE_ENABLED:
+        return None
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            _analysis_cache = AnalysisResultCache(
+                ANALYSIS_CACHE_DIR, ANALYSIS_CACHE_MAX_BYTES, ANALYSIS_CACHE_TTL_SECONDS
+            )
+    return _analysis_cache
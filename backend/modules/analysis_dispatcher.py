@@ -0,0 +1,32 @@
+import os
+from modules.logging_util import setup_logger
+from modules.extraction_scheduler import get_extraction_scheduler, CHUNK_LANE
+
+logger = setup_logger(__name__)
+
+# Max concurrent Azure analyses for a single document (one extract_with_azure call).
+# The process-wide cap is the chunk lane's size, EXTRACTION_CHUNK_WORKERS: every analysis runs on it.
+AZURE_MAX_INFLIGHT_PER_DOCUMENT = int(os.getenv("AZURE_MAX_INFLIGHT_PER_DOCUMENT", 4))
+
+
+def dispatch_in_order(items, worker, max_in_flight=AZURE_MAX_INFLIGHT_PER_DOCUMENT):
+    """
+    Runs `worker` over every item concurrently (bounded by `max_in_flight`) and
+    returns the results in the same order as `items`, regardless of completion order.
+    Items run on the process-wide scheduler's chunk lane, queued under the tenant of
+    the calling file task.
+
+    The worker is expected to handle its own errors; any exception it raises
+    is propagated when results are collected.
+
+    :param items: List of work items (e.g. page chunks).
+    :param worker: Callable taking one item and returning its result.
+    :param max_in_flight: Max items processed at the same time for this call.
+    :return: List of results aligned with `items`.
+    """
+    if not items:
+        return []
+
+    max_workers = max(1, min(max_in_flight, len(items)))
+    logger.info(f"Dispatching {len(items)} analyses with up to {max_workers} in flight")
+    return get_extraction_scheduler().map_in_order(CHUNK_LANE, worker, items, max_workers)
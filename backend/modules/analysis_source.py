@@ -0,0 +1,109 @@
+"""
+Server-side page selection: Azure reads the source document from blob storage and
+analyzes only the pages asked for, instead of receiving a PDF built for every chunk.
+
+With AZURE_ANALYZE_MODE=source_url, the extraction neither slices the file nor builds
+chunk PDFs: each chunk is an analyze-from-URL request on a read-only SAS URL of the
+source blob with `pages="3-5,9"`. Azure numbers the result pages as in the source,
+which is how results are mapped back to the sections of the page config.
+
+The source blob must be reachable by the Form Recognizer resource: the storage
+connection string needs an account key (or a SAS token) to sign the URL. When no
+URL can be built, `prepare_analysis_source` raises and the extraction sends chunk
+PDFs instead.
+
+With AZURE_SOURCE_LINEARIZE enabled, a linearized copy is uploaded once per document
+(keyed by its content hash) and analyzed instead of the original. Copies are stored
+under the 'analysis_source' folder of the day's upload folder, so they are reused
+for the rest of that day only and are removed with the rest of the day's folder by
+scripts/delete_old_folders.py (`AzureBlobService.delete_old_folders`, 2 days by default).
+"""
+import os
+import hashlib
+from modules.logging_util import setup_logger
+from modules.chunk_builder import linearize_pdf_bytes
+
+logger = setup_logger(__name__)
+
+# "chunks" sends a PDF built per chunk, "source_url" lets Azure select the pages of the stored source
+AZURE_ANALYZE_MODE = os.getenv("AZURE_ANALYZE_MODE", "chunks").strip().lower()
+SOURCE_URL_MODE = "source_url"
+# Upload a linearized copy of the source once and analyze it instead of the original
+AZURE_SOURCE_LINEARIZE = os.getenv("AZURE_SOURCE_LINEARIZE", "false").lower() in ['true', '1', 'yes']
+# Lifetime of the read-only URLs handed to Azure
+AZURE_SOURCE_SAS_MINUTES = int(os.getenv("AZURE_SOURCE_SAS_MINUTES", 60))
+SOURCE_FOLDER_TYPE = "analysis_source"
+
+
+def source_url_mode_enabled():
+    return AZURE_ANALYZE_MODE == SOURCE_URL_MODE
+
+
+def format_page_ranges(pages):
+    """
+    Formats page numbers for the analyze `pages` parameter: [3, 4, 5, 9] -> "3-5,9".
+    Pages are sorted and deduplicated, as Azure returns them in document order anyway.
+    """
+    ranges = []
+    for page_number in sorted(set(pages)):
+        if ranges and page_number == ranges[-1][1] + 1:
+            ranges[-1][1] = page_number
+        else:
+            ranges.append([page_number, page_number])
+    return ",".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+
+class AnalysisSource:
+    """
+    A document Azure reads by URL.
+
+    Attributes:
+        url (str): Read-only URL of the blob.
+        content_hash (str): SHA-256 of the analyzed bytes; with the pages and the model it keys cached results.
+    """
+
+    def __init__(self, url, content_hash):
+        self.url = url
+        self.content_hash = content_hash
+
+    def cache_payload(self, pages):
+        """
+        Returns the bytes standing in for the chunk PDF in the analysis cache key.
+        """
+        return f"{self.content_hash}:{format_page_ranges(pages)}".encode("utf-8")
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as source_file:
+        for block in iter(lambda: source_file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def prepare_analysis_source(azure_blob_service, user_id, filename, local_pdf_path):
+    """
+    Returns the AnalysisSource of a file: the uploaded original, or its linearized copy
+    (uploaded on first use only) when AZURE_SOURCE_LINEARIZE is enabled.
+
+    :param filename: File name (or blob path) as sent by the client.
+    :param local_pdf_path: Local copy of the same file, used for hashing and linearization.
+    """
+    if not AZURE_SOURCE_LINEARIZE:
+        url = azure_blob_service.get_read_url(user_id, filename, expiry_minutes=AZURE_SOURCE_SAS_MINUTES)
+        return AnalysisSource(url, file_sha256(local_pdf_path))
+
+    with open(local_pdf_path, "rb") as source_file:
+        linearized = linearize_pdf_bytes(source_file.read())
+    content_hash = hashlib.sha256(linearized).hexdigest()
+    blob_filename = f"{content_hash[:16]}_{filename.split('/')[-1]}"
+    # Signed before uploading: without a usable URL the copy would never be read
+    url = azure_blob_service.get_read_url(
+        user_id, blob_filename, folder_type=SOURCE_FOLDER_TYPE, expiry_minutes=AZURE_SOURCE_SAS_MINUTES
+    )
+    if azure_blob_service.blob_exists(user_id, blob_filename, SOURCE_FOLDER_TYPE):
+        logger.info(f"Reusing the linearized source {blob_filename} of {filename}")
+    else:
+        azure_blob_service.upload_bytes(user_id, linearized, blob_filename, folder_type=SOURCE_FOLDER_TYPE)
+        logger.info(f"Uploaded the linearized source {blob_filename} of {filename} ({len(linearized)} bytes)")
+    return AnalysisSource(url, content_hash)
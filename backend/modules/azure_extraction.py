@@ -1,23 +1,29 @@
 import os
 import pandas as pd
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.core.credentials import AzureKeyCredential
 from azure.storage.blob import BlobServiceClient
 import tempfile
 from .data_processing import process_field, flatten_nested_field
-from .logging_util import setup_logger
+from .logging_util import setup_logger, lazy, dump_table
 from modules.services.excel_service import save_sections_to_excel_and_csv
 from modules.services.azure_blob_service import AzureBlobService  # Import the AzureBlobService
 import csv
 import json
 from concurrent.futures import ThreadPoolExecutor
 from azure.core.exceptions import HttpResponseError
-from pdf2image import convert_from_path
-import re  # To detect Roman numerals
-import fitz  # PyMuPDF
-import subprocess
-from PyPDF2 import PdfWriter, PdfReader
-import io
+import time
+from functools import partial
+from .chunk_builder import build_chunk_document
+from .chunk_planner import plan_chunks, section_result_view
+from .page_planner import parse_page_range
+from .analysis_source import source_url_mode_enabled, prepare_analysis_source, format_page_ranges
+from .rasterization import raster_dpi_for_model
+from .analysis_dispatcher import dispatch_in_order
+from .azure_rate_limiter import get_azure_rate_limiter
+from .analysis_cache import get_analysis_cache
+from .timing_util import StageTimer
+from .table_cleanup import run_table_cleanup
+from .table_grid import build_table_grid
+from .services.analysis_client import get_document_analysis_client
 current_file = os.path.basename(__file__)
 logger = setup_logger(current_file.split(".")[0])
 
@@ -39,231 +45,13 @@ def extraction_model_mapping(model_name):
     }
     return model_mapping.get(clean_model_name, "prebuilt-read")  # Default to "prebuilt-read"
 
-def is_roman_numeral(value):
-    """Check if a string is a Roman numeral (e.g., I, II, III, IV)."""
-    roman_pattern = r"^(I|II|III|IV|V|VI|VII|VIII|IX|X|XI|XII|XIII|XIV|XV|XVI|XVII|XVIII|XIX|XX)$"
-    return bool(re.match(roman_pattern, str(value).strip()))
-
-def is_short_or_pattern(value):
-    """Check if value matches short patterns: Roman numerals, numbers, or symbols."""
-    if not isinstance(value, str) or not value.strip():
-        return False
-    
-    roman_numeral_pattern = re.compile(r'^(?=[MDCLXVI])M{0,4}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3})$')
-    numeric_pattern = re.compile(r'^\d+(\.\d+)?$')  # Numbers
-    symbol_pattern = re.compile(r'^[=\-:]+$')      # Section symbols
-
-    if len(value.strip()) <= 5:
-        if (roman_numeral_pattern.match(value) or
-            numeric_pattern.match(value) or
-            symbol_pattern.match(value)):
-            return True
-    return False
-
-def count_financial_keywords(values, threshold=0.25):
-    """Count financial keywords in the column and return True if above threshold."""
-    financial_keywords = [
-        'revenue', 'income', 'expenses', 'profit', 'loss', 'tax', 'earnings', 
-        'depreciation', 'amortization', 'comprehensive', 'share', 'equity', 
-        'cash', 'liabilities', 'assets', 'interest', 'dividend', 'reserve', 
-        'financial', 'investment', 'retained'
-    ]
-    pattern = re.compile('|'.join(financial_keywords), re.IGNORECASE)
-    
-    matches = sum(bool(pattern.search(str(value))) for value in values if isinstance(value, str))
-    ratio = matches / len(values) if len(values) > 0 else 0
-    
-    logger.info(f"Financial keyword match count: {matches}, Ratio: {ratio:.2f}, Threshold: {threshold}, total values: {len(values)}")
-    
-    return ratio >= threshold
-
-def should_remove_first_column(df, financial_threshold=0.25):
-    """Determines whether the first column should be removed based on financial keyword presence."""
-    try:
-        if df.empty or len(df.columns) < 2:
-            logger.warning("DataFrame is empty or has less than two columns. Skipping first column removal.")
-            return False
-
-        first_column_values = df[df.columns[0]].dropna().astype(str).str.strip()
-        logger.info(f"First column values: {first_column_values.tolist()}")
-        total_values = len(first_column_values)
-        if total_values == 0:
-            logger.warning("First column has no values. It will not be removed.")
-            return False
-        # Check if the first and second columns have mostly equal values
-        second_column_values = df[df.columns[1]].dropna().astype(str).str.strip()
-        equal_values_count = sum(first_column_values == second_column_values)
-        equal_values_ratio = equal_values_count / total_values if total_values > 0 else 0
-
-        if equal_values_ratio > 0.85:
-            logger.info("First column removed due to mostly equal values with the second column.")
-            return True
-
-        # 1️⃣ Priority Check: Financial Keyword Presence
-        has_enough_financial_keywords = count_financial_keywords(first_column_values, threshold=financial_threshold)
-
-        # If the column passes financial keyword check, keep it immediately
-        if has_enough_financial_keywords:
-            logger.info("First column retained due to sufficient financial keywords.")
-            return False
-        
-        # Check if the first column contains mostly Roman numerals or numbers with or without empty values
-        roman_or_numeric_count = sum(first_column_values.apply(lambda x: is_roman_numeral(x) or x.isnumeric() or x.strip() == ""))
-        roman_or_numeric_ratio = roman_or_numeric_count / total_values if total_values > 0 else 0
-
-        if roman_or_numeric_ratio > 0.40:
-            logger.info("First column removed due to mostly Roman numerals or numeric values with or without empty values.")
-            return True
-
-        # 2️⃣ Pattern Check (Backup if no financial keywords)
-        valid_short_count = sum(first_column_values.apply(is_short_or_pattern))
-        short_value_ratio = valid_short_count / total_values if total_values > 0 else 0
-
-        # 3️⃣ Repeated Patterns
-        unique_values = first_column_values.unique()
-        repeated_pattern = len(unique_values) > 5 and all(is_short_or_pattern(v) for v in unique_values)
-
-        # 4️⃣ Numeric-Only Check
-        numeric_only_ratio = sum(value.isnumeric() for value in first_column_values) / total_values if total_values > 0 else 0
-
-        # 5️⃣ Fully Empty Check
-        is_fully_empty = first_column_values.isin(["", "nan", "none", "null"]).all()
-
-        logger.info(f"Short value ratio: {short_value_ratio:.2f}, "
-                    f"Numeric-only ratio: {numeric_only_ratio:.2f}, "
-                    f"Repeated pattern: {repeated_pattern}, "
-                    f"Fully empty: {is_fully_empty}")
-
-        # Final Removal Decision
-        remove_column = (
-            short_value_ratio > 0.85 or        # Short pattern dominant
-            numeric_only_ratio > 0.9 or        # Numeric only
-            repeated_pattern or                # Repeated pattern
-            is_fully_empty                     # Fully empty
-        )
-
-        logger.info(f"Final Decision to remove first column: {remove_column}")
-        return remove_column
-
-    except Exception as e:
-        logger.error(f"Error determining if first column should be removed: {str(e)}")
-        return False
-
-
-def extract_structured_rows(table):
-    """Extracts structured rows from Azure Form Recognizer table cells."""
-    structured_rows = {}
-    max_columns = table.column_count
-
-    for cell in table.cells:
-        row_index = getattr(cell, "row_index", getattr(cell, "rowIndex", None))
-        col_index = getattr(cell, "column_index", getattr(cell, "columnIndex", None))
-        column_span = getattr(cell, "column_span", getattr(cell, "columnSpan", 1))
-
-        if row_index is None or col_index is None:
-            continue
-
-        if row_index not in structured_rows:
-            structured_rows[row_index] = [""] * max_columns
-
-        structured_rows[row_index][col_index] = cell.content
-
-        for span_offset in range(1, column_span):
-            if col_index + span_offset < max_columns:
-                structured_rows[row_index][col_index + span_offset] = (
-                    cell.content if row_index != 0 else ""  # Keep headers clean
-                )
-
-    logger.info(f"Structured Rows: {structured_rows}")
-    return [structured_rows[row] for row in sorted(structured_rows.keys())]
-
-
-def extract_headers(table, max_columns):
-    """Extracts headers from Azure Form Recognizer table cells."""
-    headers = [" "] * max_columns
-    for cell in table.cells:
-        if getattr(cell, "kind", "") == "columnHeader":
-            col_index = getattr(cell, "column_index", getattr(cell, "columnIndex", None))
-            column_span = getattr(cell, "column_span", getattr(cell, "columnSpan", 1))
-            if col_index is not None:
-                if column_span > 1:
-                    target_index = col_index + column_span - 1
-                    if target_index < max_columns:
-                        headers[target_index] = cell.content.strip() if isinstance(cell.content, str) else ""
-                else:
-                    headers[col_index] = cell.content.strip() if isinstance(cell.content, str) else ""
-
-    logger.info(f"Extracted Headers Before Cleaning: {headers}")
-    return headers
-
-
-def clean_table(df_table):
-    """Cleans the extracted table by removing duplicates, empty columns, and adjusting headers."""
-    # Remove duplicate columns
-    df_table = df_table.loc[:, ~df_table.columns.duplicated()]
-    logger.info(f"Table Shape After Removing Duplicates: {df_table.shape}")
-
-    # Remove duplicate headers if the first row matches column names
-    if df_table.iloc[0].tolist() == df_table.columns.tolist():
-        logger.info("Detected duplicate column headers in the first row. Removing...")
-        df_table = df_table[1:].reset_index(drop=True)
-
-    # Drop fully empty columns
-    df_table = df_table.dropna(axis=1, how="all")
-    logger.info(f"Table Shape After Dropping Empty Columns: {df_table.shape}")
-
-    # Drop fully empty rows
-    df_table = df_table.dropna(how="all")
-    logger.info(f"Final Processed Table Shape: {df_table.shape}")
-
-    return df_table
-
-def remove_roman_numerals(df):
-    """
-    Removes leading Roman numerals from the first column of a DataFrame, ensuring that only valid 
-    numerals are removed while preserving regular text.
-
-    Args:
-        df (pd.DataFrame): The input DataFrame with Roman numerals in the first column.
-
-    Returns:
-        pd.DataFrame: The updated DataFrame with Roman numerals removed.
-    """
-    roman_pattern = r'^\s*\b(M{0,4}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3}))\b[\s.]*'
-
-    # Process only the first column
-    first_column = df.columns[0]
-    df[first_column] = df[first_column].astype(str).apply(lambda x: re.sub(roman_pattern, '', x).strip())
-
-    return df
-
-def handle_first_column_removal(df_table):
-    """Handles removal of the first column and adjusts headers if needed."""
-    first_column_name = df_table.columns[0]
-    logger.info(f"First column name: {first_column_name}")
-
-    if should_remove_first_column(df_table):
-        logger.info(f"Removing first column: {first_column_name} and shifting headers")
-
-        # Shift headers if the second column is blank (common in merged headers)
-        if df_table.columns[1].strip() == "":
-            df_table.columns = [df_table.iloc[0, 0]] + df_table.columns[2:].tolist()
-            df_table = df_table.iloc[1:].reset_index(drop=True)
-        else:
-            df_table = df_table.drop(columns=[first_column_name])
-    df_table = remove_roman_numerals(df_table)
-    logger.info(f"Table Columns After First Column Removal: {list(df_table.columns)}")
-    return df_table
-
-
-
 def save_to_csv(tables, output_folder, filename):
     """Saves extracted tables to a CSV file."""
     csv_path = os.path.join(output_folder, f"{os.path.splitext(filename)[0]}_tables.csv")
     with open(csv_path, "w", newline="", encoding="utf-8") as csv_file:
         if tables:
             for table in tables:
-                logger.info(f"First 3 rows of the table:\n{table.head(3)}")
+                logger.info("First 3 rows of the table:\n%s", lazy(table, max_items=3))
                 table.to_csv(csv_file, index=False, header=False)
                 csv_file.write("\n")
         else:
@@ -283,144 +71,42 @@ def save_to_text(tables, output_folder, filename):
     logger.info(f"Text file saved: {text_path}")
     return text_path, text_data
 
-def should_remove_first_row(df):
-    """Determines whether the first row should be removed based on year values in column headers."""
-    try:
-        # Check if any column header contains a year value
-        year_pattern = re.compile(r'^(19|20)\d{2}$')
-        has_year_header = any(year_pattern.match(str(header).strip()) for header in df.columns)
-
-        if not has_year_header:
-            logger.info("First row removed due to absence of year values in column headers.")
-            return True
-
-        logger.info("First row retained due to presence of year values in column headers.")
-        return False
-
-    except Exception as e:
-        logger.error(f"Error determining if first row should be removed: {str(e)}")
-        return False
-
-def handle_wrong_header_removal(df_table):
-    if should_remove_first_row(df_table):
-        df_table = df_table[1:].reset_index(drop=True)
-    # Remove the first row if it is a duplicate of the header
-    # log first row and header
-    logger.info(f"First row: {df_table.iloc[0].tolist()}")
-    logger.info(f"Header: {df_table.columns.tolist()}")
-    if df_table.iloc[0].tolist() == df_table.columns.tolist():
-        logger.info("Detected duplicate row matching the header. Removing the first row.")
-        df_table = df_table[1:].reset_index(drop=True)
-        logger.info(f"First row removed. New first row: {df_table.iloc[0].tolist()}")
-    return df_table
+def process_table(table, total_pages, table_idx, progress_tracker, progress_key, cleanup_config=None, grid=None):
+    """
+    Processes an individual table extracted from Azure Form Recognizer.
 
-def extract_year_columns(df):
-    """Extract columns that contain year values."""
-    year_columns = {}
-    for col in df.columns:
-        match = re.search(r'(\b(19|20|21)\d{2}\b)', col)  # Match years from 1900 to 2199
-        if match:
-            year_columns[col] = int(match.group(1))
-    return year_columns
-
-def find_most_recent_year(year_columns):
-    """Find the most recent year from the extracted year columns."""
-    return max(year_columns.values()) if year_columns else None
-
-def identify_columns_to_remove(df, year_columns, most_recent_year):
-    """Identify columns to remove based on year values and other criteria."""
-    columns_to_remove = []
-    for i, col in enumerate(df.columns):
-        if col in year_columns and year_columns[col] == most_recent_year:
-            # Remove if the column contains the most recent year
-            columns_to_remove.append(col)
-        elif not re.search(r'(\b(19|20|21)\d{2}\b)', col) and i != 0:
-            # Remove columns that don't have a year (except the first column)
-            columns_to_remove.append(col)
-    return columns_to_remove
-
-def handle_unnecessary_column_removal(df):
-    """Handle the removal of unnecessary columns from the DataFrame."""
-    year_columns = extract_year_columns(df)
-    most_recent_year = find_most_recent_year(year_columns)
-    
-    # Check if the most recent year is the past year
-    ref_year = pd.Timestamp.now().year - 1
-    if most_recent_year == ref_year:
-        logger.info(f"Most recent year is the current year ({ref_year}). No columns will be removed.")
-        most_recent_year = ""
-    columns_to_remove = identify_columns_to_remove(df, year_columns, most_recent_year)
-    df = df.drop(columns=columns_to_remove, errors='ignore')
-    return df
-
-def convert_first_column_to_particulars(df):
-    """Convert the first column header to 'Particulars' if it is not already set."""
-    if df.columns[0].strip().lower() != 'particulars':
-        df.columns = ['Particulars'] + df.columns[1:].tolist()
-    return df
-
-def remove_column_with_no_heading(df):
-    """Remove columns that have no heading or only whitespace characters."""
-    df = df.loc[:, df.columns.str.strip() != ""]
-    return df
-
-def process_table(table, total_pages, table_idx, progress_tracker, progress_file):
-    """Processes an individual table extracted from Azure Form Recognizer."""
+    :param cleanup_config: The section's "tableCleanup" config enabling/disabling cleanup rules.
+    :param grid: TableGrid already built for the table; built here when not given.
+    """
     logger.info(f"Processing table {table_idx + 1}/{total_pages}")
-    
-    structured_rows = extract_structured_rows(table)
-    df_table = pd.DataFrame(structured_rows)
+
+    grid = grid or build_table_grid(table)
+    df_table = grid.to_dataframe()
     logger.info(f"Raw extracted table shape: {df_table.shape}")
-    logger.debug(f"Raw extracted table data: {df_table}")
+    logger.debug("Raw extracted table data: %s", lazy(df_table))
 
-    headers = extract_headers(table, df_table.shape[1])
-    logger.info(f"Extracted headers: {headers}")
+    headers = grid.headers
     if any(headers):
         df_table.columns = headers
     else:
         df_table.columns = df_table.iloc[0]
         df_table = df_table[1:].reset_index(drop=True)
     logger.info(f"Table shape after setting headers: {df_table.shape}")
-    logger.info(f"Table data after setting headers: {df_table}")
+    logger.debug("Table data after setting headers: %s", lazy(df_table))
 
-    df_table = handle_first_column_removal(df_table)
-    df_table = handle_wrong_header_removal(df_table)
-    df_table = handle_unnecessary_column_removal(df_table)
-    df_table = handle_wrong_header_removal(df_table)
-    # Remove the first row if it is a duplicate of the header
-    df_table = convert_first_column_to_particulars(df_table)
-    df_table = remove_column_with_no_heading(df_table)
-
-    logger.info(f"Table shape after processing: {df_table.shape}")
-    logger.debug(f"Table content after processing: {df_table}")
-
-    df_table = clean_table(df_table)
+    df_table = run_table_cleanup(df_table, cleanup_config, StageTimer(f"table {table_idx + 1}"))
     logger.info(f"Final cleaned table shape: {df_table.shape}")
-    logger.info(f"Final cleaned table data: {df_table}")
+    logger.info("Final cleaned table data: %s", lazy(df_table))
+    dump_table(df_table, f"table_{table_idx + 1}")
 
-    progress_tracker.update_progress(progress_file, table_idx + 1, total_pages)
+    progress_tracker.update_progress(progress_key, table_idx + 1, total_pages)
     logger.info(f"Updated progress for table {table_idx + 1}/{total_pages}")
 
     return df_table
 
-def is_financial_table(structured_rows):
-    """Determine if a table is a financial table based on keywords only."""
-    financial_keywords = [
-        'revenue', 'income', 'expenses', 'profit', 'loss', 
-        'tax', 'earnings', 'depreciation', 'amortization', 
-        'comprehensive', 'share', 'equity', 'cash', 'liabilities', 'assets'
-    ]
-
-    text = " ".join([" ".join(row).lower() for row in structured_rows])
-    logger.info(f"Text from structured rows: {text}")
-    
-    # Count how many financial keywords appear
-    keyword_hits = sum(keyword in text for keyword in financial_keywords)
-
-    # If at least 3 financial keywords are found, consider it a financial table
-    return keyword_hits >= 3
-
-def process_table_extraction(result, filename, output_folder, progress_tracker, progress_file, total_pages, model='financial'):
+def process_table_extraction(
+    result, filename, output_folder, progress_tracker, progress_key, total_pages, model='financial', cleanup_config=None
+):
     """Main function to process table extraction from Azure Form Recognizer results."""
     tables = []
 
@@ -428,15 +114,14 @@ def process_table_extraction(result, filename, output_folder, progress_tracker,
         for table_idx, table in enumerate(result.tables):
             logger.info(f"Processing Table {table_idx + 1}/{len(result.tables)}")
             
-            if model == 'financial':
-                structured_rows = extract_structured_rows(table)
-                if not is_financial_table(structured_rows):
-                    logger.info(f"Skipping non-financial table {table_idx + 1}")
-                    # Log details about the skipped table for future analysis
-                    logger.info(f"Skipped Table {table_idx + 1}/{len(result.tables)}: {structured_rows}")
-                    continue  # Skip the table
-                
-            df_table = process_table(table, total_pages, table_idx, progress_tracker, progress_file)
+            grid = build_table_grid(table)
+            if model == 'financial' and not grid.is_financial():
+                logger.info(f"Skipping non-financial table {table_idx + 1} (financial score {grid.financial_score})")
+                # Log details about the skipped table for future analysis
+                logger.info("Skipped Table %s/%s: %s", table_idx + 1, len(result.tables), lazy(grid.cells.tolist()))
+                continue  # Skip the table
+
+            df_table = process_table(table, total_pages, table_idx, progress_tracker, progress_key, cleanup_config, grid)
             tables.append(df_table)
 
     csv_path = save_to_csv(tables, output_folder, filename)
@@ -453,7 +138,7 @@ def process_table_extraction(result, filename, output_folder, progress_tracker,
     return outputs
 
 
-def process_text_extraction(result, filename, output_folder, progress_tracker, progress_file, total_pages, extra_requirements = None):
+def process_text_extraction(result, filename, output_folder, progress_tracker, progress_key, total_pages, extra_requirements = None):
     """
     Processes text-based extraction results and updates progress.
 
@@ -461,7 +146,7 @@ def process_text_extraction(result, filename, output_folder, progress_tracker, p
     :param filename: The name of the file being processed
     :param output_folder: The folder to save extracted outputs
     :param progress_tracker: Progress tracker instance
-    :param progress_file: Path to track extraction progress
+    :param progress_key: Key of the job in the progress store
     :param total_pages: Total number of pages to process
     :return: Outputs dictionary including text file path and original lines
     """
@@ -476,7 +161,7 @@ def process_text_extraction(result, filename, output_folder, progress_tracker, p
                 text_data += line.content + "\n"  # Append lines to create a text block
 
     # Update progress
-    progress_tracker.update_progress(progress_file, 1, total_pages)
+    progress_tracker.update_progress(progress_key, 1, total_pages)
 
     # Initialize output paths
     outputs = {}
@@ -493,7 +178,7 @@ def process_text_extraction(result, filename, output_folder, progress_tracker, p
 
     return outputs
 
-def process_field_extraction(result, filename, output_folder, progress_tracker, progress_file, total_pages):
+def process_field_extraction(result, filename, output_folder, progress_tracker, progress_key, total_pages):
     """
     Processes field-based extraction results and updates progress.
 
@@ -501,7 +186,7 @@ def process_field_extraction(result, filename, output_folder, progress_tracker,
     :param filename: The name of the file being processed
     :param output_folder: The folder to save extracted outputs
     :param progress_tracker: Progress tracker instance
-    :param progress_file: Path to track extraction progress
+    :param progress_key: Key of the job in the progress store
     :param total_pages: Total number of pages to process
     :return: Outputs dictionary including JSON, text, CSV, Excel paths, original lines, and raw_tables key
     """
@@ -524,7 +209,7 @@ def process_field_extraction(result, filename, output_folder, progress_tracker,
             original_lines.append(f"{key}: {value}")
 
     # Update progress after processing fields
-    progress_tracker.update_progress(progress_file, 1, total_pages)
+    progress_tracker.update_progress(progress_key, 1, total_pages)
 
     # Initialize output paths
     outputs = {}
@@ -578,28 +263,37 @@ def extract_original_lines(result):
 
     return "\n".join(original_lines)
 
-def process_based_on_model(result, filename, section, output_folder, progress_tracker, progress_file, total_pages, mapped_model):
+def process_based_on_model(
+    result, filename, section, output_folder, progress_tracker, progress_key, total_pages, mapped_model, cleanup_config=None
+):
     if mapped_model == "prebuilt-document":
-        return process_table_extraction(result, f"{filename}_{section}", output_folder, progress_tracker, progress_file, total_pages)
+        return process_table_extraction(
+            result, f"{filename}_{section}", output_folder, progress_tracker, progress_key, total_pages,
+            cleanup_config=cleanup_config
+        )
     elif mapped_model == "MutualFundModelSundaramFinance":
-        return process_field_extraction(result, f"{filename}_{section}", output_folder, progress_tracker, progress_file, total_pages)
+        return process_field_extraction(result, f"{filename}_{section}", output_folder, progress_tracker, progress_key, total_pages)
     else:
-        return process_text_extraction(result, f"{filename}_{section}", output_folder, progress_tracker, progress_file, total_pages)
+        return process_text_extraction(result, f"{filename}_{section}", output_folder, progress_tracker, progress_key, total_pages)
 
 def extract_with_azure(
-    filename, user_id, azure_blob_service, output_folder, pages_to_process, total_pages, progress_file, progress_tracker,
-    extraction_model, azure_endpoint, azure_key, page_config=None
+    filename, user_id, azure_blob_service, output_folder, pages_to_process, total_pages, progress_key, progress_tracker,
+    extraction_model, azure_endpoint, azure_key, page_config=None, local_pdf_path=None
 ):
+    """
+    Runs Azure extraction for a single file.
+
+    :param local_pdf_path: Local copy of the file already fetched for this request. When given,
+                           the file is not downloaded again and is left in place for the caller to clean up.
+    """
     logger.info(f"Starting extraction for {filename} with model {extraction_model}")
-    chunk_size = int(os.getenv("AZURE_CHUNK_SIZE", 2))
     use_credit = False  # Initialize use_credit
 
-    document_analysis_client = DocumentAnalysisClient(
-        endpoint=azure_endpoint,
-        credential=AzureKeyCredential(azure_key)
-    )
+    # Shared, pooled client: connections are kept alive across files and requests
+    document_analysis_client = get_document_analysis_client(azure_endpoint, azure_key)
 
-    temp_pdf_path = download_file_from_azure(azure_blob_service, user_id, filename)
+    owns_pdf_copy = local_pdf_path is None
+    temp_pdf_path = local_pdf_path or download_file_from_azure(azure_blob_service, user_id, filename)
     if not temp_pdf_path:
         logger.error(f"Failed to download file {filename} from Azure")
         return {"filename": filename, "error": "Failed to download file from Azure"}
@@ -610,29 +304,38 @@ def extract_with_azure(
 
     section_data = {}
     outputs = {"json": None, "csv": None, "text": None, "excel": None, "text_data": "", "original_lines": ""}
+    excel_sheets = {}
 
     try:
+        source = None
+        if source_url_mode_enabled():
+            try:
+                source = prepare_analysis_source(azure_blob_service, user_id, filename, temp_pdf_path)
+            except Exception as e:
+                logger.error(f"Could not share {filename} with Azure by URL, sending chunk PDFs instead: {e}")
+
         if page_config:
             use_credit = process_sections(
-                page_config, chunk_size, temp_pdf_path, document_analysis_client, mapped_model, filename, 
-                output_folder, progress_tracker, progress_file, pages_to_process, section_data, outputs
+                page_config, temp_pdf_path, document_analysis_client, mapped_model, filename, 
+                output_folder, progress_tracker, progress_key, pages_to_process, section_data, outputs, source
             )
         else:
             use_credit = process_full_document(
-                chunk_size, temp_pdf_path, document_analysis_client, mapped_model, filename, 
-                output_folder, progress_tracker, progress_file, pages_to_process, total_pages, section_data, outputs
+                temp_pdf_path, document_analysis_client, mapped_model, filename, 
+                output_folder, progress_tracker, progress_key, pages_to_process, total_pages, section_data, outputs, source
             )
 
-        outputs = save_extraction_results(section_data, filename, output_folder, outputs, extra_requirements)
+        outputs = save_extraction_results(section_data, filename, output_folder, outputs, extra_requirements, excel_sheets)
         logger.info(f"Extraction completed successfully for {filename}")
-        return {"filename": filename, "extracted_data": outputs, "use_credit": use_credit}
+        # excel_sheets stays in memory for consolidation; it is not part of the response
+        return {"filename": filename, "extracted_data": outputs, "use_credit": use_credit, "excel_sheets": excel_sheets}
 
     except Exception as e:
         logger.error(f"Azure extraction failed for {filename}: {e}")
         return {"filename": filename, "error": str(e)}
 
     finally:
-        if os.path.exists(temp_pdf_path):
+        if owns_pdf_copy and os.path.exists(temp_pdf_path):
             os.unlink(temp_pdf_path)
             logger.info(f"Temporary file {temp_pdf_path} has been deleted.")
 
@@ -641,8 +344,8 @@ def download_file_from_azure(azure_blob_service, user_id, filename):
     try:
         logger.info(f"Downloading file {user_id}/{filename} from Azure Blob Storage")
         with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file.write(azure_blob_service.download_file(user_id, filename.split("/")[-1]))
             temp_pdf_path = temp_file.name
+        azure_blob_service.download_to_path(user_id, filename.split("/")[-1], temp_pdf_path)
         logger.info(f"File downloaded to temporary path: {temp_pdf_path}")
         return temp_pdf_path
     except Exception as e:
@@ -651,10 +354,10 @@ def download_file_from_azure(azure_blob_service, user_id, filename):
 
 
 def process_sections(
-    page_config, chunk_size, temp_pdf_path, document_analysis_client, mapped_model, filename, 
-    output_folder, progress_tracker, progress_file, pages_to_process, section_data, outputs
+    page_config, temp_pdf_path, document_analysis_client, mapped_model, filename, 
+    output_folder, progress_tracker, progress_key, pages_to_process, section_data, outputs, source=None
 ):
-    use_credit = False
+    sections = []
     for section, config in page_config.items():
         try:
             logger.info(f"Extracting section: {section} with config: {config}")
@@ -662,141 +365,192 @@ def process_sections(
             if not page_range:
                 raise ValueError(f"Missing pageRange for section {section}")
 
-            page_list = parse_page_range(page_range)
-            for chunk in split_pages(page_list, chunk_size):
-                chunk_credit = process_chunk(
-                    chunk, temp_pdf_path, document_analysis_client, mapped_model, filename, section, 
-                    output_folder, progress_tracker, progress_file, pages_to_process, section_data, outputs
-                )
-                if chunk_credit:
-                    use_credit = True
-        except HttpResponseError as e:
-            logger.error(f"Error processing section {section}: {e}")
+            sections.append((section, parse_page_range(page_range)))
         except Exception as section_error:
             logger.error(f"Unexpected error processing section {section}: {section_error}")
-    return use_credit
+
+    plan = plan_chunks(temp_pdf_path, sections, mapped_model, **chunk_plan_limits(source))
+    return process_chunks(
+        plan, temp_pdf_path, document_analysis_client, mapped_model, filename,
+        output_folder, progress_tracker, progress_key, pages_to_process, section_data, outputs, page_config, source
+    )
 
 
 def process_full_document(
-    chunk_size, temp_pdf_path, document_analysis_client, mapped_model, filename, 
-    output_folder, progress_tracker, progress_file, pages_to_process, total_pages, section_data, outputs
+    temp_pdf_path, document_analysis_client, mapped_model, filename, 
+    output_folder, progress_tracker, progress_key, pages_to_process, total_pages, section_data, outputs, source=None
 ):
-    use_credit = False
-    all_pages = list(range(1, total_pages + 1))
-    for chunk in split_pages(all_pages, chunk_size):
-        chunk_credit = process_chunk(
-            chunk, temp_pdf_path, document_analysis_client, mapped_model, filename, "Full Document", 
-            output_folder, progress_tracker, progress_file, pages_to_process, section_data, outputs
-        )
-        if chunk_credit:
-            use_credit = True
-    return use_credit
+    plan = plan_chunks(
+        temp_pdf_path, [("Full Document", list(range(1, total_pages + 1)))], mapped_model, **chunk_plan_limits(source)
+    )
+    return process_chunks(
+        plan, temp_pdf_path, document_analysis_client, mapped_model, filename,
+        output_folder, progress_tracker, progress_key, pages_to_process, section_data, outputs, source=source
+    )
 
-def process_chunk(
-    chunk, temp_pdf_path, document_analysis_client, mapped_model, filename, section, 
-    output_folder, progress_tracker, progress_file, pages_to_process, section_data, outputs
-):
-    pages = ",".join(map(str, chunk))
-    logger.info(f"Processing chunk for section {section}: {pages}")
 
-    # 1️⃣ Convert PDF pages to high-resolution images
-    logger.info("Converting PDF pages to high-resolution images (300 DPI)")
-    try:
-        images = convert_from_path(
-            temp_pdf_path, 
-            dpi=300, 
-            first_page=min(chunk), 
-            last_page=max(chunk)
-        )
-    except Exception as e:
-        logger.error(f"Error converting PDF pages to images: {e}")
-        return False
-
-    if not images:
-        logger.error("No pages converted to images. Aborting.")
-        return False
-
-    # 2️⃣ Create a searchable, single-page PDF from images
-    logger.info("Creating single-page searchable PDF from images")
-    pdf_writer = PdfWriter()
-
-    for img in images:
-        img_bytes = io.BytesIO()
-        # Convert image to grayscale for better OCR
-        img.convert("L").save(img_bytes, format="PNG")
-        img_bytes.seek(0)
-
-        # Convert image to PDF page using PyMuPDF
-        image_doc = fitz.open("png", img_bytes.read())
-        pdf_bytes = image_doc.convert_to_pdf()
-        image_pdf = fitz.open("pdf", pdf_bytes)
-
-        reader = PdfReader(io.BytesIO(pdf_bytes))
-        for page_num in range(len(reader.pages)):
-            pdf_writer.add_page(reader.pages[page_num])
-
-    # Save the searchable PDF
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_image_pdf:
-        pdf_writer.write(temp_image_pdf)
-        searchable_pdf_path = temp_image_pdf.name
-        logger.info(f"Searchable PDF created: {searchable_pdf_path}")
-
-    # 3️⃣ Optimize the searchable PDF using qpdf
-    optimized_pdf_path = searchable_pdf_path.replace('.pdf', '_optimized.pdf')
-    logger.info("Optimizing searchable PDF using qpdf for Azure compatibility")
+def chunk_plan_limits(source):
+    """
+    No chunk PDF is built when Azure selects the pages of the source, so its size does not limit the chunks.
+    """
+    return {"max_bytes": None} if source is not None else {}
 
-    try:
-        subprocess.run(
-            ["qpdf", "--linearize", searchable_pdf_path, optimized_pdf_path],
-            check=True
+
+def process_chunks(
+    plan, temp_pdf_path, document_analysis_client, mapped_model, filename,
+    output_folder, progress_tracker, progress_key, pages_to_process, section_data, outputs, page_config=None, source=None
+):
+    """
+    Submits every planned chunk to Azure concurrently and then post-processes the
+    results sequentially in the original section/page order, one section at a time.
+    Pages shared by sections are analyzed once and their results go to every section.
+
+    :param plan: ChunkPlan of the file (see chunk_planner.plan_chunks).
+    :param page_config: Per-section config of the file, used for the section's table cleanup rules.
+    :param source: AnalysisSource when Azure selects the pages server-side; chunk PDFs are built otherwise.
+    :return: True if at least one chunk was analyzed successfully.
+    """
+    logger.info("Chunk plan for %s: %s", filename, lazy(plan.summary()))
+    start_time = time.perf_counter()
+    analyses = dispatch_in_order(
+        plan.chunks,
+        lambda chunk: analyze_chunk(
+            chunk.pages, temp_pdf_path, document_analysis_client, mapped_model, chunk.label, chunk.text_pages, source
         )
-        logger.info(f"Optimized PDF created: {optimized_pdf_path}")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"qpdf optimization failed: {e}")
-        optimized_pdf_path = searchable_pdf_path  # Use the original if qpdf fails
+    )
+    analysis_wall_time = time.perf_counter() - start_time
 
-    # 4️⃣ Read the optimized PDF bytes for Azure extraction
-    try:
-        with open(optimized_pdf_path, "rb") as f:
-            pdf_bytes = f.read()
-        logger.info(f"Final PDF ready for Azure extraction, size: {len(pdf_bytes)} bytes")
-    except Exception as e:
-        logger.error(f"Error reading optimized PDF: {e}")
-        return False
+    # A chunk shared by overlapping sections is post-processed once per section, on its pages
+    chunk_analyses = {id(chunk): analysis for chunk, analysis in zip(plan.chunks, analyses)}
+    use_credit = False
+    for chunk, section_index in plan.section_parts():
+        analysis = chunk_analyses[id(chunk)]
+        section, pages = chunk.sections[section_index]
+        try:
+            if process_chunk_result(
+                analysis, filename, section, output_folder, progress_tracker,
+                progress_key, pages_to_process, mapped_model, section_data, outputs,
+                (page_config or {}).get(section, {}).get("tableCleanup"),
+                section_result_view(analysis["result"], chunk, section_index, analysis["source_numbering"])
+            ):
+                use_credit = True
+        except Exception as section_error:
+            logger.error(f"Unexpected error processing section {section} pages {pages}: {section_error}")
 
-    # 5️⃣ Send optimized PDF to Azure Form Recognizer
-    results = []
-    try:
-        logger.info(f"Sending PDF chunk to Azure Form Recognizer for analysis")
-        poller = document_analysis_client.begin_analyze_document(
+    analyze_time_sum = sum(analysis["timer"].timings.get("analyze", 0.0) for analysis in analyses)
+    logger.info(
+        f"Analyzed {len(plan.chunks)} chunks for {filename} in {analysis_wall_time:.2f}s wall time "
+        f"(sum of per-chunk analyze time: {analyze_time_sum:.2f}s), "
+        f"Azure rate limiter: {get_azure_rate_limiter().metrics()}"
+    )
+    return use_credit
+
+
+def analyze_chunk(chunk, temp_pdf_path, document_analysis_client, mapped_model, section, text_pages=None, source=None):
+    """
+    Builds the chunk PDF and runs it through Azure Form Recognizer, or, when `source` is
+    given, has Azure analyze the chunk's pages of the stored source document.
+    Safe to call from worker threads: it only reads the source PDF and never touches shared outputs.
+
+    :param section: Section name(s) of the chunk, for logs.
+    :param text_pages: Pages of the chunk known to carry a text layer (from the chunk plan).
+    :param source: AnalysisSource for server-side page selection (see analysis_source).
+
+    :return: Dictionary with the chunk, the Azure result (None on failure), build mode, size and timer.
+             "source_numbering" tells whether the result pages carry source page numbers.
+    """
+    pages = ",".join(map(str, chunk))
+    logger.info(f"Processing chunk for section {section}: {pages}")
+    analysis = {
+        "chunk": chunk, "result": None, "build_mode": None, "size": 0, "timer": StageTimer(f"{section}:{pages}"),
+        "source_numbering": source is not None,
+    }
+    timer = analysis["timer"]
+
+    if source is not None:
+        # 1️⃣ Nothing to build: Azure selects the pages of the stored source itself
+        analysis["build_mode"] = "source_url"
+        payload = source.cache_payload(chunk)
+        submit = partial(
+            document_analysis_client.begin_analyze_document_from_url,
             model_id=mapped_model,
-            document=pdf_bytes
+            document_url=source.url,
+            pages=format_page_ranges(chunk)
         )
-        result = poller.result()
-        results = [result]
+    else:
+        # 1️⃣ Build the chunk PDF (text pages pass through, scanned pages are rasterized)
+        try:
+            payload, analysis["build_mode"] = build_chunk_document(
+                temp_pdf_path, chunk, timer, dpi=raster_dpi_for_model(mapped_model), text_pages=text_pages
+            )
+            analysis["size"] = len(payload)
+            logger.info(f"Chunk PDF ready for Azure extraction ({analysis['build_mode']}), size: {len(payload)} bytes")
+        except Exception as e:
+            logger.error(f"Error preparing PDF chunk {chunk}: {e}")
+            return analysis
+        submit = partial(document_analysis_client.begin_analyze_document, model_id=mapped_model, document=payload)
+
+    # 2️⃣ Reuse a cached result for identical bytes (or source pages) + model (post-processing-only re-runs)
+    cache = get_analysis_cache()
+    cache_key = cache.make_key(payload, mapped_model) if cache else None
+    if cache:
+        with timer.stage("cache_lookup"):
+            analysis["result"] = cache.get(cache_key)
+        if analysis["result"] is not None:
+            analysis["build_mode"] = f"{analysis['build_mode']}+cached"
+            logger.info(f"Using cached analysis result for chunk: {chunk}")
+            return analysis
+
+    # 3️⃣ Send the chunk to Azure Form Recognizer
+    try:
+        logger.info(f"Sending chunk to Azure Form Recognizer for analysis ({analysis['build_mode']})")
+        # Runs on a chunk lane worker, which caps the analyses in flight per process;
+        # paced to the resource's quota, throttled submissions are retried, not dropped
+        poller = get_azure_rate_limiter().run(submit, timer)
+        with timer.stage("analyze"):
+            analysis["result"] = poller.result()
         logger.info(f"Received analysis result for chunk: {chunk}")
+        if cache:
+            with timer.stage("cache_store"):
+                cache.put(cache_key, analysis["result"])
     except HttpResponseError as e:
         logger.error(f"Error analyzing PDF chunk with Azure: {e}")
     except Exception as e:
         logger.error(f"Unexpected error sending data to Azure: {e}")
 
-    # 6️⃣ Process extraction results
-    use_credit = bool(results)
+    return analysis
 
-    for result in results:
-        section_outputs = process_based_on_model(
-            result, filename, section, output_folder, progress_tracker, 
-            progress_file, pages_to_process, mapped_model
-        )
-        aggregate_section_outputs(section_outputs, section_data, section, outputs)
 
-    # 7️⃣ Clean up temporary files
-    for path in [searchable_pdf_path, optimized_pdf_path]:
-        if path and os.path.exists(path):
-            os.remove(path)
-            logger.info(f"Temporary file deleted: {path}")
+def process_chunk_result(
+    analysis, filename, section, output_folder, progress_tracker,
+    progress_key, pages_to_process, mapped_model, section_data, outputs, cleanup_config=None, result=None
+):
+    """
+    Turns the Azure result of one chunk into section outputs and aggregates them.
 
-    return use_credit
+    :param cleanup_config: The section's "tableCleanup" config, if any.
+    :param result: The section's part of the chunk result (see chunk_planner.section_result_view);
+                   the whole chunk result when not given.
+
+    :return: True if the chunk was analyzed and should be charged.
+    """
+    timer = analysis["timer"]
+    result = result if result is not None else analysis["result"]
+
+    # 4️⃣ Process extraction results
+    if result is not None:
+        with timer.stage("postprocess"):
+            section_outputs = process_based_on_model(
+                result, filename, section, output_folder, progress_tracker, 
+                progress_key, pages_to_process, mapped_model, cleanup_config
+            )
+            aggregate_section_outputs(section_outputs, section_data, section, outputs)
+
+    logger.info(
+        f"Chunk timings for section {section} pages {analysis['chunk']} "
+        f"(mode={analysis['build_mode']}, bytes={analysis['size']}): {timer.summary()}"
+    )
+    return result is not None
 
 def aggregate_section_outputs(section_outputs, section_data, section, outputs):
     if "raw_tables" in section_outputs:
@@ -812,48 +566,18 @@ def aggregate_section_outputs(section_outputs, section_data, section, outputs):
         outputs["csv"] = section_outputs["csv"]
 
 
-def parse_page_range(page_range):
-    if isinstance(page_range, list):
-        return page_range
-    elif isinstance(page_range, str):
-        return list(parse_page_ranges(page_range.replace(" ", "").strip()))
-    else:
-        raise ValueError(f"Invalid page_range format: {page_range}")
-
-
-def split_pages(pages, chunk_size):
-    for i in range(0, len(pages), chunk_size):
-        chunk = pages[i:i + chunk_size]
-        yield chunk
-
-
-def parse_page_ranges(page_ranges):
-    """
-    Converts a page range string like "1,3-4" to a list of individual page numbers.
-    """
-    pages = set()
-    ranges = page_ranges.split(",")
-    for r in ranges:
-        if "-" in r:
-            start, end = map(int, r.split("-"))
-            pages.update(range(start, end + 1))
-        else:
-            pages.add(int(r))
-    return sorted(pages)
-
 def process_table_section(result, section_name):
     """
     Extracts table data for a specific section from the Azure Form Recognizer result.
     """
     tables = []
     for table in result.tables:  # Assuming tables attribute is correct
-        rows = []
-        for row_index in range(table.row_count):
-            row = []
-            for cell in table.cells:
-                if cell.row_index == row_index:
-                    row.append(cell.content)
-            rows.append(row)
+        # One pass over the cells; each row keeps its cells in result order
+        # Sized from the cells as well: a cell may report a row_index beyond row_count
+        row_count = max([table.row_count or 0] + [cell.row_index + 1 for cell in table.cells])
+        rows = [[] for _ in range(row_count)]
+        for cell in table.cells:
+            rows[cell.row_index].append(cell.content)
         tables.append(pd.DataFrame(rows))
     return tables
 
@@ -882,7 +606,7 @@ def upload_extraction_results_to_azure(section_data, filename, azure_blob_servic
         except Exception as e:
             logger.error(f"Failed to upload {file_path} to Azure: {e}")
 
-def save_extraction_results(section_data, filename, output_folder, outputs, extra_requirements = None):
+def save_extraction_results(section_data, filename, output_folder, outputs, extra_requirements = None, excel_sheets = None):
     """
     Saves the extracted results locally in JSON, CSV, Excel, and Text formats.
 
@@ -890,6 +614,8 @@ def save_extraction_results(section_data, filename, output_folder, outputs, extr
     :param filename: The name of the file being processed.
     :param output_folder: The folder to save extracted outputs.
     :param outputs: The dictionary to update with output paths.
+    :param excel_sheets: Optional dictionary filled with the sheets written to outputs["excel"],
+                         so they can be consolidated without re-reading the workbook.
     """
     # Save JSON data
     logger.info("Inside the save extraction results function..")
@@ -942,12 +668,14 @@ def save_extraction_results(section_data, filename, output_folder, outputs, extr
             logger.info("Got the excel path successfully..")
             if not(outputs['excel'] and len(outputs['excel']) > 0):
                 outputs["excel"] = excel_save_result['excel_path']
+                if excel_sheets is not None:
+                    excel_sheets.update(excel_save_result['sheets'])
             if not(outputs['csv'] and len(outputs['csv']) > 0):
                 outputs["csv"] = excel_save_result['csv_path']
         else:
             outputs["excel"] = None
     # Save Excel data
-    logger.info(f"Output data : {outputs}")
+    logger.info("Output data : %s", lazy(outputs))
     return outputs
 
 def delete_extracted_local_files(section_data):
@@ -0,0 +1,331 @@
+"""
+Paces Azure Form Recognizer analyze submissions to the resource's transactions-per-second quota.
+
+Every `begin_analyze_document` takes a token from a bucket shared by all workers of the
+process, or of every node when AZURE_RATE_LIMIT_BACKEND is "redis". Throttled responses
+(HTTP 429) are reported by a response hook of the shared client, for submissions and
+polling alike: the bucket is paused for the Retry-After the service asked for and the
+rate is halved, then grows back after every successful submission (additive increase,
+multiplicative decrease). Throttled submissions are retried with jittered backoff
+instead of being dropped.
+"""
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from azure.core.exceptions import HttpResponseError
+from modules.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+# Analyze submissions per second allowed by the Azure resource (0 disables pacing)
+AZURE_ANALYZE_TPS = float(os.getenv("AZURE_ANALYZE_TPS", 15))
+# Submissions sent back to back after an idle period; 1 spaces every submission evenly,
+# which a per-second quota never rejects
+AZURE_ANALYZE_BURST = float(os.getenv("AZURE_ANALYZE_BURST", 1))
+# Retries of a throttled submission before the chunk is given up
+AZURE_THROTTLE_MAX_RETRIES = int(os.getenv("AZURE_THROTTLE_MAX_RETRIES", 5))
+# Backoff when a 429 carries no Retry-After: base * 2^attempt seconds, capped, with jitter
+AZURE_THROTTLE_BACKOFF_BASE = float(os.getenv("AZURE_THROTTLE_BACKOFF_BASE", 1.0))
+AZURE_THROTTLE_BACKOFF_MAX = float(os.getenv("AZURE_THROTTLE_BACKOFF_MAX", 60))
+# A Retry-After longer than this (e.g. an exhausted monthly quota) is not waited for
+AZURE_THROTTLE_MAX_WAIT = float(os.getenv("AZURE_THROTTLE_MAX_WAIT", 120))
+# "memory" paces this process only, "redis" shares one bucket between nodes. The redis
+# backend falls back to a Redis Celery broker when AZURE_RATE_LIMIT_REDIS_URL is not set.
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL") or ""
+AZURE_RATE_LIMIT_BACKEND = os.getenv(
+    "AZURE_RATE_LIMIT_BACKEND", "redis" if os.getenv("AZURE_RATE_LIMIT_REDIS_URL") else "memory"
+).lower()
+AZURE_RATE_LIMIT_REDIS_URL = os.getenv("AZURE_RATE_LIMIT_REDIS_URL") or (
+    CELERY_BROKER_URL if CELERY_BROKER_URL.startswith(("redis://", "rediss://")) else None
+)
+AZURE_RATE_LIMIT_KEY = os.getenv("AZURE_RATE_LIMIT_KEY", "azure-analyze-rate")
+
+THROTTLED_STATUS = 429
+# After a throttle the rate is multiplied by this; every success adds this share of the quota back
+RATE_DECREASE_FACTOR = 0.5
+RATE_INCREASE_SHARE = 0.05
+MIN_RATE_SHARE = 0.1
+
+
+def parse_retry_after(headers):
+    """
+    Returns the delay in seconds asked for by Retry-After style headers, or None.
+    Accepts retry-after-ms / x-ms-retry-after-ms and Retry-After in seconds or as an HTTP date.
+    """
+    if not headers:
+        return None
+    headers = {str(name).lower(): value for name, value in headers.items()}
+    for name in ("retry-after-ms", "x-ms-retry-after-ms"):
+        try:
+            if headers.get(name):
+                return max(0.0, float(headers[name]) / 1000)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class InMemoryTokenBucket:
+    """
+    Token bucket shared by the threads of this process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = None
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def try_acquire(self, rate, burst):
+        """
+        Takes a token and returns 0, or returns the seconds to wait before trying again.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now, rate, burst)
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / rate
+
+    def pause(self, seconds):
+        """
+        Stops handing out tokens for `seconds` (the bucket empties meanwhile).
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+    def _refill(self, now, rate, burst):
+        if self.tokens is None:
+            self.tokens = burst
+        self.tokens = min(burst, self.tokens + max(0.0, now - self.updated) * rate)
+        self.updated = now
+
+
+class RedisTokenBucket:
+    """
+    Token bucket held in one Redis hash, so every node shares the resource's quota.
+    The bucket is updated by a Lua script using the Redis clock, so node clocks do not matter.
+    """
+
+    SCRIPT = """
+    redis.replicate_commands()
+    local now_parts = redis.call('TIME')
+    local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+    local rate, burst, pause = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated', 'paused_until')
+    local tokens = tonumber(state[1]) or burst
+    local updated = tonumber(state[2]) or now
+    local paused_until = tonumber(state[3]) or 0
+    tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if pause > 0 then
+        paused_until = math.max(paused_until, now + pause)
+        tokens = 0
+    elseif now < paused_until then
+        wait = paused_until - now
+    elseif tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now, 'paused_until', paused_until)
+    redis.call('EXPIRE', KEYS[1], 3600)
+    return tostring(wait)
+    """
+
+    def __init__(self, redis_url, key=AZURE_RATE_LIMIT_KEY):
+        import redis
+        self.redis = redis.Redis.from_url(redis_url)
+        self.key = key
+        self.script = self.redis.register_script(self.SCRIPT)
+
+    def try_acquire(self, rate, burst):
+        return float(self.script(keys=[self.key], args=[rate, burst, 0]))
+
+    def pause(self, seconds):
+        self.script(keys=[self.key], args=[1, 1, seconds])
+
+
+class AzureRateLimiter:
+    """
+    Adaptive rate limiter for analyze submissions, with throttle and wait-time counters.
+    """
+
+    def __init__(self, bucket, max_rate=AZURE_ANALYZE_TPS, burst=AZURE_ANALYZE_BURST):
+        self.bucket = bucket
+        self.max_rate = max_rate
+        self.burst = max(1.0, burst)
+        self.rate = max_rate
+        self.lock = threading.Lock()
+        self.counters = {
+            "submitted": 0,
+            "throttled": 0,
+            "retries": 0,
+            "given_up": 0,
+            "wait_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    def acquire(self):
+        """
+        Blocks until a submission may be sent. Returns the seconds waited.
+        """
+        if self.max_rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            wait = self.bucket.try_acquire(self.rate, self.burst)
+            if wait <= 0:
+                break
+            # A little jitter keeps waiting workers from retrying in lockstep
+            wait = wait * random.uniform(1.0, 1.1)
+            time.sleep(wait)
+            waited += wait
+        self._count(wait_seconds=waited)
+        return waited
+
+    def on_throttle(self, retry_after=None):
+        """
+        Reports a 429 from Azure: pauses every worker for `retry_after` seconds and lowers the rate.
+        """
+        with self.lock:
+            self.counters["throttled"] += 1
+            if self.max_rate > 0:
+                self.rate = max(self.max_rate * MIN_RATE_SHARE, self.rate * RATE_DECREASE_FACTOR)
+            rate = self.rate
+        if retry_after:
+            self.bucket.pause(min(retry_after, AZURE_THROTTLE_MAX_WAIT))
+        logger.warning(f"Azure throttled a request (Retry-After: {retry_after}); analyze rate lowered to {rate:.2f}/s")
+
+    def on_success(self):
+        with self.lock:
+            self.counters["submitted"] += 1
+            if self.max_rate > 0:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_INCREASE_SHARE)
+
+    def run(self, submit, timer=None):
+        """
+        Calls `submit` (e.g. begin_analyze_document) when the bucket allows it and retries it
+        while Azure answers 429, waiting the Retry-After or a jittered exponential backoff.
+
+        :param timer: Optional StageTimer; records the "rate_wait" and "throttle_backoff" times.
+        :raises HttpResponseError: When the submission fails for another reason, or is still
+                                   throttled after AZURE_THROTTLE_MAX_RETRIES retries.
+        """
+        for attempt in range(AZURE_THROTTLE_MAX_RETRIES + 1):
+            waited = self.acquire()
+            if timer is not None:
+                timer.timings["rate_wait"] = timer.timings.get("rate_wait", 0.0) + waited
+            try:
+                value = submit()
+            except HttpResponseError as e:
+                if e.status_code != THROTTLED_STATUS:
+                    raise
+                retry_after = parse_retry_after(getattr(e.response, "headers", None))
+                if attempt == AZURE_THROTTLE_MAX_RETRIES or (retry_after or 0) > AZURE_THROTTLE_MAX_WAIT:
+                    self._count(given_up=1)
+                    logger.error(f"Giving up an Azure submission after {attempt + 1} throttled attempts (Retry-After: {retry_after})")
+                    raise
+                if retry_after is not None:
+                    delay = retry_after * random.uniform(1.0, 1.2)
+                else:
+                    delay = min(AZURE_THROTTLE_BACKOFF_MAX, AZURE_THROTTLE_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.info(f"Azure submission throttled, retry {attempt + 1}/{AZURE_THROTTLE_MAX_RETRIES} in {delay:.2f}s")
+                self._count(retries=1, backoff_seconds=delay)
+                if timer is not None:
+                    timer.timings["throttle_backoff"] = timer.timings.get("throttle_backoff", 0.0) + delay
+                time.sleep(delay)
+                continue
+            self.on_success()
+            return value
+
+    def metrics(self):
+        with self.lock:
+            return {
+                **self.counters,
+                "wait_seconds": round(self.counters["wait_seconds"], 3),
+                "backoff_seconds": round(self.counters["backoff_seconds"], 3),
+                "rate": round(self.rate, 3),
+                "max_rate": self.max_rate,
+                "backend": type(self.bucket).__name__,
+            }
+
+    def _count(self, **increments):
+        with self.lock:
+            for name, value in increments.items():
+                self.counters[name] += value
+
+
+class ThrottleReportingHook:
+    """
+    `raw_response_hook` of the shared analysis client: reports every 429 to the rate limiter.
+
+    The hook runs on every attempt, after the SDK retry policy. A throttled submission
+    (POST) is raised right away, like the SDK's own F0 quota policy, so AzureRateLimiter.run
+    retries it at the shared pace instead of the SDK retrying it on its own. Throttled
+    polling requests are still retried by the SDK.
+    """
+
+    def __init__(self, limiter=None):
+        self.limiter = limiter
+
+    def __call__(self, response):
+        http_response = response.http_response
+        if http_response.status_code != THROTTLED_STATUS:
+            return
+        limiter = self.limiter or get_azure_rate_limiter()
+        limiter.on_throttle(parse_retry_after(http_response.headers))
+        if response.http_request.method.upper() == "POST":
+            raise HttpResponseError(response=http_response)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def validate_rate_limit_backend():
+    """
+    Refuses the redis backend without a Redis URL, at startup rather than on the first analysis.
+
+    :raises RuntimeError: When AZURE_RATE_LIMIT_BACKEND=redis and no Redis URL is configured.
+    """
+    if AZURE_RATE_LIMIT_BACKEND == "redis" and not AZURE_RATE_LIMIT_REDIS_URL:
+        raise RuntimeError(
+            "AZURE_RATE_LIMIT_BACKEND=redis requires a Redis URL: "
+            "set AZURE_RATE_LIMIT_REDIS_URL (or use a redis:// CELERY_BROKER_URL)"
+        )
+
+
+def get_azure_rate_limiter():
+    """
+    Returns the process-wide rate limiter for the configured backend.
+    """
+    global _rate_limiter
+    validate_rate_limit_backend()
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            if AZURE_RATE_LIMIT_BACKEND == "redis":
+                bucket = RedisTokenBucket(AZURE_RATE_LIMIT_REDIS_URL)
+            else:
+                bucket = InMemoryTokenBucket()
+            _rate_limiter = AzureRateLimiter(bucket)
+            logger.info(
+                f"Azure rate limiter uses the {AZURE_RATE_LIMIT_BACKEND} backend "
+                f"({AZURE_ANALYZE_TPS}/s, burst {AZURE_ANALYZE_BURST})"
+            )
+    return _rate_limiter
@@ -0,0 +1,116 @@
+import os
+import subprocess
+import tempfile
+import fitz  # PyMuPDF
+from modules.logging_util import setup_logger
+from modules.timing_util import StageTimer
+from modules.rasterization import rasterize_pages, RASTER_DPI_DEFAULT
+
+logger = setup_logger(__name__)
+
+# "auto" sends pages that already carry a text layer as-is, "off" always rasterizes
+PDF_PASSTHROUGH_MODE = os.getenv("AZURE_PDF_PASSTHROUGH", "auto").strip().lower()
+# Minimum number of extractable characters for a page to count as born-digital
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", 20))
+
+
+def page_has_text_layer(page, min_chars=TEXT_LAYER_MIN_CHARS):
+    """
+    Checks whether a PyMuPDF page already carries an extractable text layer.
+    """
+    try:
+        return len(page.get_text("text").strip()) >= min_chars
+    except Exception as e:
+        logger.warning(f"Failed to read text layer of page {page.number + 1}: {e}")
+        return False
+
+
+def linearize_pdf_bytes(pdf_bytes):
+    """
+    Linearizes PDF bytes with qpdf for Azure compatibility.
+    Returns the original bytes if qpdf is unavailable or fails.
+    """
+    source_path = optimized_path = None
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as source_file:
+            source_file.write(pdf_bytes)
+            source_path = source_file.name
+        optimized_path = source_path.replace(".pdf", "_optimized.pdf")
+        # --deterministic-id keeps identical input producing identical output bytes
+        subprocess.run(
+            ["qpdf", "--linearize", "--deterministic-id", source_path, optimized_path],
+            check=True
+        )
+        with open(optimized_path, "rb") as f:
+            return f.read()
+    except (subprocess.CalledProcessError, OSError) as e:
+        logger.error(f"qpdf optimization failed: {e}")
+        return pdf_bytes
+    finally:
+        for path in [source_path, optimized_path]:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+def build_chunk_document(
+    pdf_path, chunk, timer=None, passthrough_mode=PDF_PASSTHROUGH_MODE, dpi=RASTER_DPI_DEFAULT, text_pages=None
+):
+    """
+    Builds the in-memory PDF that is sent to Azure for a chunk of pages.
+
+    Pages that already carry a text layer are copied as-is with PyMuPDF; only scanned
+    pages are rasterized to grayscale (in parallel on the rasterization process pool).
+
+    :param pdf_path: Path to the source PDF.
+    :param chunk: List of 1-based page numbers in the chunk.
+    :param timer: Optional StageTimer collecting per-stage durations.
+    :param passthrough_mode: "auto" to pass through text pages, "off" to always rasterize.
+    :param dpi: Rasterization resolution for scanned pages.
+    :param text_pages: Pages already known to carry a text layer (e.g. from the chunk plan); detected when None.
+    :return: Tuple (pdf_bytes, build_mode) where build_mode is "passthrough", "raster" or "mixed".
+    """
+    timer = timer or StageTimer()
+
+    with fitz.open(pdf_path) as source:
+        with timer.stage("detect"):
+            if text_pages is not None:
+                text_pages = set(text_pages)
+            elif passthrough_mode == "off":
+                text_pages = set()
+            else:
+                text_pages = {
+                    page_number for page_number in chunk
+                    if 0 < page_number <= source.page_count and page_has_text_layer(source[page_number - 1])
+                }
+
+        scanned_pages = [page_number for page_number in chunk if page_number not in text_pages]
+        logger.info(f"Chunk {chunk}: text pages {sorted(text_pages)}, scanned pages {scanned_pages}")
+
+        with timer.stage("rasterize"):
+            rendered_pages = rasterize_pages(
+                pdf_path, [page_number for page_number in scanned_pages if 0 < page_number <= source.page_count], dpi
+            )
+
+        with fitz.open() as chunk_doc:
+            for page_number in chunk:
+                with timer.stage("slice"):
+                    if page_number in text_pages:
+                        chunk_doc.insert_pdf(source, from_page=page_number - 1, to_page=page_number - 1)
+                    elif page_number in rendered_pages:
+                        with fitz.open("pdf", rendered_pages[page_number]) as image_pdf:
+                            chunk_doc.insert_pdf(image_pdf)
+                    else:
+                        logger.warning(f"Page {page_number} is out of range and was skipped")
+
+            if chunk_doc.page_count == 0:
+                raise ValueError(f"No pages could be prepared for chunk {chunk}")
+
+            with timer.stage("serialize"):
+                pdf_bytes = chunk_doc.tobytes(garbage=3, deflate=True, no_new_id=True)
+
+    if not scanned_pages:
+        return pdf_bytes, "passthrough"
+
+    with timer.stage("linearize"):
+        pdf_bytes = linearize_pdf_bytes(pdf_bytes)
+    return pdf_bytes, "raster" if not text_pages else "mixed"
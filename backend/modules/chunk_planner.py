@@ -0,0 +1,289 @@
+"""
+Plans how the pages of a file are grouped into Azure analyze requests.
+
+Pages are packed by their estimated encoded size and by the page limit of the model,
+instead of a fixed number of pages per request: light text pages share a request,
+heavy scans are kept under AZURE_CHUNK_MAX_BYTES. Consecutive sections are merged
+into one request, and `section_result_view` splits each result back into one view per
+section by page number. A page shared by overlapping sections is sent once, and its
+result is handed to every section that references it (see page_planner); field models,
+which cannot merge sections, send it with each section instead.
+
+The number of requests per file is kept at AZURE_MAX_INFLIGHT_PER_DOCUMENT or more
+when the file has enough pages, so merging never costs the file its parallelism.
+"""
+import os
+import math
+import fitz  # PyMuPDF
+from modules.logging_util import setup_logger
+from modules.chunk_builder import page_has_text_layer, PDF_PASSTHROUGH_MODE
+from modules.rasterization import raster_dpi_for_model, parse_dpi_overrides
+from modules.analysis_dispatcher import AZURE_MAX_INFLIGHT_PER_DOCUMENT
+from modules.page_planner import FilePagePlan
+
+logger = setup_logger(__name__)
+
+# Largest estimated request body; one page above it is still sent, alone
+AZURE_CHUNK_MAX_BYTES = int(os.getenv("AZURE_CHUNK_MAX_BYTES", 20 * 1024 * 1024))
+# Pages per request for models without their own limit
+AZURE_CHUNK_MAX_PAGES = int(os.getenv("AZURE_CHUNK_MAX_PAGES", 8))
+# The custom field model is trained on two-page forms; plain reading scales to longer requests
+DEFAULT_CHUNK_MAX_PAGES_BY_MODEL = {
+    "MutualFundModelSundaramFinance": 2,
+    "prebuilt-read": 16,
+}
+CHUNK_MAX_PAGES_BY_MODEL = {
+    **DEFAULT_CHUNK_MAX_PAGES_BY_MODEL, **parse_dpi_overrides(os.getenv("AZURE_CHUNK_MAX_PAGES_BY_MODEL"))
+}
+# Field models return one document per request, so merging sections would merge their fields
+SECTION_MERGE_EXCLUDED_MODELS = {"MutualFundModelSundaramFinance"}
+
+# Size estimates: rendered grayscale scans deflate to about a fifth of their pixel count
+# (0.09-0.27 measured on sample scans); shared resources such as fonts add a fixed overhead
+RASTER_BYTES_PER_PIXEL = 0.3
+PAGE_OVERHEAD_BYTES = 16 * 1024
+
+if os.getenv("AZURE_CHUNK_SIZE"):
+    logger.warning("AZURE_CHUNK_SIZE is no longer used; see AZURE_CHUNK_MAX_PAGES and AZURE_CHUNK_MAX_BYTES")
+
+
+def chunk_max_pages_for_model(model_id):
+    """
+    Returns the maximum number of pages sent to `model_id` in one request.
+    """
+    return max(1, CHUNK_MAX_PAGES_BY_MODEL.get(model_id, AZURE_CHUNK_MAX_PAGES))
+
+
+class PlannedChunk:
+    """
+    One analyze request: the pages sent, in order, and the sections they belong to.
+
+    Attributes:
+        pages (list): 1-based page numbers of the source PDF, no page twice.
+        sections (list): (section, pages) tuples in config order, for every section referencing
+                         a page of the chunk; a page shared by sections is in each of their lists.
+        text_pages (set): Pages passed through with their text layer (the rest is rasterized).
+        estimated_bytes (int): Estimated size of the chunk PDF.
+    """
+
+    def __init__(self):
+        self.pages = []
+        self.sections = []
+        self.text_pages = set()
+        self.estimated_bytes = 0
+
+    @property
+    def label(self):
+        return "+".join(str(section) for section, _ in self.sections)
+
+    def add_page(self, page_number, estimated_bytes, is_text):
+        self.pages.append(page_number)
+        self.estimated_bytes += estimated_bytes
+        if is_text:
+            self.text_pages.add(page_number)
+
+
+class ChunkPlan:
+    def __init__(self, chunks, model_id, max_pages, max_bytes, page_plan=None):
+        self.chunks = chunks
+        self.model_id = model_id
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.page_plan = page_plan or FilePagePlan()
+
+    def section_parts(self):
+        """
+        Returns (chunk, section_index) pairs in section order, then chunk order: the order
+        in which the section views of the results are post-processed.
+        """
+        positions = {section: position for position, (section, _) in enumerate(self.page_plan.sections)}
+        parts = [
+            (positions.get(section, len(positions)), chunk_position, chunk, section_index)
+            for chunk_position, chunk in enumerate(self.chunks)
+            for section_index, (section, _) in enumerate(chunk.sections)
+        ]
+        parts.sort(key=lambda part: part[:2])
+        return [(chunk, section_index) for _, _, chunk, section_index in parts]
+
+    def summary(self):
+        """
+        Returns the plan figures reported before execution.
+        """
+        return {
+            "model": self.model_id,
+            "expected_calls": len(self.chunks),
+            "pages": sum(len(chunk.pages) for chunk in self.chunks),
+            "section_pages": self.page_plan.referenced_pages,
+            "shared_pages": self.page_plan.shared_pages,
+            "estimated_bytes": sum(chunk.estimated_bytes for chunk in self.chunks),
+            "largest_chunk_bytes": max((chunk.estimated_bytes for chunk in self.chunks), default=0),
+            "merged_chunks": sum(1 for chunk in self.chunks if len(chunk.sections) > 1),
+            "max_pages": self.max_pages,
+            "max_bytes": self.max_bytes,
+            "chunks": [
+                {"pages": chunk.pages, "sections": [section for section, _ in chunk.sections], "estimated_bytes": chunk.estimated_bytes}
+                for chunk in self.chunks
+            ],
+        }
+
+
+def _stored_length(document, xref):
+    kind, value = document.xref_get_key(xref, "Length")
+    return int(value) if kind == "int" else 0
+
+
+def estimate_page(document, page_number, dpi, passthrough_mode=PDF_PASSTHROUGH_MODE):
+    """
+    Estimates how a page will be sent: (estimated bytes, passed through as text).
+
+    Text pages are estimated from their stored content streams and images, which
+    over-estimates uncompressed streams; scanned pages from their pixel count at `dpi`.
+    """
+    page = document[page_number - 1]
+    if passthrough_mode != "off" and page_has_text_layer(page):
+        stored = sum(_stored_length(document, xref) for xref in page.get_contents())
+        stored += sum(_stored_length(document, image[0]) for image in page.get_images(full=True))
+        return stored + PAGE_OVERHEAD_BYTES, True
+    pixels = (page.rect.width / 72 * dpi) * (page.rect.height / 72 * dpi)
+    return int(pixels * RASTER_BYTES_PER_PIXEL) + PAGE_OVERHEAD_BYTES, False
+
+
+def plan_chunks(
+    pdf_path, sections, model_id, max_bytes=AZURE_CHUNK_MAX_BYTES,
+    max_pages=None, min_chunks=AZURE_MAX_INFLIGHT_PER_DOCUMENT
+):
+    """
+    Packs the unique pages of `sections` into analyze requests.
+
+    Pages are taken in order of first reference, each once, even when several sections
+    list it. A request is closed when it reaches its page target (the remaining pages
+    spread over the requests still needed for `min_chunks`, capped by the model's page
+    limit) or when the next page would exceed `max_bytes`.
+
+    Models that cannot merge sections get requests per section instead, of up to their
+    page limit (`min_chunks` does not apply): a page shared by two sections is sent with
+    each, so each section gets the whole document of its form.
+
+    :param sections: List of (section, page list) tuples, e.g. from the page config.
+    :param model_id: Azure model the pages are sent to.
+    :param max_bytes: Estimated size limit of a chunk PDF; None when no PDF is built
+                      (server-side page selection), which also skips the size estimates.
+    :return: ChunkPlan
+    """
+    max_pages = max_pages or chunk_max_pages_for_model(model_id)
+    merge_sections = model_id not in SECTION_MERGE_EXCLUDED_MODELS
+    dpi = raster_dpi_for_model(model_id)
+    chunks = []
+
+    page_plan = FilePagePlan()
+    with fitz.open(pdf_path) as document:
+        estimates = {}
+        for section, pages in sections:
+            kept = []
+            for page_number in dict.fromkeys(pages):
+                if not 0 < page_number <= document.page_count:
+                    logger.warning(f"Page {page_number} of section {section} is out of range and was skipped")
+                    continue
+                if page_number not in estimates:
+                    estimates[page_number] = estimate_page(document, page_number, dpi) if max_bytes else (0, False)
+                kept.append(page_number)
+            page_plan.add_section(section, kept)
+
+    if merge_sections:
+        runs = [(None, page_plan.pages)]
+    else:
+        # Field models return one document per request, so every section keeps its own
+        # requests, shared pages included; those are still copied and charged once
+        runs = page_plan.sections
+    remaining = sum(len(pages) for _, pages in runs)
+    target_chunks = max(math.ceil(remaining / max_pages), min(min_chunks, remaining))
+    chunk_runs = []
+    for run_section, pages in runs:
+        current, target = None, 0
+        for page_number in pages:
+            estimated_bytes, is_text = estimates[page_number]
+            if current is not None and (
+                len(current.pages) >= target
+                or (max_bytes and current.estimated_bytes + estimated_bytes > max_bytes)
+            ):
+                current = None
+            if current is None:
+                current = PlannedChunk()
+                chunks.append(current)
+                chunk_runs.append(run_section)
+                # Field models read whole forms of up to max_pages pages, so their pages are never spread thinner
+                target = max_pages if not merge_sections else min(
+                    max_pages, math.ceil(remaining / max(1, target_chunks - len(chunks) + 1))
+                )
+            if max_bytes and estimated_bytes > max_bytes:
+                logger.warning(f"Page {page_number} is estimated at {estimated_bytes} bytes, above the {max_bytes} byte chunk limit")
+            current.add_page(page_number, estimated_bytes, is_text)
+            remaining -= 1
+
+    for chunk, run_section in zip(chunks, chunk_runs):
+        if run_section is not None:
+            chunk.sections.append((run_section, list(chunk.pages)))
+            continue
+        chunk_pages = set(chunk.pages)
+        for section, pages in page_plan.sections:
+            section_pages = [page_number for page_number in pages if page_number in chunk_pages]
+            if section_pages:
+                chunk.sections.append((section, section_pages))
+
+    return ChunkPlan(chunks, model_id, max_pages, max_bytes, page_plan)
+
+
+def _first_page(item):
+    regions = getattr(item, "bounding_regions", None)
+    if not regions and getattr(item, "key", None) is not None:
+        # Key-value pairs carry their regions on the key
+        regions = getattr(item.key, "bounding_regions", None)
+    return regions[0].page_number if regions else None
+
+
+class PageResultView:
+    """
+    Read-only view of an Azure AnalyzeResult restricted to some of its pages.
+
+    `pages`, `tables`, `paragraphs`, `key_value_pairs` and `documents` only hold the
+    items that start on one of the kept pages; items without a bounding region are
+    kept only when `keep_unplaced` is set. Every other attribute is the full result's.
+    Page numbers are the ones Azure reports: positions in the chunk PDF (1-based), or
+    source page numbers when Azure selected the pages itself.
+    """
+
+    FILTERED_ATTRIBUTES = ("tables", "paragraphs", "key_value_pairs", "documents")
+
+    def __init__(self, result, positions, keep_unplaced=False):
+        self._result = result
+        self.positions = set(positions)
+        self.pages = [page for page in (getattr(result, "pages", None) or []) if page.page_number in self.positions]
+        for name in self.FILTERED_ATTRIBUTES:
+            items = getattr(result, name, None)
+            if items is not None:
+                items = [
+                    item for item in items
+                    if (_first_page(item) in self.positions if _first_page(item) is not None else keep_unplaced)
+                ]
+            setattr(self, name, items)
+
+    def __getattr__(self, name):
+        return getattr(self._result, name)
+
+
+def section_result_view(result, chunk, section_index, source_numbering=False):
+    """
+    Returns the part of a chunk's result that belongs to `chunk.sections[section_index]`,
+    or the result itself when the chunk holds that section only.
+
+    :param source_numbering: True when Azure numbered the result pages as in the source
+                             document (server-side page selection) rather than by position
+                             in the chunk PDF.
+    """
+    if result is None or len(chunk.sections) == 1:
+        return result
+    section_pages = chunk.sections[section_index][1]
+    if not source_numbering:
+        positions = {page_number: position for position, page_number in enumerate(chunk.pages, start=1)}
+        section_pages = [positions[page_number] for page_number in section_pages]
+    return PageResultView(result, section_pages, keep_unplaced=section_index == 0)
@@ -0,0 +1,197 @@
+"""
+Process-wide scheduler for extraction work.
+
+Work runs on two fixed pools of threads ("lanes") shared by every request in the process:
+- file: one task per file of a request (extract_with_azure).
+- chunk: one task per page chunk analyzed by Azure.
+File tasks wait on their chunk tasks, so the lanes never share threads; chunk tasks
+always have workers even when every file worker is waiting.
+
+Inside a lane, queued tasks are grouped by tenant (the user's company, or the user
+when there is none) and workers take them round-robin across tenants, so one large
+batch cannot hold back everyone else. `map_in_order` additionally caps how many
+tasks of one call are queued or running at the same time.
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future
+from modules.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+# Files extracted at the same time across all requests of this process
+EXTRACTION_FILE_WORKERS = int(os.getenv("EXTRACTION_FILE_WORKERS", 4))
+# Azure chunk analyses running at the same time across all requests of this process: the only
+# process-wide in-flight limit (AZURE_MAX_INFLIGHT_PER_PROCESS is read as its older name)
+EXTRACTION_CHUNK_WORKERS = int(os.getenv("EXTRACTION_CHUNK_WORKERS", os.getenv("AZURE_MAX_INFLIGHT_PER_PROCESS", 8)))
+# Files of one request extracted at the same time
+EXTRACTION_FILES_PER_REQUEST = int(os.getenv("EXTRACTION_FILES_PER_REQUEST", 2))
+
+FILE_LANE = "file"
+CHUNK_LANE = "chunk"
+DEFAULT_TENANT = "default"
+
+_task_context = threading.local()
+
+
+def current_tenant():
+    """
+    Returns the tenant of the scheduler task running on this thread, or DEFAULT_TENANT.
+    """
+    return getattr(_task_context, "tenant", DEFAULT_TENANT)
+
+
+class SchedulerLane:
+    """
+    A fixed set of worker threads serving per-tenant queues round-robin.
+    """
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = max(1, workers)
+        self._condition = threading.Condition()
+        self._queues = {}  # tenant -> deque of (future, function, args)
+        self._ring = deque()  # tenants with queued tasks, in turn order
+        self._running = 0
+        self._completed = 0
+        self._threads = [
+            threading.Thread(target=self._work, name=f"extraction-{name}-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, tenant, function, *args):
+        """
+        Queues function(*args) for `tenant` and returns its Future.
+        """
+        future = Future()
+        with self._condition:
+            queue = self._queues.get(tenant)
+            if queue is None:
+                queue = self._queues[tenant] = deque()
+                self._ring.append(tenant)
+            queue.append((future, function, args))
+            self._condition.notify()
+        return future
+
+    def _next_task(self):
+        with self._condition:
+            while not self._ring:
+                self._condition.wait()
+            tenant = self._ring.popleft()
+            queue = self._queues[tenant]
+            task = queue.popleft()
+            if queue:
+                self._ring.append(tenant)
+            else:
+                del self._queues[tenant]
+            self._running += 1
+            return tenant, task
+
+    def _work(self):
+        while True:
+            tenant, (future, function, args) = self._next_task()
+            _task_context.tenant = tenant
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(function(*args))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                _task_context.tenant = DEFAULT_TENANT
+                with self._condition:
+                    self._running -= 1
+                    self._completed += 1
+
+    def metrics(self):
+        with self._condition:
+            queued_by_tenant = {str(tenant): len(queue) for tenant, queue in self._queues.items()}
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": sum(queued_by_tenant.values()),
+                "queued_by_tenant": queued_by_tenant,
+                "completed": self._completed,
+            }
+
+
+class ExtractionScheduler:
+    def __init__(self, file_workers=EXTRACTION_FILE_WORKERS, chunk_workers=EXTRACTION_CHUNK_WORKERS):
+        self.lanes = {
+            FILE_LANE: SchedulerLane(FILE_LANE, file_workers),
+            CHUNK_LANE: SchedulerLane(CHUNK_LANE, chunk_workers),
+        }
+
+    def submit(self, lane, tenant, function, *args):
+        return self.lanes[lane].submit(tenant, function, *args)
+
+    def map_in_order(self, lane, worker, items, max_in_flight, tenant=None):
+        """
+        Runs `worker` over every item on `lane` and returns the results in the order of `items`.
+        At most `max_in_flight` items of this call are queued or running at any time; the next
+        item is queued when one finishes. Exceptions raised by the worker propagate when the
+        results are collected.
+
+        Must not be called from a task of the same lane: the caller would hold a worker
+        while waiting for workers of that lane.
+
+        :param tenant: Tenant the tasks are queued under (default: the tenant of the calling task).
+        """
+        items = list(items)
+        if not items:
+            return []
+        tenant = tenant if tenant is not None else current_tenant()
+        futures = [None] * len(items)
+        next_index = iter(range(len(items)))
+        index_lock = threading.Lock()
+        remaining = [len(items)]
+        all_done = threading.Event()
+
+        def on_done(_):
+            with index_lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    all_done.set()
+            launch_next()
+
+        def launch_next():
+            with index_lock:
+                index = next(next_index, None)
+            if index is None:
+                return
+            future = self.submit(lane, tenant, worker, items[index])
+            futures[index] = future
+            future.add_done_callback(on_done)
+
+        for _ in range(max(1, min(max_in_flight, len(items)))):
+            launch_next()
+        all_done.wait()
+        return [future.result() for future in futures]
+
+    def metrics(self):
+        """
+        Queue depth, running and completed task counts per lane.
+        """
+        return {name: lane.metrics() for name, lane in self.lanes.items()}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_extraction_scheduler():
+    """
+    Returns the process-wide extraction scheduler, starting its workers on first use.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ExtractionScheduler()
+            logger.info(
+                f"Extraction scheduler started with {EXTRACTION_FILE_WORKERS} file workers "
+                f"and {EXTRACTION_CHUNK_WORKERS} chunk workers"
+            )
+    return _scheduler
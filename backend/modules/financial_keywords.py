@@ -0,0 +1,191 @@
+"""
+Financial keyword classifier shared by the table filter and the column heuristics.
+
+Keywords come from one lexicon: each keyword has a weight and optional variants
+(other spellings or languages) that count as the keyword itself. All keywords and
+variants are compiled once into an Aho-Corasick automaton, so a text is scanned in
+a single pass however many keywords the lexicon holds.
+
+Keywords match by substring ("incomes" contains "income"); variants only match as
+whole tokens, so short terms such as "आय" (income) do not match inside "आयात" (import).
+
+FINANCIAL_LEXICON_PATH may point to a JSON file that replaces the default lexicon:
+    {"revenue": {"weight": 1.0, "variants": ["revenues", "राजस्व"]}, "tax": {"weight": 0.5}}
+"""
+import os
+import re
+import json
+import unicodedata
+from collections import deque
+from .logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+DEFAULT_FINANCIAL_LEXICON = {
+    "revenue": {"weight": 1.0, "variants": ["राजस्व"]},
+    "income": {"weight": 1.0, "variants": ["आय"]},
+    "expenses": {"weight": 1.0, "variants": ["व्यय"]},
+    "profit": {"weight": 1.0, "variants": ["लाभ"]},
+    "loss": {"weight": 1.0, "variants": ["हानि"]},
+    "tax": {"weight": 1.0},
+    "earnings": {"weight": 1.0},
+    "depreciation": {"weight": 1.0, "variants": ["मूल्यह्रास"]},
+    "amortization": {"weight": 1.0, "variants": ["amortisation"]},
+    "comprehensive": {"weight": 1.0},
+    "share": {"weight": 1.0, "variants": ["शेयर"]},
+    "equity": {"weight": 1.0},
+    "cash": {"weight": 1.0, "variants": ["नकद"]},
+    "liabilities": {"weight": 1.0, "variants": ["देनदारियां"]},
+    "assets": {"weight": 1.0, "variants": ["परिसंपत्तियां"]},
+    "interest": {"weight": 1.0, "variants": ["ब्याज"]},
+    "dividend": {"weight": 1.0, "variants": ["लाभांश"]},
+    "reserve": {"weight": 1.0},
+    "financial": {"weight": 1.0, "variants": ["वित्तीय"]},
+    "investment": {"weight": 1.0, "variants": ["निवेश"]},
+    "retained": {"weight": 1.0},
+}
+FINANCIAL_LEXICON_PATH = os.getenv("FINANCIAL_LEXICON_PATH")
+# A table is financial when the weights of the keywords found in it add up to this
+FINANCIAL_TABLE_MIN_SCORE = float(os.getenv("FINANCIAL_TABLE_MIN_SCORE", 3))
+
+# Cells without any letter (amounts, dates, notes numbers) cannot hold a keyword
+_HAS_LETTER = re.compile(r"[^\W\d_]")
+
+
+class FinancialKeywordClassifier:
+    """
+    Aho-Corasick automaton over a keyword lexicon.
+
+    Matching is case-insensitive; keywords match by substring ("incomes" contains
+    "income"), variants on token boundaries. Every match is reported as the canonical
+    keyword, whichever variant matched.
+    """
+
+    def __init__(self, lexicon):
+        self.weights = {keyword.lower(): float(entry.get("weight", 1.0)) for keyword, entry in lexicon.items()}
+        patterns = {}
+        for keyword, entry in lexicon.items():
+            for position, pattern in enumerate([keyword] + list(entry.get("variants", []))):
+                if pattern.strip():
+                    # A keyword that is also listed as a variant keeps substring matching
+                    patterns.setdefault(pattern.lower(), (keyword.lower(), position > 0))
+        self._goto, self._fail, self._output = _build_automaton(patterns)
+
+    def find(self, text):
+        """
+        Returns the set of canonical keywords found in `text`.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        text = text.lower()
+        found = set()
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for keyword, length, bounded in output[state]:
+                    if not bounded or _is_token(text, index + 1 - length, index + 1):
+                        found.add(keyword)
+        return found
+
+    def score(self, keywords):
+        """
+        Returns the summed weight of a set of canonical keywords.
+        """
+        return sum(self.weights.get(keyword, 0.0) for keyword in keywords)
+
+    def scan_texts(self, texts):
+        """
+        Finds the keywords present anywhere in `texts` (e.g. every cell of a table).
+
+        Returns:
+            tuple: (score, set of canonical keywords found)
+        """
+        distinct = {text for text in texts if isinstance(text, str) and _HAS_LETTER.search(text)}
+        # Keywords never contain a newline, so none can match across two texts
+        keywords = self.find("\n".join(distinct))
+        return self.score(keywords), keywords
+
+    def column_ratio(self, values):
+        """
+        Returns the share of `values` holding at least one keyword. Non-string values count as misses.
+        """
+        if len(values) == 0:
+            return 0
+        matches = 0
+        seen = {}
+        for value in values:
+            if not isinstance(value, str):
+                continue
+            hit = seen.get(value)
+            if hit is None:
+                hit = seen[value] = bool(_HAS_LETTER.search(value)) and bool(self.find(value))
+            matches += hit
+        return matches / len(values)
+
+
+def _is_word_char(char):
+    # Devanagari vowel signs are combining marks, not letters, but still part of the word
+    return char.isalnum() or char == "_" or unicodedata.category(char).startswith("M")
+
+
+def _is_token(text, start, end):
+    """
+    True when text[start:end] is neither preceded nor followed by a word character.
+    """
+    return (start == 0 or not _is_word_char(text[start - 1])) and (end == len(text) or not _is_word_char(text[end]))
+
+
+def _build_automaton(patterns):
+    """
+    Builds the goto/fail/output tables for a {pattern: (canonical keyword, bounded)} mapping.
+    Outputs are (keyword, pattern length, bounded) tuples; bounded patterns only count
+    as whole tokens.
+    """
+    goto, fail, output = [{}], [0], [frozenset()]
+    for pattern, (keyword, bounded) in patterns.items():
+        state = 0
+        for char in pattern:
+            next_state = goto[state].get(char)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][char] = next_state
+                goto.append({})
+                fail.append(0)
+                output.append(frozenset())
+            state = next_state
+        output[state] = output[state] | {(keyword, len(pattern), bounded)}
+
+    # Breadth-first, so the fail state of every node is final before its children need it
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for char, next_state in goto[state].items():
+            queue.append(next_state)
+            fallback = fail[state]
+            while fallback and char not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[next_state] = goto[fallback].get(char, 0)
+            output[next_state] = output[next_state] | output[fail[next_state]]
+    return goto, fail, output
+
+
+def load_financial_lexicon(path=FINANCIAL_LEXICON_PATH):
+    """
+    Loads the lexicon from `path`, falling back to DEFAULT_FINANCIAL_LEXICON when
+    no path is set or the file cannot be read.
+    """
+    if not path:
+        return DEFAULT_FINANCIAL_LEXICON
+    try:
+        with open(path, encoding="utf-8") as lexicon_file:
+            lexicon = json.load(lexicon_file)
+        logger.info(f"Loaded {len(lexicon)} financial keywords from {path}")
+        return lexicon
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to load financial lexicon from {path}: {e}. Using the default lexicon.")
+        return DEFAULT_FINANCIAL_LEXICON
+
+
+FINANCIAL_CLASSIFIER = FinancialKeywordClassifier(load_financial_lexicon())
@@ -7,6 +7,13 @@ LOG_FILE_PATH = '/app/logs/app.log'  # Main log file
 LOG_MAX_BYTES = 10 * 1024 * 1024  # 10 MB
 LOG_BACKUP_COUNT = 15  # Keep up to 15 backup log files
 LOG_RETENTION_DAYS = 2  # Retain logs for 2 days
+# Large payloads (tables, lists, dicts) are logged as a sample of this many rows/items...
+LOG_PAYLOAD_MAX_ITEMS = int(os.getenv("LOG_PAYLOAD_MAX_ITEMS", 5))
+# ...and cut to this many characters
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", 2000))
+# When enabled, dump_table writes full tables to LOG_DEBUG_DUMP_DIR
+LOG_DEBUG_DUMPS = os.getenv("LOG_DEBUG_DUMPS", "false").lower() == "true"
+LOG_DEBUG_DUMP_DIR = os.getenv("LOG_DEBUG_DUMP_DIR", os.path.join(os.path.dirname(LOG_FILE_PATH), "dumps"))
 
 class CustomRotatingFileHandler(RotatingFileHandler):
     def rotation_filename(self, default_name):
@@ -59,16 +66,83 @@ def setup_logger(source_file):
     logger.addFilter(ContextFilter(source_file))
     return logger
 
+def summarize_payload(payload, max_items=LOG_PAYLOAD_MAX_ITEMS, max_chars=LOG_PAYLOAD_MAX_CHARS):
+    """
+    Renders a short text for a log line: DataFrames as their shape plus the first rows,
+    lists and dicts as their first items, everything cut to max_chars.
+    """
+    if hasattr(payload, "shape") and hasattr(payload, "head"):  # DataFrame / Series
+        text = f"<{type(payload).__name__} shape={payload.shape}>\n{payload.head(max_items).to_string()}"
+        if len(payload) > max_items:
+            text += f"\n... {len(payload) - max_items} more rows"
+    elif isinstance(payload, dict):
+        items = [f"{key!r}: {summarize_payload(value, max_items, max_chars)}" for key, value in list(payload.items())[:max_items]]
+        more = f", ... {len(payload) - max_items} more" if len(payload) > max_items else ""
+        text = "{" + ", ".join(items) + more + "}"
+    elif isinstance(payload, (list, tuple)):
+        items = [summarize_payload(value, max_items, max_chars) for value in payload[:max_items]]
+        more = f", ... {len(payload) - max_items} more" if len(payload) > max_items else ""
+        text = "[" + ", ".join(items) + more + "]"
+    else:
+        text = str(payload)
+    if len(text) > max_chars:
+        text = f"{text[:max_chars]}... [{len(text) - max_chars} more chars]"
+    return text
+
+
+class LazyPayload:
+    """
+    Wraps a log argument so it is only summarized when a handler actually formats the record:
+        logger.info("Final table: %s", lazy(df_table))
+    """
+    __slots__ = ("payload", "max_items", "max_chars")
+
+    def __init__(self, payload, max_items=LOG_PAYLOAD_MAX_ITEMS, max_chars=LOG_PAYLOAD_MAX_CHARS):
+        self.payload = payload
+        self.max_items = max_items
+        self.max_chars = max_chars
+
+    def __str__(self):
+        return summarize_payload(self.payload, self.max_items, self.max_chars)
+
+
+def lazy(payload, max_items=LOG_PAYLOAD_MAX_ITEMS, max_chars=LOG_PAYLOAD_MAX_CHARS):
+    return LazyPayload(payload, max_items, max_chars)
+
+
+def dump_table(df, name):
+    """
+    Writes the full table to LOG_DEBUG_DUMP_DIR as CSV when LOG_DEBUG_DUMPS is enabled.
+
+    :return: The dump path, or None when dumps are disabled or the write failed.
+    """
+    if not LOG_DEBUG_DUMPS:
+        return None
+    safe_name = "".join(char if char.isalnum() or char in "-_." else "_" for char in str(name))
+    path = os.path.join(LOG_DEBUG_DUMP_DIR, f"{datetime.now():%Y%m%d_%H%M%S_%f}_{safe_name}.csv")
+    try:
+        os.makedirs(LOG_DEBUG_DUMP_DIR, exist_ok=True)
+        df.to_csv(path, index=False)
+        logging.getLogger("ApplicationLogger").debug(f"Dumped table {name} to {path}")
+        return path
+    except Exception as e:
+        logging.getLogger("ApplicationLogger").warning(f"Failed to dump table {name}: {e}")
+        return None
+
+
 def cleanup_old_logs():
-    """Remove log files older than LOG_RETENTION_DAYS."""
+    """Remove log files and table dumps older than LOG_RETENTION_DAYS."""
     cutoff_date = datetime.now() - timedelta(days=LOG_RETENTION_DAYS)
-    for filename in os.listdir(os.path.dirname(LOG_FILE_PATH)):
-        file_path = os.path.join(os.path.dirname(LOG_FILE_PATH), filename)
-        if os.path.isfile(file_path):
-            file_mod_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-            if file_mod_time < cutoff_date:
-                os.remove(file_path)
-                logging.getLogger("ApplicationLogger").info(f"Deleted old log file: {file_path}")
+    for folder in (os.path.dirname(LOG_FILE_PATH), LOG_DEBUG_DUMP_DIR):
+        if not os.path.isdir(folder):
+            continue
+        for filename in os.listdir(folder):
+            file_path = os.path.join(folder, filename)
+            if os.path.isfile(file_path):
+                file_mod_time = datetime.fromtimestamp(os.path.getmtime(file_path))
+                if file_mod_time < cutoff_date:
+                    os.remove(file_path)
+                    logging.getLogger("ApplicationLogger").info(f"Deleted old log file: {file_path}")
 
 # Log uncaught exceptions
 def log_uncaught_exceptions(exc_type, exc_value, exc_traceback):
@@ -0,0 +1,125 @@
+"""
+Plans the pages of a file once, however many sections of the page config reference them.
+
+Sections often overlap (e.g. "Balance Sheet" 5-7 and "Notes" 6-9). The plan keeps
+every section's own page list but holds each physical page only once, with the
+sections that reference it: the sliced PDF contains the page once, Azure analyzes
+it once, its result is handed to every referencing section, and credits are charged
+for the unique pages only.
+"""
+from modules.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def parse_page_range(page_range):
+    if isinstance(page_range, list):
+        return page_range
+    elif isinstance(page_range, str):
+        return list(parse_page_ranges(page_range.replace(" ", "").strip()))
+    else:
+        raise ValueError(f"Invalid page_range format: {page_range}")
+
+
+def parse_page_ranges(page_ranges):
+    """
+    Converts a page range string like "1,3-4" to a list of individual page numbers.
+    """
+    pages = set()
+    ranges = page_ranges.split(",")
+    for r in ranges:
+        if "-" in r:
+            start, end = map(int, r.split("-"))
+            pages.update(range(start, end + 1))
+        else:
+            pages.add(int(r))
+    return sorted(pages)
+
+
+class FilePagePlan:
+    """
+    The pages of one file referenced by its page config.
+
+    Attributes:
+        sections (list): (section, pages) tuples in config order; a page may be in several sections.
+        pages (list): Unique page numbers, in order of first reference.
+        page_sections (dict): Page number -> sections referencing it, in config order.
+        skipped_sections (list): Sections without any valid page.
+    """
+
+    def __init__(self):
+        self.sections = []
+        self.pages = []
+        self.page_sections = {}
+        self.skipped_sections = []
+
+    @property
+    def referenced_pages(self):
+        """
+        Number of pages the sections add up to, counting shared pages once per section.
+        """
+        return sum(len(pages) for _, pages in self.sections)
+
+    @property
+    def shared_pages(self):
+        return [page_number for page_number in self.pages if len(self.page_sections[page_number]) > 1]
+
+    def add_section(self, section, pages):
+        if not pages:
+            self.skipped_sections.append(section)
+            return
+        self.sections.append((section, pages))
+        for page_number in pages:
+            if page_number not in self.page_sections:
+                self.page_sections[page_number] = []
+                self.pages.append(page_number)
+            self.page_sections[page_number].append(section)
+
+    def summary(self):
+        return {
+            "sections": len(self.sections),
+            "referenced_pages": self.referenced_pages,
+            "unique_pages": len(self.pages),
+            "shared_pages": self.shared_pages,
+        }
+
+
+def plan_file_pages(file_config, page_count=None, file_name=None):
+    """
+    Builds the page plan of one file from its page config.
+
+    :param file_config: {section: {'pageRange': '5-7', ...}} for one file, or
+                        {section: page list}.
+    :param page_count: Pages of the file; when given, pages outside it are dropped.
+    :param file_name: Only used in log messages.
+    :raises ValueError: When a section config or page range is invalid.
+    :return: FilePagePlan
+    """
+    plan = FilePagePlan()
+    for section, config in file_config.items():
+        if isinstance(config, dict):
+            page_range = config.get('pageRange', '')
+        elif isinstance(config, list):
+            page_range = config
+        else:
+            raise ValueError(f"Expected a dictionary for section config, got {type(config).__name__}: {config}")
+
+        try:
+            pages = parse_page_range(page_range)
+        except ValueError:
+            raise ValueError(f"Invalid page range format: {page_range}")
+
+        kept = []
+        for page_number in dict.fromkeys(pages):
+            if page_count is not None and not 0 < page_number <= page_count:
+                logger.warning(f"Page {page_number} of section {section} is out of range for {file_name or 'the file'}")
+                continue
+            kept.append(page_number)
+        plan.add_section(section, kept)
+
+    if plan.shared_pages:
+        logger.info(
+            f"{file_name or 'File'}: {plan.referenced_pages} section pages map to {len(plan.pages)} unique pages "
+            f"(shared: {plan.shared_pages})"
+        )
+    return plan
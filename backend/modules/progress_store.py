@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import threading
+from modules.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+# "memory" keeps progress in this process (web process + local job backend),
+# "redis" shares it between web and Celery worker processes. With Celery, a Redis
+# broker doubles as the progress store unless PROGRESS_REDIS_URL says otherwise.
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL") or ""
+PROGRESS_REDIS_URL = os.getenv("PROGRESS_REDIS_URL") or (
+    CELERY_BROKER_URL if CELERY_BROKER_URL.startswith(("redis://", "rediss://")) else None
+)
+PROGRESS_STORE_BACKEND = os.getenv("PROGRESS_STORE_BACKEND", "redis" if PROGRESS_REDIS_URL else "memory").lower()
+PROGRESS_TTL_SECONDS = int(os.getenv("PROGRESS_TTL_SECONDS", 6 * 60 * 60))  # 6 hours
+
+FINAL_STAGES = ("completed", "failed")
+
+
+class InMemoryProgressStore:
+    """
+    Job-keyed progress records held in memory. Readers block on a condition
+    until a record's version changes instead of polling.
+    """
+
+    def __init__(self, ttl_seconds=PROGRESS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.records = {}
+        self.latest_jobs = {}
+        self.condition = threading.Condition()
+
+    def initialize(self, job_id, **fields):
+        """
+        Creates the record for a job unless the worker already started publishing to it.
+        """
+        with self.condition:
+            self._prune()
+            if job_id not in self.records:
+                self.records[job_id] = {**fields, "version": 1, "updated_at": time.time()}
+                self.condition.notify_all()
+
+    def publish(self, job_id, **fields):
+        with self.condition:
+            record = self.records.setdefault(job_id, {"version": 0})
+            record.update(fields, version=record["version"] + 1, updated_at=time.time())
+            self.condition.notify_all()
+
+    def get(self, job_id):
+        with self.condition:
+            record = self.records.get(job_id)
+            return dict(record) if record else None
+
+    def wait_for_update(self, job_id, after_version, timeout):
+        """
+        Returns the record once its version is newer than `after_version`, or None after `timeout` seconds.
+        """
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                record = self.records.get(job_id)
+                if record and record["version"] > after_version:
+                    return dict(record)
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+    def set_latest_job(self, user_id, job_id):
+        with self.condition:
+            self.latest_jobs[user_id] = job_id
+
+    def get_latest_job(self, user_id):
+        with self.condition:
+            return self.latest_jobs.get(user_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [job_id for job_id, record in self.records.items() if record["updated_at"] < cutoff]:
+            del self.records[job_id]
+
+
+class RedisProgressStore:
+    """
+    Job-keyed progress records in Redis, so Celery workers and web processes share them.
+    Each record is a JSON value with a TTL; every update is also published on a per-job channel.
+    """
+
+    def __init__(self, redis_url, ttl_seconds=PROGRESS_TTL_SECONDS):
+        import redis
+        self.redis = redis.Redis.from_url(redis_url)
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(job_id):
+        return f"progress:{job_id}"
+
+    @staticmethod
+    def _channel(job_id):
+        return f"progress-events:{job_id}"
+
+    def initialize(self, job_id, **fields):
+        record = {**fields, "version": 1, "updated_at": time.time()}
+        if self.redis.set(self._key(job_id), json.dumps(record), ex=self.ttl_seconds, nx=True):
+            self.redis.publish(self._channel(job_id), record["version"])
+
+    def publish(self, job_id, **fields):
+        # Writers for one job live in one worker process, so a process-local lock is enough
+        with self.lock:
+            record = self.get(job_id) or {"version": 0}
+            record.update(fields, version=record["version"] + 1, updated_at=time.time())
+            self.redis.set(self._key(job_id), json.dumps(record), ex=self.ttl_seconds)
+        self.redis.publish(self._channel(job_id), record["version"])
+
+    def get(self, job_id):
+        value = self.redis.get(self._key(job_id))
+        return json.loads(value) if value else None
+
+    def wait_for_update(self, job_id, after_version, timeout):
+        record = self.get(job_id)
+        if record and record["version"] > after_version:
+            return record
+
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(self._channel(job_id))
+            # Re-check after subscribing so an update between get() and subscribe() is not missed
+            record = self.get(job_id)
+            if record and record["version"] > after_version:
+                return record
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                if pubsub.get_message(timeout=max(0.0, deadline - time.time())):
+                    record = self.get(job_id)
+                    if record and record["version"] > after_version:
+                        return record
+            return None
+        finally:
+            pubsub.close()
+
+    def set_latest_job(self, user_id, job_id):
+        self.redis.set(f"progress-latest:{user_id}", job_id, ex=self.ttl_seconds)
+
+    def get_latest_job(self, user_id):
+        value = self.redis.get(f"progress-latest:{user_id}")
+        return value.decode("utf-8") if value else None
+
+
+_progress_store = None
+_progress_store_lock = threading.Lock()
+
+
+def get_progress_store():
+    """
+    Returns the process-wide progress store for the configured backend.
+    """
+    global _progress_store
+    with _progress_store_lock:
+        if _progress_store is None:
+            if PROGRESS_STORE_BACKEND == "redis":
+                _progress_store = RedisProgressStore(PROGRESS_REDIS_URL)
+            else:
+                _progress_store = InMemoryProgressStore()
+            logger.info(f"Progress store uses the {PROGRESS_STORE_BACKEND} backend")
+    return _progress_store
@@ -1,6 +1,7 @@
 from threading import Lock
 import logging
 from PyPDF2 import PdfReader
+from modules.progress_store import get_progress_store
 
 import os
 
@@ -11,17 +12,27 @@ class ProgressTracker:
     A class to encapsulate progress tracking logic, avoiding global variables.
     """
 
-    def __init__(self):
+    def __init__(self, progress_store=None):
         self.total_pages_processed = 0  # Instance variable to track total pages processed
+        self.last_published_progress = None
+        self.progress_store = progress_store or get_progress_store()
         self.lock = Lock()  # Lock to ensure thread-safe updates
 
-    def initialize_progress(self, progress_file):
+    def initialize_progress(self, progress_key, **fields):
         """
-        Initializes the progress tracker file.
+        Initializes the progress record of a job.
+
+        :param progress_key: Key of the job in the progress store (the job id)
+        :param fields: Extra fields stored with the record (e.g. user_id of the job owner)
         """
-        with open(progress_file, 'w') as pf:
-            pf.write('0')
         self.reset_progress()
+        self.progress_store.publish(progress_key, progress=0, pages_processed=0, stage="initializing", **fields)
+
+    def set_stage(self, progress_key, stage, **fields):
+        """
+        Publishes a pipeline stage change (e.g. "downloading", "analyzing", "completed").
+        """
+        self.progress_store.publish(progress_key, stage=stage, **fields)
     
     def get_total_pages(self, filename, upload_folder):
         """
@@ -55,11 +66,12 @@ class ProgressTracker:
                 print(f"Error processing file {filename}: {e}")
         return total_pages
 
-    def update_progress(self, progress_file, pages_processed_in_task, total_pages, completion=False):
+    def update_progress(self, progress_key, pages_processed_in_task, total_pages, completion=False):
         """
-        Updates the progress file by aggregating progress from all tasks.
+        Aggregates progress from all tasks and publishes it to the progress store.
+        Only changes of the whole-percent value are published, so per-table calls stay cheap.
 
-        :param progress_file: Path to the progress file
+        :param progress_key: Key of the job in the progress store (the job id)
         :param pages_processed_in_task: Number of pages processed in the current task
         :param total_pages: Total number of pages to process across all tasks
         :param completion: Boolean flag indicating if the task is complete
@@ -80,17 +92,21 @@ class ProgressTracker:
                 else:
                     progress = min(int((self.total_pages_processed / total_pages) * 100), 99)
 
+                if progress == self.last_published_progress:
+                    return
+                self.last_published_progress = progress
+
                 # Log progress
                 logger.info(
                     f"Updating progress: {progress}% (Processed: {self.total_pages_processed}/{total_pages} pages)"
                 )
 
-                # Write progress to the file
                 try:
-                    with open(progress_file, 'w') as pf:
-                        pf.write(str(progress))
+                    self.progress_store.publish(
+                        progress_key, progress=progress, pages_processed=self.total_pages_processed, total_pages=total_pages
+                    )
                 except Exception as e:
-                    logger.error(f"Error writing to progress file: {e}")
+                    logger.error(f"Error publishing progress: {e}")
 
         except Exception as e:
             logger.error(f"Error updating progress: {e}")
@@ -102,4 +118,5 @@ class ProgressTracker:
         """
         with self.lock:
             self.total_pages_processed = 0
+            self.last_published_progress = None
             logger.info("Progress tracker reset successfully.")
@@ -0,0 +1,116 @@
+import os
+import math
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz  # PyMuPDF
+from modules.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+# Worker processes rendering scanned pages; defaults to one per core
+RASTER_POOL_SIZE = int(os.getenv("RASTER_POOL_SIZE", os.cpu_count() or 1))
+RASTER_DPI_DEFAULT = int(os.getenv("RASTER_DPI_DEFAULT", 300))
+# Handwriting needs full resolution; printed text OCRs fine at a lower DPI
+DEFAULT_RASTER_DPI_BY_MODEL = {
+    "MutualFundModelSundaramFinance": 300,
+    "prebuilt-read": 200,
+}
+
+
+def parse_dpi_overrides(value):
+    """
+    Parses "model=dpi,model=dpi" into a dictionary, ignoring malformed entries.
+    """
+    overrides = {}
+    for entry in (value or "").split(","):
+        model, _, dpi = entry.partition("=")
+        if model.strip() and dpi.strip().isdigit():
+            overrides[model.strip()] = int(dpi)
+    return overrides
+
+
+RASTER_DPI_BY_MODEL = {**DEFAULT_RASTER_DPI_BY_MODEL, **parse_dpi_overrides(os.getenv("RASTER_DPI_BY_MODEL"))}
+
+
+def raster_dpi_for_model(model_id):
+    """
+    Returns the rasterization DPI to use for pages sent to `model_id`.
+    """
+    return RASTER_DPI_BY_MODEL.get(model_id, RASTER_DPI_DEFAULT)
+
+
+def render_pages_to_pdf(pdf_path, page_numbers, dpi):
+    """
+    Renders pages as grayscale images, each wrapped in a one-page PDF of the original page size.
+    Runs inside the worker processes, so it only takes picklable arguments.
+
+    :param pdf_path: Path to the source PDF.
+    :param page_numbers: 1-based page numbers to render.
+    :param dpi: Render resolution.
+    :return: List of (page_number, pdf_bytes) tuples in the given order.
+    """
+    rendered = []
+    with fitz.open(pdf_path) as source:
+        for page_number in page_numbers:
+            page = source[page_number - 1]
+            # Grayscale for better OCR and smaller payloads
+            pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+            with fitz.open() as image_doc:
+                image_page = image_doc.new_page(width=page.rect.width, height=page.rect.height)
+                image_page.insert_image(image_page.rect, pixmap=pixmap)
+                rendered.append((page_number, image_doc.tobytes(garbage=3, deflate=True, no_new_id=True)))
+    return rendered
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the web/worker processes are multi-threaded, so forking them is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=RASTER_POOL_SIZE, mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Rasterization process pool started with {RASTER_POOL_SIZE} workers")
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def rasterize_pages(pdf_path, page_numbers, dpi=RASTER_DPI_DEFAULT):
+    """
+    Rasterizes pages across the process pool, splitting them into one batch per worker.
+    Falls back to rendering in the calling process for a single page or a broken pool.
+
+    :param pdf_path: Path to the source PDF.
+    :param page_numbers: 1-based page numbers to render.
+    :param dpi: Render resolution.
+    :return: Dictionary of page number -> one-page PDF bytes.
+    """
+    page_numbers = list(page_numbers)
+    if not page_numbers:
+        return {}
+    if RASTER_POOL_SIZE <= 1 or len(page_numbers) == 1:
+        return dict(render_pages_to_pdf(pdf_path, page_numbers, dpi))
+
+    batch_size = math.ceil(len(page_numbers) / RASTER_POOL_SIZE)
+    batches = [page_numbers[i:i + batch_size] for i in range(0, len(page_numbers), batch_size)]
+    try:
+        pool = _get_pool()
+        futures = [pool.submit(render_pages_to_pdf, pdf_path, batch, dpi) for batch in batches]
+        return {page_number: pdf_bytes for future in futures for page_number, pdf_bytes in future.result()}
+    except BrokenProcessPool as e:
+        logger.error(f"Rasterization pool failed ({e}); rendering {len(page_numbers)} pages in-process")
+        _reset_pool()
+        return dict(render_pages_to_pdf(pdf_path, page_numbers, dpi))
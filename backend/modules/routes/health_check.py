@@ -1,5 +1,6 @@
 import time
 from flask import jsonify, Blueprint
+from modules.services.analysis_client import get_analysis_client_registry
 
 health_bp = Blueprint('health', __name__)
 
@@ -26,3 +27,14 @@ def health_check():
     
     # Instead of returning 429, return 200 with a "waiting" status
     return jsonify({"status": "waiting", "time_remaining": time_remaining}), 200  # ✅ Always return 200
+
+
+@health_bp.route('/azure-client', methods=['GET'])
+def azure_client_metrics():
+    """
+    Connection pool and reuse metrics of the shared Azure analysis client.
+    """
+    registry = get_analysis_client_registry()
+    if registry is None:
+        return jsonify({"status": "uninitialized"}), 200
+    return jsonify({"status": "ok", **registry.metrics()}), 200
@@ -0,0 +1,122 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from azure.ai.formrecognizer import DocumentAnalysisClient
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import RequestsTransport
+from modules.logging_util import setup_logger
+from modules.azure_rate_limiter import ThrottleReportingHook
+
+logger = setup_logger(__name__)
+
+# HTTP keep-alive pool shared by every Azure analysis in this process
+AZURE_HTTP_POOL_SIZE = int(os.getenv("AZURE_HTTP_POOL_SIZE", 16))
+AZURE_HTTP_CONNECTION_TIMEOUT = int(os.getenv("AZURE_HTTP_CONNECTION_TIMEOUT", 30))
+AZURE_HTTP_READ_TIMEOUT = int(os.getenv("AZURE_HTTP_READ_TIMEOUT", 120))
+
+# Retry policy applied by the SDK pipeline (connection errors, 408/5xx, throttled polling).
+# Throttled submissions are retried by the shared rate limiter instead (see azure_rate_limiter).
+AZURE_RETRY_TOTAL = int(os.getenv("AZURE_RETRY_TOTAL", 3))
+AZURE_RETRY_BACKOFF_FACTOR = float(os.getenv("AZURE_RETRY_BACKOFF_FACTOR", 0.8))
+AZURE_RETRY_BACKOFF_MAX = int(os.getenv("AZURE_RETRY_BACKOFF_MAX", 60))
+
+
+class AnalysisClientRegistry:
+    """
+    Owns the process-wide `DocumentAnalysisClient` and its HTTP connection pool.
+
+    The client is thread-safe, so every extraction thread shares it and reuses
+    kept-alive TLS connections instead of building a new pipeline per file.
+    """
+
+    def __init__(self, endpoint, key, pool_size=AZURE_HTTP_POOL_SIZE):
+        self.endpoint = endpoint
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        transport = RequestsTransport(
+            session=self.session,
+            session_owner=False,
+            connection_timeout=AZURE_HTTP_CONNECTION_TIMEOUT,
+            read_timeout=AZURE_HTTP_READ_TIMEOUT
+        )
+        self.client = DocumentAnalysisClient(
+            endpoint=endpoint,
+            credential=AzureKeyCredential(key),
+            transport=transport,
+            retry_total=AZURE_RETRY_TOTAL,
+            retry_backoff_factor=AZURE_RETRY_BACKOFF_FACTOR,
+            retry_backoff_max=AZURE_RETRY_BACKOFF_MAX,
+            raw_response_hook=ThrottleReportingHook()
+        )
+        logger.info(f"Shared DocumentAnalysisClient created for {endpoint} (pool size {pool_size})")
+
+    def metrics(self):
+        """
+        Returns connection reuse counters aggregated over the pooled hosts.
+        `requests - connections_opened` is the number of requests served on a reused connection.
+        """
+        pools = self.adapter.poolmanager.pools
+        connections_opened, requests_sent, idle_connections = 0, 0, 0
+        for pool_key in list(pools.keys()):
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            connections_opened += pool.num_connections
+            requests_sent += pool.num_requests
+            # The pool queue is pre-filled with None placeholders; only real connections count as idle
+            idle_connections += sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0
+
+        reused = max(0, requests_sent - connections_opened)
+        return {
+            "endpoint": self.endpoint,
+            "pool_size": self.pool_size,
+            "hosts": len(pools),
+            "connections_opened": connections_opened,
+            "requests": requests_sent,
+            "reused_requests": reused,
+            "reuse_ratio": round(reused / requests_sent, 3) if requests_sent else None,
+            "idle_connections": idle_connections,
+        }
+
+    def close(self):
+        self.client.close()
+        self.session.close()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def init_analysis_client_registry(endpoint, key):
+    """
+    Creates the process-wide registry once. Called from `create_app`; later calls return the same instance.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = AnalysisClientRegistry(endpoint, key)
+    return _registry
+
+
+def get_analysis_client_registry():
+    """
+    Returns the process-wide registry, or None if it has not been initialized.
+    """
+    return _registry
+
+
+def get_document_analysis_client(endpoint, key):
+    """
+    Returns the shared DocumentAnalysisClient, initializing the registry on first use
+    (e.g. in worker processes that do not go through `create_app`).
+    """
+    registry = _registry or init_analysis_client_registry(endpoint, key)
+    if registry.endpoint != endpoint:
+        logger.warning(f"Requested endpoint {endpoint} differs from shared client endpoint {registry.endpoint}")
+    return registry.client
@@ -1,9 +1,11 @@
-from azure.storage.blob import BlobServiceClient
+from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
+from azure.core import MatchConditions
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 import os
 from datetime import datetime, timedelta
 from modules.logging_util import setup_logger
+from modules.services.pdf_page_counter import count_pdf_pages_with_ranged_reads, PageCountUnavailable
 import tempfile
 import fitz  # PyMuPDF
 import re
@@ -11,6 +13,36 @@ import tempfile
 
 logger = setup_logger(__name__)
 
+PAGE_COUNT_METADATA_KEY = "page_count"
+# Write the page count of blobs uploaded without it back to their metadata when validating them.
+# Off by default: validation is otherwise read-only, and a metadata write changes the blob's ETag.
+CACHE_PAGE_COUNT_ON_READ = os.getenv("CACHE_PAGE_COUNT_ON_READ", "false").lower() in ['true', '1', 'yes']
+
+# Transfer tuning: large blobs move in blocks/chunks over several connections with bounded memory
+BLOB_MAX_CONCURRENCY = int(os.getenv("AZURE_BLOB_MAX_CONCURRENCY", 4))
+BLOB_BLOCK_SIZE = int(os.getenv("AZURE_BLOB_BLOCK_SIZE", 4 * 1024 * 1024))  # 4 MB upload blocks
+BLOB_SINGLE_PUT_SIZE = int(os.getenv("AZURE_BLOB_SINGLE_PUT_SIZE", 8 * 1024 * 1024))  # Larger uploads are split into blocks
+BLOB_CHUNK_GET_SIZE = int(os.getenv("AZURE_BLOB_CHUNK_GET_SIZE", 4 * 1024 * 1024))  # 4 MB download chunks
+
+
+def pdf_page_count_metadata(local_file_path=None, content=None):
+    """
+    Builds blob metadata holding the page count of a PDF so later validations can read it
+    with a single properties request. Returns None for non-PDF or unreadable content.
+    """
+    try:
+        if content is not None:
+            pdf_document = fitz.open(stream=content, filetype="pdf")
+        elif local_file_path and local_file_path.lower().endswith(".pdf"):
+            pdf_document = fitz.open(local_file_path)
+        else:
+            return None
+        with pdf_document:
+            return {PAGE_COUNT_METADATA_KEY: str(pdf_document.page_count)}
+    except Exception as e:
+        logger.warning(f"Could not determine page count for blob metadata: {e}")
+        return None
+
 
 class AzureBlobService:
     def __init__(self, connection_string, container_name):
@@ -18,7 +50,14 @@ class AzureBlobService:
         Initialize the AzureBlobService with a connection string and container name.
         """
         logger.info("Initializing AzureBlobService...")
-        self.blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+        self.blob_service_client = BlobServiceClient.from_connection_string(
+            connection_string,
+            max_block_size=BLOB_BLOCK_SIZE,
+            max_single_put_size=BLOB_SINGLE_PUT_SIZE,
+            max_single_get_size=BLOB_CHUNK_GET_SIZE,
+            max_chunk_get_size=BLOB_CHUNK_GET_SIZE
+        )
+        self.max_concurrency = BLOB_MAX_CONCURRENCY
         self.container_name = container_name
         self.container_client = self.blob_service_client.get_container_client(container_name)
         logger.info(f"AzureBlobService initialized with container: {container_name}")
@@ -52,14 +91,38 @@ class AzureBlobService:
         blob_name = f"uploads/{date_folder}/{user_id}/{folder_type}/{filename}"
         try:
             blob_client = self.container_client.get_blob_client(blob_name)
+            metadata = pdf_page_count_metadata(local_file_path) if filename.lower().endswith(".pdf") else None
             with open(local_file_path, 'rb') as data:
-                blob_client.upload_blob(data, overwrite=True)
+                blob_client.upload_blob(
+                    data, overwrite=True, metadata=metadata,
+                    length=os.path.getsize(local_file_path), max_concurrency=self.max_concurrency
+                )
             logger.info(f"Uploaded file {local_file_path} to {blob_name}")
         except Exception as e:
             logger.error(f"Failed to upload file {local_file_path}: {e}")
             raise
         return [blob_name]
 
+    def upload_bytes(self, user_id, data, filename, folder_type='user_upload'):
+        """
+        Upload in-memory content to Azure Blob Storage.
+        :param user_id: User ID to organize files in their specific folder.
+        :param data: Bytes to upload.
+        :param filename: Name of the blob inside the folder.
+        :param folder_type: Subfolder type ('user_upload' or 'user_extract').
+        :return: List of blob names of the uploaded files.
+        """
+        blob_name = self.generate_blob_name(user_id, filename, folder_type)
+        try:
+            blob_client = self.container_client.get_blob_client(blob_name)
+            metadata = pdf_page_count_metadata(content=data) if filename.lower().endswith(".pdf") else None
+            blob_client.upload_blob(data, overwrite=True, metadata=metadata, max_concurrency=self.max_concurrency)
+            logger.info(f"Uploaded {len(data)} bytes to {blob_name}")
+        except Exception as e:
+            logger.error(f"Failed to upload content to {blob_name}: {e}")
+            raise
+        return [blob_name]
+
     def upload_files(self, user_id, files, folder_type='user_upload'):
         """
         Upload multiple files to Azure Blob Storage.
@@ -96,8 +159,12 @@ class AzureBlobService:
                 filename = os.path.basename(local_file_path)
                 blob_name = f"uploads/{date_folder}/{user_id}/{folder_type}/{filename}"
                 blob_client = self.container_client.get_blob_client(blob_name)
+                metadata = pdf_page_count_metadata(local_file_path)
                 with open(local_file_path, 'rb') as data:
-                    blob_client.upload_blob(data, overwrite=True)
+                    blob_client.upload_blob(
+                        data, overwrite=True, metadata=metadata,
+                        length=os.path.getsize(local_file_path), max_concurrency=self.max_concurrency
+                    )
                 blob_names.append(blob_name)
                 logger.info(f"Uploaded file {local_file_path} to blob: {blob_name}")
             except Exception as e:
@@ -143,21 +210,103 @@ class AzureBlobService:
         :param folder_type: Subfolder type ('user_upload' or 'user_extract').
         :return: File content as bytes.
         """
-        date_folder = self._get_date_folder()
-        blob_name = filename
         logger.info(f"Inside download file function {user_id} => {filename}")
-        if folder_type not in blob_name:
-            blob_name = f"uploads/{date_folder}/{user_id}/{folder_type}/{filename}"
+        blob_name = self.resolve_blob_name(user_id, filename, folder_type)
         logger.info(f"Downloading file {blob_name} for user {user_id}...")
         try:
             blob_client = self.container_client.get_blob_client(blob_name)
-            content = blob_client.download_blob().readall()
+            content = blob_client.download_blob(max_concurrency=self.max_concurrency).readall()
             logger.info(f"Downloaded file {blob_name} for user {user_id}.")
             return content
         except Exception as e:
             logger.error(f"Failed to download file {blob_name}: {e}")
             raise
 
+    def download_to_path(self, user_id, filename, local_path, folder_type='user_upload'):
+        """
+        Download a specific file for a user straight to disk.
+        The blob is streamed chunk by chunk over up to `max_concurrency` connections, so memory
+        use stays bounded by the chunk size instead of growing with the file size.
+        :param user_id: User ID whose file needs to be downloaded.
+        :param filename: Name of the file (or full blob path) to download.
+        :param local_path: Destination path on the local filesystem.
+        :param folder_type: Subfolder type ('user_upload' or 'user_extract').
+        :return: Local path of the downloaded file.
+        """
+        blob_name = self.resolve_blob_name(user_id, filename, folder_type)
+        logger.info(f"Streaming file {blob_name} for user {user_id} to {local_path}...")
+        temp_path = f"{local_path}.part"
+        try:
+            blob_client = self.container_client.get_blob_client(blob_name)
+            with open(temp_path, 'wb') as local_file:
+                bytes_written = blob_client.download_blob(max_concurrency=self.max_concurrency).readinto(local_file)
+            os.replace(temp_path, local_path)
+            logger.info(f"Downloaded {bytes_written} bytes of {blob_name} to {local_path}.")
+            return local_path
+        except Exception as e:
+            logger.error(f"Failed to download file {blob_name} to {local_path}: {e}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def open_stream(self, user_id, filename, folder_type='user_upload'):
+        """
+        Open a streaming download of a specific file for a user.
+        :param user_id: User ID whose file needs to be downloaded.
+        :param filename: Name of the file (or full blob path) to download.
+        :param folder_type: Subfolder type ('user_upload' or 'user_extract').
+        :return: StorageStreamDownloader; iterate `.chunks()` to consume it, `.size` holds the blob size.
+        """
+        blob_name = self.resolve_blob_name(user_id, filename, folder_type)
+        logger.info(f"Opening download stream for {blob_name} for user {user_id}...")
+        try:
+            blob_client = self.container_client.get_blob_client(blob_name)
+            return blob_client.download_blob()
+        except Exception as e:
+            logger.error(f"Failed to open download stream for {blob_name}: {e}")
+            raise
+
+    def blob_exists(self, user_id, filename, folder_type='user_upload'):
+        """
+        Check whether a file exists for a user.
+        :param user_id: User ID whose file is looked up.
+        :param filename: Name of the file (or full blob path).
+        :param folder_type: Subfolder type ('user_upload', 'user_extract' or 'analysis_source').
+        :return: True if the blob exists.
+        """
+        blob_name = self.resolve_blob_name(user_id, filename, folder_type)
+        return self.container_client.get_blob_client(blob_name).exists()
+
+    def get_read_url(self, user_id, filename, folder_type='user_upload', expiry_minutes=60):
+        """
+        Build a read-only URL of a file, e.g. for Azure Form Recognizer to analyze it in place.
+        The URL carries a SAS token signed with the account key of the connection string; when the
+        connection string itself holds a SAS token, the blob URL already carries it.
+        :param user_id: User ID whose file is shared.
+        :param filename: Name of the file (or full blob path).
+        :param folder_type: Subfolder type ('user_upload', 'user_extract' or 'analysis_source').
+        :param expiry_minutes: Lifetime of the URL.
+        :raises ValueError: When the connection string holds neither an account key nor a SAS token,
+                            as the bare blob URL cannot be read by anyone else.
+        :return: URL of the blob.
+        """
+        blob_name = self.resolve_blob_name(user_id, filename, folder_type)
+        blob_client = self.container_client.get_blob_client(blob_name)
+        account_key = getattr(self.blob_service_client.credential, "account_key", None)
+        if not account_key:
+            if "sig=" in blob_client.url:
+                return blob_client.url
+            raise ValueError(f"Cannot build a read-only URL for {blob_name}: the connection string has no account key or SAS token")
+        sas_token = generate_blob_sas(
+            account_name=self.blob_service_client.account_name,
+            container_name=self.container_name,
+            blob_name=blob_name,
+            account_key=account_key,
+            permission=BlobSasPermissions(read=True),
+            expiry=datetime.utcnow() + timedelta(minutes=expiry_minutes)
+        )
+        return f"{blob_client.url}?{sas_token}"
+
     def delete_file(self, user_id, filename, folder_type='user_upload'):
         """
         Delete a specific file for a user.
@@ -219,31 +368,75 @@ class AzureBlobService:
         date_folder = self._get_date_folder()
         return f"uploads/{date_folder}/{user_id}/{folder_type}/{blob_name}"
 
+    def resolve_blob_name(self, user_id, filename, folder_type):
+        """
+        Returns `filename` when it already is a full blob path, otherwise the blob name in today's folder.
+        """
+        if folder_type in filename:
+            return filename
+        return self.generate_blob_name(user_id, filename, folder_type)
+
     def get_total_pages_from_azure(self, blob_name):
         """
-        Calculates the total number of pages in a PDF stored in Azure Blob Storage using PyMuPDF.
+        Calculates the total number of pages in a PDF stored in Azure Blob Storage.
+
+        Uses the page count cached in blob metadata when present (a single properties request).
+        Otherwise reads only the PDF trailer/xref and page tree root with ranged downloads,
+        falling back to a full download if the structure cannot be resolved that way.
+        With CACHE_PAGE_COUNT_ON_READ, the result is written back to the blob metadata for
+        subsequent validations, only if the blob has not changed since it was counted.
         """
         blob_client = self.container_client.get_blob_client(blob_name)
 
         try:
-            # Download the first chunk of the file (enough for metadata extraction)
+            properties = blob_client.get_blob_properties()
+            metadata = properties.metadata or {}
+            cached_pages = metadata.get(PAGE_COUNT_METADATA_KEY)
+            if cached_pages and cached_pages.isdigit():
+                logger.info(f"Total pages in {blob_name} (from metadata): {cached_pages}")
+                return int(cached_pages)
+
+            try:
+                total_pages, bytes_read = count_pdf_pages_with_ranged_reads(
+                    lambda offset, length: blob_client.download_blob(offset=offset, length=length).readall(),
+                    properties.size
+                )
+                logger.info(f"Total pages in {blob_name}: {total_pages} (read {bytes_read} of {properties.size} bytes)")
+            except PageCountUnavailable as e:
+                logger.warning(f"Ranged page count failed for {blob_name}: {e}. Falling back to full download.")
+                total_pages = self._get_total_pages_from_full_download(blob_client, blob_name)
+        except Exception as e:
+            logger.error(f"Error calculating total pages for {blob_name}: {e}")
+            raise
+
+        if CACHE_PAGE_COUNT_ON_READ:
+            try:
+                blob_client.set_blob_metadata(
+                    {**metadata, PAGE_COUNT_METADATA_KEY: str(total_pages)},
+                    etag=properties.etag, match_condition=MatchConditions.IfNotModified
+                )
+            except Exception as e:
+                logger.warning(f"Failed to cache page count in metadata for {blob_name}: {e}")
+
+        return total_pages
+
+    def _get_total_pages_from_full_download(self, blob_client, blob_name):
+        """
+        Downloads the whole blob and counts its pages with PyMuPDF.
+        """
+        temp_file_path = None
+        try:
             with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                blob_data = blob_client.download_blob()
-                temp_file.write(blob_data.readall())
+                blob_client.download_blob().readinto(temp_file)
                 temp_file_path = temp_file.name
 
-            # Use PyMuPDF to calculate the total number of pages
             with fitz.open(temp_file_path) as pdf_document:
                 total_pages = pdf_document.page_count
                 logger.info(f"Total pages in {blob_name}: {total_pages}")
-        except Exception as e:
-            logger.error(f"Error calculating total pages for {blob_name}: {e}")
-            raise
+            return total_pages
         finally:
             if temp_file_path and os.path.exists(temp_file_path):
                 os.unlink(temp_file_path)  # Clean up temporary file
-
-        return total_pages
     
 
     def delete_old_folders(self, days_threshold=2):
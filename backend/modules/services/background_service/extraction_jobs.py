@@ -0,0 +1,171 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from modules.logging_util import setup_logger
+from modules.services.extraction_pipeline import run_extraction
+from modules.progress_store import get_progress_store, PROGRESS_STORE_BACKEND
+
+logger = setup_logger(__name__)
+
+# "celery" runs jobs on the Celery workers, "local" on a thread pool inside the web process (development)
+EXTRACTION_JOB_BACKEND = os.getenv(
+    "EXTRACTION_JOB_BACKEND", "celery" if os.getenv("CELERY_BROKER_URL") else "local"
+).lower()
+EXTRACTION_LOCAL_WORKERS = int(os.getenv("EXTRACTION_LOCAL_WORKERS", 2))
+EXTRACTION_JOB_RETENTION_SECONDS = int(os.getenv("EXTRACTION_JOB_RETENTION_SECONDS", 60 * 60))  # 1 hour
+
+
+def register_job(job_id, user_id):
+    """
+    Records the owner of a job before it is scheduled, so status and progress reads can
+    require an exact owner match whatever the job backend reports.
+    """
+    progress_store = get_progress_store()
+    progress_store.initialize(job_id, user_id=user_id, progress=0, stage="queued")
+    progress_store.set_latest_job(user_id, job_id)
+
+
+def get_job_owner(job_id):
+    record = get_progress_store().get(job_id)
+    return record.get("user_id") if record else None
+
+
+def validate_job_backend():
+    """
+    Refuses a setup where job progress cannot reach the web process: Celery workers run
+    in other processes, so their updates (including the final stage) need the Redis store.
+
+    :raises RuntimeError: When the Celery backend is used with the in-memory progress store.
+    """
+    if EXTRACTION_JOB_BACKEND == "celery" and PROGRESS_STORE_BACKEND != "redis":
+        raise RuntimeError(
+            "EXTRACTION_JOB_BACKEND=celery requires the redis progress store: "
+            "set PROGRESS_REDIS_URL (or use a redis:// CELERY_BROKER_URL)"
+        )
+
+
+def execute_extraction_job(job_id, user_id, data, config):
+    """
+    Runs one extraction job and returns its JSON-serializable record.
+    Any exception is captured as a failed job instead of propagating to the worker.
+    """
+    started_at = time.time()
+    try:
+        response, status_code = run_extraction(data, user_id, config, job_id)
+        status = "completed" if status_code == 200 else "failed"
+        record = {"status": status, "status_code": status_code, "result": response}
+    except Exception as e:
+        logger.error(f"Extraction job for user {user_id} failed: {e}")
+        record = {"status": "failed", "status_code": 500, "error": str(e)}
+
+    record.update({"user_id": user_id, "duration_seconds": round(time.time() - started_at, 2)})
+    try:
+        if record["status"] == "completed":
+            final_fields = {"progress": 100}
+        else:
+            final_fields = {"error": record.get("error") or record.get("result", {}).get("message")}
+        get_progress_store().publish(job_id, stage=record["status"], **final_fields)
+    except Exception as e:
+        logger.error(f"Failed to publish final progress for job {job_id}: {e}")
+    logger.info(f"Extraction job for user {user_id} finished with status {record['status']} in {record['duration_seconds']}s")
+    return record
+
+
+class LocalExtractionJobQueue:
+    """
+    In-process job queue for development: jobs run on a thread pool inside the web process
+    and their records are kept in memory for EXTRACTION_JOB_RETENTION_SECONDS after finishing.
+    """
+
+    def __init__(self, app, max_workers=EXTRACTION_LOCAL_WORKERS):
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extraction-job")
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, user_id, data):
+        job_id = uuid.uuid4().hex
+        register_job(job_id, user_id)
+        with self.lock:
+            self._prune()
+            self.jobs[job_id] = {"job_id": job_id, "user_id": user_id, "status": "queued", "submitted_at": time.time()}
+        self.executor.submit(self._run, job_id, user_id, data)
+        logger.info(f"Queued extraction job {job_id} for user {user_id} (local backend)")
+        return job_id
+
+    def _run(self, job_id, user_id, data):
+        with self.lock:
+            self.jobs[job_id]["status"] = "running"
+        with self.app.app_context():
+            record = execute_extraction_job(job_id, user_id, data, self.app.config)
+        with self.lock:
+            self.jobs[job_id].update(record, finished_at=time.time())
+
+    def _prune(self):
+        cutoff = time.time() - EXTRACTION_JOB_RETENTION_SECONDS
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.get("finished_at", time.time()) < cutoff]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+
+class CeleryExtractionJobQueue:
+    """
+    Job queue backed by the existing Celery app; the job id is the Celery task id.
+    """
+
+    def __init__(self):
+        from modules.services.background_service.upload_worker import celery_app, process_extraction
+        self.celery_app = celery_app
+        self.task = process_extraction
+
+    def submit(self, user_id, data):
+        # The id is chosen up front so the owner is recorded before a worker can pick the task up
+        job_id = uuid.uuid4().hex
+        register_job(job_id, user_id)
+        self.task.apply_async(args=[user_id, data], task_id=job_id)
+        logger.info(f"Queued extraction job {job_id} for user {user_id} (celery backend)")
+        return job_id
+
+    def get(self, job_id):
+        """
+        Returns the job's record with the owner recorded at submission. Celery reports
+        unknown ids as PENDING, so a job without a recorded owner is not found.
+        """
+        owner = get_job_owner(job_id)
+        if owner is None:
+            return None
+        async_result = self.celery_app.AsyncResult(job_id)
+        state = async_result.state
+        if state == "SUCCESS":
+            return {"job_id": job_id, **async_result.result, "user_id": owner}
+        if state == "FAILURE":
+            return {"job_id": job_id, "status": "failed", "status_code": 500, "error": str(async_result.result), "user_id": owner}
+        if state in ("STARTED", "RETRY"):
+            return {"job_id": job_id, "status": "running", "user_id": owner}
+        return {"job_id": job_id, "status": "queued", "user_id": owner}
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_extraction_job_queue(app):
+    """
+    Returns the process-wide extraction job queue for the configured backend.
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            validate_job_backend()
+            if EXTRACTION_JOB_BACKEND == "celery":
+                _job_queue = CeleryExtractionJobQueue()
+            else:
+                _job_queue = LocalExtractionJobQueue(app)
+            logger.info(f"Extraction jobs use the {EXTRACTION_JOB_BACKEND} backend")
+    return _job_queue
@@ -30,4 +30,18 @@ def process_upload(self, user_id, filenames):
         response, status = upload_files(user_id, filenames)
         return {'status': 'completed', 'filenames': response['filenames']}
     except Exception as e:
-        return {'status': 'failed', 'error': str(e)}
\ No newline at end of file
+        return {'status': 'failed', 'error': str(e)}
+
+
+@celery_app.task(bind=True, track_started=True)
+def process_extraction(self, user_id, data):
+    """
+    Celery background task running the full /extract pipeline for one job.
+    """
+    # Imported lazily: the Flask app (and its config/extensions) is only needed inside the worker
+    from app import app as flask_app
+    from modules.services.background_service.extraction_jobs import execute_extraction_job
+
+    self.update_state(state="STARTED", meta={"user_id": user_id})
+    with flask_app.app_context():
+        return execute_extraction_job(self.request.id, user_id, data, flask_app.config)
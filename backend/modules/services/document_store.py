@@ -0,0 +1,99 @@
+import os
+import shutil
+import threading
+import fitz  # PyMuPDF
+from modules.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class DocumentStore:
+    """
+    Per-request store of source PDFs.
+
+    Each blob is downloaded from Azure at most once into the user's folder, and the same
+    local path is then handed to page slicing and extraction. Page counts for validation
+    are answered without a download when the file has not been fetched yet.
+    """
+
+    def __init__(self, azure_blob_service, user_id, local_folder, folder_type='user_upload'):
+        self.azure_blob_service = azure_blob_service
+        self.user_id = user_id
+        self.local_folder = local_folder
+        self.folder_type = folder_type
+        self._paths = {}
+        self._page_counts = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def local_name(filename):
+        """
+        Returns the bare file name used as the key and local file name for a blob.
+        """
+        return filename.split("/")[-1]
+
+    def fetch(self, filename):
+        """
+        Downloads the blob for `filename` unless it has already been fetched in this request.
+
+        :param filename: File name (or blob path) as sent by the client.
+        :return: Local path of the downloaded file.
+        """
+        name = self.local_name(filename)
+        with self.lock:
+            if name in self._paths:
+                return self._paths[name]
+
+            local_path = os.path.join(self.local_folder, name)
+            logger.info(f"Fetching {filename} for user {self.user_id} into {local_path}")
+            self.azure_blob_service.download_to_path(self.user_id, filename, local_path, self.folder_type)
+            self._paths[name] = local_path
+            return local_path
+
+    def fetch_all(self, filenames):
+        """
+        Fetches every file and returns a dictionary of bare file name -> local path.
+        """
+        return {self.local_name(filename): self.fetch(filename) for filename in filenames}
+
+    def path(self, filename):
+        """
+        Returns the local path of an already fetched file, or None.
+        """
+        return self._paths.get(self.local_name(filename))
+
+    def blob_name(self, filename):
+        """
+        Returns the blob name for `filename`, as AzureBlobService resolves it for downloads.
+        """
+        return self.azure_blob_service.resolve_blob_name(self.user_id, filename, self.folder_type)
+
+    def page_count(self, filename):
+        """
+        Returns the number of pages of a file.
+        Uses the local copy when it has already been fetched, otherwise asks blob storage
+        (metadata or ranged reads) so validation does not need to download the file.
+        """
+        name = self.local_name(filename)
+        if name not in self._page_counts:
+            local_path = self.path(filename)
+            if local_path:
+                with fitz.open(local_path) as pdf_document:
+                    self._page_counts[name] = pdf_document.page_count
+            else:
+                self._page_counts[name] = self.azure_blob_service.get_total_pages_from_azure(self.blob_name(filename))
+            logger.info(f"Total pages in {name}: {self._page_counts[name]}")
+        return self._page_counts[name]
+
+    def replace(self, filename, new_local_path):
+        """
+        Replaces the local copy of a file (e.g. with a page-sliced version) in place.
+        """
+        name = self.local_name(filename)
+        local_path = self._paths.get(name) or os.path.join(self.local_folder, name)
+        # Replace the original file with the modified one, handling cross-device moves
+        shutil.move(new_local_path, local_path)
+        self._paths[name] = local_path
+        self._page_counts.pop(name, None)
+        logger.info(f"Replaced local copy of {name} with {new_local_path}")
+        return local_path
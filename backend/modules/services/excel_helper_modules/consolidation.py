@@ -1,11 +1,7 @@
 import pandas as pd
-from modules.logging_util import setup_logger
-from modules.services.excel_helper_modules.excel_operations import (
-    beautify_excel,
-    sanitize_sheet_name,
-    save_sheet,
-    remove_gridlines
-)
+from modules.logging_util import setup_logger, lazy
+from modules.services.excel_helper_modules.excel_operations import sanitize_sheet_name
+from modules.services.excel_helper_modules.excel_writer import open_workbook, write_sheet
 from modules.services.excel_helper_modules.data_processing import sort_headers_chronologically
 
 logger = setup_logger(__name__)
@@ -41,10 +37,10 @@ def consolidate_dataframes(dataframes):
         aligned_dataframes = align_dataframes(dataframes, all_columns)
 
         # Step 4: Consolidate rows into a single DataFrame
-        consolidated_df = pd.DataFrame(columns=all_columns)
-        seen_keys = {}
+        consolidator = RowConsolidator(all_columns, first_column)
         for df in aligned_dataframes:
-            consolidated_df = consolidate_rows(df, consolidated_df, first_column, seen_keys)
+            consolidate_rows(df, consolidator)
+        consolidated_df = consolidator.to_dataframe()
 
         # # Step 5: Update column suffixes for duplicates
         consolidated_df = update_column_suffixes(consolidated_df, first_column)
@@ -118,7 +114,7 @@ def align_dataframes(dataframes, all_columns):
             if col in all_columns:
                 aligned_df[col] = df[col]
         aligned_df.fillna("", inplace=True)
-        logger.debug(f"Aligned DataFrame:\n{aligned_df.head()}")
+        logger.debug("Aligned DataFrame:\n%s", lazy(aligned_df))
         aligned_dataframes.append(aligned_df)
     return aligned_dataframes
 
@@ -133,31 +129,60 @@ def add_unique_suffix(key, seen_keys):
         seen_keys[key] = 1
         return key
 
-def consolidate_rows(df, consolidated_df, first_column, seen_keys):
+class RowConsolidator:
+    """
+    Accumulates consolidated rows in plain lists with a hash index on the key column,
+    so each input row costs O(columns) instead of a scan over everything consolidated so far.
+    The DataFrame is materialized once in `to_dataframe`.
+    """
+
+    def __init__(self, columns, first_column):
+        self.columns = list(columns)
+        self.first_column = first_column
+        self.rows = []
+        self.key_index = {}  # stored key -> position of its first row
+        self.seen_keys = {}  # key -> occurrences, for add_unique_suffix
+
+    def add_row(self, values, context_group):
+        """
+        Merges `values` (aligned to `self.columns`) into the row with the same key,
+        or appends it as a new row keyed by its context group and a unique suffix.
+        """
+        key = values[0]
+        position = self.key_index.get(key)
+        if position is not None:
+            existing = self.rows[position]
+            # Only fill cells that are still empty in the consolidated row
+            for col_idx in range(1, len(values)):
+                if pd.notna(values[col_idx]) and (pd.isna(existing[col_idx]) or existing[col_idx] == ""):
+                    existing[col_idx] = values[col_idx]
+            return
+
+        if context_group and key != context_group:
+            key = f"{context_group} | {key}"
+        unique_key = add_unique_suffix(key, self.seen_keys)
+        self.key_index.setdefault(unique_key, len(self.rows))
+        self.rows.append([unique_key] + list(values[1:]))
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.rows, columns=self.columns, dtype=object)
+
+
+def consolidate_rows(df, consolidator):
+    """
+    Feeds the rows of an aligned DataFrame into the consolidator.
+    A row whose values (besides the key) are all null opens a context group: the
+    following new keys are stored as "<context> | <key>".
+    """
+    values = df.reindex(columns=consolidator.columns, fill_value="").to_numpy(dtype=object)
+    has_values = pd.notna(values[:, 1:]).any(axis=1)
+
     context_group = None
-    for _, row in df.iterrows():
-        key = row[first_column]
-
-        # Identify context group based on empty/non-empty values
-        if pd.isna(row.drop(first_column).dropna().iloc[0]):
-            context_group = key
-
-        # Consolidate data into existing or new rows
-        if key in consolidated_df[first_column].values:
-            idx_existing = consolidated_df[consolidated_df[first_column] == key].index[0]
-            for col in df.columns[1:]:
-                if pd.notna(row[col]) and (pd.isna(consolidated_df.at[idx_existing, col]) or consolidated_df.at[idx_existing, col] == ""):
-                    consolidated_df.at[idx_existing, col] = row[col]
-        else:
-            if context_group and key != context_group:
-                key = f"{context_group} | {key}"
-            unique_key = add_unique_suffix(key, seen_keys)
-            row[first_column] = unique_key
-            new_row = {col: "" for col in consolidated_df.columns}
-            for col in row.index:
-                new_row[col] = row[col]
-            consolidated_df = pd.concat([consolidated_df, pd.DataFrame([new_row])], ignore_index=True)
-    return consolidated_df
+    for row_values, row_has_values in zip(values.tolist(), has_values.tolist()):
+        if not row_has_values:
+            context_group = row_values[0]
+        consolidator.add_row(row_values, context_group)
+    return consolidator
 
 def update_column_suffixes(consolidated_df, first_column):
     """
@@ -204,37 +229,43 @@ def update_column_suffixes(consolidated_df, first_column):
 
     return consolidated_df
 
-def consolidate_excel_sheets(input_files, output_excel_path, saved_config):
+def as_read_back(df):
     """
-    Consolidates multiple Excel files by matching rows in specified sheets
-    and creating a new consolidated Excel file with beautification.
+    Returns a copy of a DataFrame as `pd.ExcelFile(...).parse` would return it after a
+    round trip through the sheet: duplicate headers get ".1", ".2" suffixes, empty strings
+    become NaN and column dtypes are re-inferred. Keeps the in-memory consolidation
+    identical to consolidating the written workbooks.
+    """
+    df = df.copy().reset_index(drop=True)
+    # Same de-duplication as the pandas Excel parser
+    counts = {}
+    columns = []
+    for col in df.columns:
+        count = counts.get(col, 0)
+        while count > 0:
+            counts[col] = count + 1
+            col = f"{col}.{count}"
+            count = counts.get(col, 0)
+        counts[col] = count + 1
+        columns.append(col)
+    df.columns = columns
+    return df.replace("", float("nan")).infer_objects()
+
+
+def consolidate_sheet_frames(sheet_data, output_excel_path):
+    """
+    Consolidates DataFrames that belong to the same sheet and writes one beautified
+    sheet per name to a new Excel file.
 
     Args:
-        input_files (list): List of input Excel file paths.
+        sheet_data (dict): Sanitized sheet name -> list of DataFrames, one per source file, in order.
         output_excel_path (str): Path to save the consolidated Excel file.
 
     Returns:
         dict: Status and path to the consolidated file.
     """
     try:
-        logger.info(f"Starting consolidation for files: {input_files}")
-        sheet_data = {}  # Dictionary to hold data for each sheet across files
-
-        # Read all input files and load the data for each sheet
-        for file in input_files:
-            workbook = pd.ExcelFile(file)
-            logger.info(f"File: {file}, Sheets: {workbook.sheet_names}")
-            for sheet_name in workbook.sheet_names:
-                sanitized_name = sanitize_sheet_name(sheet_name)
-                if sanitized_name not in sheet_data:
-                    sheet_data[sanitized_name] = []
-                # Read the sheet and append its DataFrame to the list
-                df = workbook.parse(sheet_name)
-                logger.info(f"Loaded data for sheet {sanitized_name} from file {file}, shape: {df.shape}")
-                sheet_data[sanitized_name].append(df)
-
-        # Consolidate data for each sheet
-        with pd.ExcelWriter(output_excel_path, engine="openpyxl") as writer:
+        with open_workbook(output_excel_path) as writer:
             for sheet_name, dataframes in sheet_data.items():
                 logger.info(f"Consolidating sheet: {sheet_name}")
                 consolidated_df = consolidate_dataframes(dataframes)
@@ -247,16 +278,13 @@ def consolidate_excel_sheets(input_files, output_excel_path, saved_config):
                         consolidated_df.drop(columns=empty_columns, inplace=True)
 
                     # Ensure chronological ordering (optional)
-                    logger.info(f"Data Frame before chronological ordering: {consolidated_df}")
+                    logger.debug("Data Frame before chronological ordering: %s", lazy(consolidated_df))
                     consolidated_df = sort_headers_chronologically(consolidated_df)
-                    logger.info(f"Data Frame after chronological ordering: {consolidated_df}")
+                    logger.info("Data Frame after chronological ordering: %s", lazy(consolidated_df))
 
-                    # Write the consolidated data to Excel
-                    consolidated_df.to_excel(writer, sheet_name=sheet_name, index=False, header=True)
+                    # Write the consolidated data to a beautified sheet
+                    write_sheet(writer, consolidated_df, sheet_name)
                     logger.info(f"Consolidated data written to sheet: {sheet_name}")
-
-                    # Apply beautification to the sheet
-                    beautify_excel(writer, sheet_name)
                 else:
                     logger.warning(f"No data to consolidate for sheet: {sheet_name}")
 
@@ -270,3 +298,58 @@ def consolidate_excel_sheets(input_files, output_excel_path, saved_config):
     except Exception as e:
         logger.error(f"Error during consolidation: {e}")
         return {"status": "error", "message": str(e)}
+
+
+def consolidate_sheets_in_memory(sheet_sets, output_excel_path):
+    """
+    Consolidates the sheets produced by `save_sections_to_excel_and_csv` without
+    reading the written workbooks back.
+
+    Args:
+        sheet_sets (list): One dict of sheet name -> DataFrame per source file, in order.
+        output_excel_path (str): Path to save the consolidated Excel file.
+
+    Returns:
+        dict: Status and path to the consolidated file.
+    """
+    sheet_data = {}
+    for sheets in sheet_sets:
+        for sheet_name, df in sheets.items():
+            sheet_data.setdefault(sanitize_sheet_name(sheet_name), []).append(as_read_back(df))
+    logger.info(f"Consolidating {len(sheet_sets)} in-memory workbooks, sheets: {list(sheet_data)}")
+    return consolidate_sheet_frames(sheet_data, output_excel_path)
+
+
+def consolidate_excel_sheets(input_files, output_excel_path, saved_config=None):
+    """
+    Consolidates multiple Excel files by matching rows in specified sheets
+    and creating a new consolidated Excel file with beautification.
+
+    Args:
+        input_files (list): List of input Excel file paths.
+        output_excel_path (str): Path to save the consolidated Excel file.
+
+    Returns:
+        dict: Status and path to the consolidated file.
+    """
+    try:
+        logger.info(f"Starting consolidation for files: {input_files}")
+        sheet_data = {}  # Dictionary to hold data for each sheet across files
+
+        # Read all input files and load the data for each sheet
+        for file in input_files:
+            workbook = pd.ExcelFile(file)
+            logger.info(f"File: {file}, Sheets: {workbook.sheet_names}")
+            for sheet_name in workbook.sheet_names:
+                sanitized_name = sanitize_sheet_name(sheet_name)
+                if sanitized_name not in sheet_data:
+                    sheet_data[sanitized_name] = []
+                # Read the sheet and append its DataFrame to the list
+                df = workbook.parse(sheet_name)
+                logger.info(f"Loaded data for sheet {sanitized_name} from file {file}, shape: {df.shape}")
+                sheet_data[sanitized_name].append(df)
+    except Exception as e:
+        logger.error(f"Error during consolidation: {e}")
+        return {"status": "error", "message": str(e)}
+
+    return consolidate_sheet_frames(sheet_data, output_excel_path)
@@ -1,97 +1,367 @@
+import os
+import numpy as np
 import pandas as pd
-from modules.logging_util import setup_logger
+from modules.logging_util import setup_logger, lazy
 import re
 logger = setup_logger(__name__)
 
-def convert_parentheses_to_negative(df):
+# Patterns of the "regex" match mode come from the page config; page configs using it are refused unless enabled
+ALLOW_REGEX_MATCH = os.getenv("ALLOW_REGEX_MATCH", "false").lower() in ['true', '1', 'yes']
+# Longest pattern accepted in the "regex" match mode
+MAX_MATCH_PATTERN_LENGTH = int(os.getenv("MAX_MATCH_PATTERN_LENGTH", 100))
+# Variable repeats (*, +, {m,n}) allowed in each alternative of a "regex" match pattern
+MAX_MATCH_PATTERN_REPEATS = 3
+
+# Optional "(", sign and currency, the digits with well-formed separators
+# (1,234,567 or Indian 12,34,567, or none), optional decimals, optional ")"
+AMOUNT_PATTERN = re.compile(
+    r"^\s*(?P<opening>\()?\s*(?P<sign>[-−])?\s*(?P<currency>[₹$€£¥]|Rs\.?|INR)?\s*"
+    r"(?P<number>(?:\d{1,3}(?:,\d{3})+|\d{1,2}(?:,\d{2})+,\d{3}|\d+)(?:\.\d+)?|\.\d+)\s*(?P<closing>\))?\s*$"
+)
+
+# A bare 4-digit year ("2023") is a label, not an amount
+YEAR_NUMBER = re.compile(r"(?:19|20)\d{2}")
+# Cells without a separator, parentheses or currency sign ("1234", "12.5") are converted
+# only in columns where at least this share of the non-blank cells are amounts
+AMOUNT_COLUMN_MIN_SHARE = 0.5
+
+
+def parse_amount(value):
+    """
+    Parses one cell into a float with the rules of `parse_numeric_series`:
+    "(3,140)" -> -3140.0, "1,00,000" -> 100000.0, "$ 12.50" -> 12.5.
+    Returns NaN for anything that is not an amount, including a nil "-", "1,2,3" and a bare year.
     """
-    Converts values in parentheses (e.g., "(10)") to negative numbers (e.g., -10).
-    Handles values with commas like "(3,140)" as well.
-    Restores commas for thousands separators after conversion for readability.
-    Ensures integers are stored without decimals.
+    if not isinstance(value, str):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+        return np.nan
+    match = AMOUNT_PATTERN.match(value)
+    if match is None or (match["opening"] is None) != (match["closing"] is None):  # "(10" or "10)"
+        return np.nan
+    if YEAR_NUMBER.fullmatch(match["number"]) and not (match["opening"] or match["sign"] or match["currency"]):
+        return np.nan
+    amount = float(match["number"].replace(",", ""))
+    return -amount if match["opening"] or match["sign"] else amount
+
+
+def parse_amounts(series):
+    """
+    Parses the amounts of a Series into a float64 array with vectorized string operations
+    (`str.extract`, `str.replace`, `pd.to_numeric`); NaN where a cell is not an amount.
+
+    Args:
+        series (pd.Series): Cells to parse, of any dtype.
+
+    Returns:
+        np.ndarray or None: The amounts, or None when the cells hold no text or numbers.
+    """
+    amounts, _ = _extract_amounts(series)
+    return amounts
+
+
+def _extract_amounts(series):
+    """
+    Returns the amounts of `parse_amounts` and a boolean array flagging the cells that are
+    amounts beyond doubt: numbers already, or text with a thousands separator, parentheses,
+    a sign or a currency. Bare years are never flagged. (None, None) for cells without text or numbers.
+    """
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    if kind in ("integer", "floating", "mixed-integer-float", "decimal"):
+        amounts = pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64")
+        return amounts, np.isfinite(amounts)
+    if kind not in ("string", "mixed", "mixed-integer"):
+        return None, None  # booleans, dates, bytes or no values at all
+
+    # Non-string cells come out of the .str accessor as NaN
+    parts = series.str.extract(AMOUNT_PATTERN)
+    amounts = pd.to_numeric(parts["number"].str.replace(",", "", regex=False), errors="coerce")
+    amounts = amounts.where(parts["opening"].isna() == parts["closing"].isna())  # "(10" or "10)"
+    amounts = amounts.mask(parts["opening"].notna() | parts["sign"].notna(), -amounts)
+    marked = (
+        parts["opening"].notna() | parts["sign"].notna() | parts["currency"].notna()
+        | parts["number"].str.contains(",", regex=False).fillna(False)
+    )
+    year = parts["number"].str.fullmatch(YEAR_NUMBER).fillna(False) & ~marked
+    amounts = amounts.mask(year)
+    if kind != "string":
+        cells = series[series.notna() & series.str.len().isna()]
+        cells = cells[cells.map(lambda value: isinstance(value, (int, float, np.number)) and not isinstance(value, bool))]
+        amounts = amounts.fillna(pd.to_numeric(cells, errors="coerce"))
+        marked = marked | series.index.isin(cells.index)
+    amounts = amounts.to_numpy(dtype="float64")
+    return amounts, marked.to_numpy(dtype=bool) & np.isfinite(amounts)
+
+
+def parse_numeric_series(series, values=None):
+    """
+    Replaces the amounts in a column with numbers.
+
+    Returns the series unchanged when nothing parses. A column whose non-blank cells
+    all parse becomes int64 (no blanks, all integral) or float64 (blanks are NaN);
+    otherwise only the parsed cells are replaced and the column stays object, so a
+    nil "-" keeps its text instead of becoming 0.
+
+    Args:
+        series (pd.Series): Column to parse.
+        values (np.ndarray): Its amounts from `parse_amounts`, when already parsed.
+
+    Returns:
+        pd.Series: Parsed column.
+    """
+    values = parse_amounts(series) if values is None else values
+    if values is None:
+        return series
+    parsed = np.isfinite(values)
+    if not parsed.any():
+        return series
+
+    values = np.where(parsed, values, np.nan)
+    integral = parsed & (np.mod(values, 1) == 0)
+    unparsed = series[~parsed]
+    if (unparsed.isna() | (unparsed.astype(str).str.strip() == "")).all():
+        # Only blanks left over: a fully numeric column
+        if len(unparsed) or not integral.all():
+            return pd.Series(values, index=series.index, name=series.name)
+        return pd.Series(values.astype("int64"), index=series.index, name=series.name)
+
+    numbers = np.where(integral, np.nan_to_num(values).astype("int64").astype(object), values.astype(object))
+    return series.astype(object).where(~parsed, pd.Series(numbers, index=series.index))
+
+
+def is_note_column(column):
+    """
+    True for a column of note references ("Note", "Notes", "Note No."), told by its
+    header or, when the header stayed in the first row, by its first cell.
+    """
+    header = f"{column.name} {column.iloc[0] if len(column) else ''}"
+    return "note" in header.lower()
+
+
+def normalize_numeric_columns(df, label_columns=1):
+    """
+    Converts the amount columns of a table into real numbers, so Excel can sum them.
+    Values keep their full precision; thousands separators are applied as number
+    formats when the sheet is written. The amount columns are parsed together, as
+    one Series, so the string operations run once per table rather than per column.
+
+    Only real amounts are converted: cells with a thousands separator, parentheses,
+    a sign or a currency, and plain numbers in columns made mostly of amounts. Note
+    reference columns ("3.1" and "3.10" are different notes) and bare years stay text.
 
     Args:
         df (pd.DataFrame): Input DataFrame to process.
+        label_columns (int): Leading label columns (e.g. "Particulars") left as text.
 
     Returns:
-        pd.DataFrame: DataFrame with converted values and formatted numbers.
+        pd.DataFrame: DataFrame with parsed amount columns.
+    """
+    logger.info("Attempting to convert amounts to numbers..")
+    df = df.copy()
+    first = label_columns if df.shape[1] > label_columns else 0
+    if first >= df.shape[1] or df.empty:
+        return df
+    positions = [position for position in range(first, df.shape[1]) if not is_note_column(df.iloc[:, position])]
+    if not positions:
+        return df
+    cells = df.iloc[:, positions].to_numpy(dtype=object)
+    stacked = pd.Series(cells.ravel(order="F"), dtype=object)
+    amounts, marked = _extract_amounts(stacked)
+    if amounts is None:
+        return df
+    amounts = amounts.reshape(cells.shape, order="F")
+    marked = marked.reshape(cells.shape, order="F")
+    non_blank = (stacked.notna() & (stacked.astype(str).str.strip() != "")).to_numpy().reshape(cells.shape, order="F")
+
+    parsed = np.isfinite(amounts)
+    amount_share = parsed.sum(axis=0) / np.maximum(non_blank.sum(axis=0), 1)
+    amounts = np.where(marked | (amount_share >= AMOUNT_COLUMN_MIN_SHARE), amounts, np.nan)
+    for offset, position in enumerate(positions):
+        df.isetitem(position, parse_numeric_series(df.iloc[:, position], amounts[:, offset]))
+    return df
+
+MATCH_MODES = ("exact", "prefix", "regex")
+PATTERN_CLASS_ESCAPES = "dDwWsS"
+PATTERN_ANCHOR_ESCAPES = "bB"
+PATTERN_REPEAT = re.compile(r"\{(\d+)(,(\d*))?\}")
+
+
+def check_match_pattern(pattern):
+    """
+    Validates a pattern of the "regex" match mode. Patterns are run on every cell of the
+    table, so only a restricted syntax that cannot backtrack catastrophically is accepted:
+    literals, ".", character classes, \\d \\w \\s (and their negations), the anchors
+    ^ $ \\b \\B, repeats (? * + {m,n}) of a single character or class, and top-level "|".
+    Groups, backreferences, lookarounds and lazy or stacked repeats are refused, as are
+    patterns longer than MAX_MATCH_PATTERN_LENGTH or with more than
+    MAX_MATCH_PATTERN_REPEATS variable repeats in one alternative.
+
+    Raises:
+        ValueError: When the pattern is outside that syntax.
     """
-    logger.info("Attempting to convert parentheses to negative numbers..")
+    if len(pattern) > MAX_MATCH_PATTERN_LENGTH:
+        raise ValueError(f"longer than {MAX_MATCH_PATTERN_LENGTH} characters")
+
+    position = 0
+    repeatable = False  # The previous token is a single character or class
+    repeats = 0
+    while position < len(pattern):
+        char = pattern[position]
+        if char == "\\":
+            if position + 1 == len(pattern):
+                raise ValueError("ends with a backslash")
+            escaped = pattern[position + 1]
+            if escaped.isalnum() and escaped not in PATTERN_CLASS_ESCAPES + PATTERN_ANCHOR_ESCAPES:
+                raise ValueError(f"escape \\{escaped} is not supported")
+            repeatable = escaped not in PATTERN_ANCHOR_ESCAPES
+            position += 2
+        elif char == "[":
+            end = position + 1
+            if pattern[end:end + 1] == "^":
+                end += 1
+            if pattern[end:end + 1] == "]":
+                end += 1
+            while end < len(pattern) and pattern[end] != "]":
+                end += 2 if pattern[end] == "\\" else 1
+            if end >= len(pattern):
+                raise ValueError("unterminated character class")
+            repeatable = True
+            position = end + 1
+        elif char in "()":
+            raise ValueError("groups are not supported; use | between whole alternatives")
+        elif char in "*+?{":
+            repeat = PATTERN_REPEAT.match(pattern, position) if char == "{" else None
+            if char == "{" and repeat is None:
+                raise ValueError("malformed {m,n} repeat")
+            if not repeatable:
+                raise ValueError(f"nothing to repeat at position {position}")
+            if char in "*+" or (repeat and (repeat.group(2) and repeat.group(3) != repeat.group(1))):
+                repeats += 1
+                if repeats > MAX_MATCH_PATTERN_REPEATS:
+                    raise ValueError(f"more than {MAX_MATCH_PATTERN_REPEATS} repeats in one alternative")
+            repeatable = False
+            position = repeat.end() if repeat else position + 1
+        elif char == "|":
+            repeatable = False
+            repeats = 0
+            position += 1
+        else:
+            repeatable = char not in "^$"
+            position += 1
+
     try:
-        # Apply conversion with error handling
-        def safe_convert(value):
-            if isinstance(value, str) and value.startswith('(') and value.endswith(')'):
+        re.compile(pattern)
+    except re.error as e:
+        raise ValueError(str(e))
+
+
+def check_match_config(section_config):
+    """
+    Validates the match modes and "regex" patterns of one section's excel config.
+
+    Raises:
+        ValueError: On an unknown match mode, on "regex" while ALLOW_REGEX_MATCH is off,
+                    or on a pattern refused by `check_match_pattern`.
+    """
+    for texts_key, mode_key in (("columnsToRemove", "columnsToRemoveMatch"), ("rowsToRemove", "rowsToRemoveMatch")):
+        match_mode = section_config.get(mode_key, "exact")
+        if match_mode not in MATCH_MODES:
+            raise ValueError(f"{mode_key} must be one of {', '.join(MATCH_MODES)}, got '{match_mode}'")
+        if match_mode != "regex":
+            continue
+        if not ALLOW_REGEX_MATCH:
+            raise ValueError(f'{mode_key} "regex" is disabled on this server (ALLOW_REGEX_MATCH)')
+        for text in section_config.get(texts_key) or []:
+            if isinstance(text, str) and text.strip():
                 try:
-                    # Remove commas, strip parentheses, and convert to negative float
-                    converted_value = -float(value.replace(',', '').strip('()'))
-                    return format_number_with_commas(converted_value)
+                    check_match_pattern(text.strip())
                 except ValueError as e:
-                    logger.error(f"Failed to convert value: {value} with error: {e}")
-                    return value  # Return original value if conversion fails
-            elif isinstance(value, (int, float)):
-                # Format numeric values with commas
-                return format_number_with_commas(value)
-            return value
-
-        def format_number_with_commas(number):
-            """
-            Formats a number with commas for thousands separators.
-            Retains numeric type for compatibility with Excel storage.
-            """
-            if isinstance(number, (int, float)):
-                # Check if the number is effectively an integer
-                if isinstance(number, float) and number.is_integer():
-                    return "{:,}".format(int(number))  # Format as integer with commas
-                elif isinstance(number, float):
-                    return "{:,.2f}".format(number)  # Format float with two decimal places
-                return "{:,}".format(number)  # Format integer with commas
-            return number
-
-        # Apply the conversion safely to the DataFrame
-        return df.applymap(safe_convert)
-    except Exception as e:
-        logger.error(f"Unexpected error in convert_parentheses_to_negative: {e}")
-        raise  # Propagate exception for visibility
+                    raise ValueError(f"{texts_key} pattern '{text}' is not accepted: {e}")
+
 
-def remove_columns(df, texts_to_match):
+def build_cell_matcher(texts_to_match, match_mode="exact"):
+    """
+    Builds a function that flags the cells of a Series matching any of the texts.
+    Cells are compared stripped and case-insensitively:
+    - exact: the whole cell equals a text
+    - prefix: the cell starts with a text
+    - regex: a text, used as a regular expression, is found in the cell. Requires
+      ALLOW_REGEX_MATCH; patterns refused by `check_match_pattern` are ignored.
+
+    Args:
+        texts_to_match (list): Texts or patterns to match; blank entries are ignored.
+        match_mode (str): One of MATCH_MODES.
+
+    Returns:
+        callable or None: Series -> boolean Series, or None when there is nothing to match.
+
+    Raises:
+        ValueError: On "regex" while ALLOW_REGEX_MATCH is off; `validate_input` refuses
+                    such page configs before the extraction starts.
+    """
+    texts = [text.strip() for text in texts_to_match or [] if isinstance(text, str) and text.strip()]
+    if match_mode not in MATCH_MODES:
+        logger.warning(f"Unknown match mode '{match_mode}'. Falling back to exact matching.")
+        match_mode = "exact"
+    if not texts:
+        return None
+
+    if match_mode == "regex":
+        if not ALLOW_REGEX_MATCH:
+            raise ValueError('Match mode "regex" is disabled (ALLOW_REGEX_MATCH)')
+        patterns = []
+        for text in texts:
+            try:
+                check_match_pattern(text)
+                patterns.append(f"(?:{text})")
+            except ValueError as e:
+                logger.error(f"Ignoring pattern '{text}': {e}")
+        if not patterns:
+            return None
+        combined = re.compile("|".join(patterns), re.IGNORECASE)
+        return lambda series: series.astype(str).str.strip().str.contains(combined, regex=True)
+
+    lowered = {text.lower() for text in texts}
+    if match_mode == "prefix":
+        prefixes = tuple(lowered)
+        return lambda series: series.astype(str).str.strip().str.lower().str.startswith(prefixes)
+    return lambda series: series.astype(str).str.strip().str.lower().isin(lowered)
+
+
+def remove_columns(df, texts_to_match, match_mode="exact"):
     """
     Removes columns from the DataFrame that match any of the specified texts in the first row.
+    Column headers are left as they are.
 
     Args:
         df (pd.DataFrame): Input DataFrame to process.
         texts_to_match (list): List of texts to match in the first row.
+        match_mode (str): "exact", "prefix" or "regex"; see build_cell_matcher.
 
     Returns:
         pd.DataFrame: Processed DataFrame with the matching columns removed.
     """
     try:
-        logger.info(f"Attempting to remove columns with any of the texts {texts_to_match} in the first row.")
-
-        # Normalize column names
-        df.columns = df.columns.map(str).str.strip().str.lower()
+        logger.info(f"Attempting to remove columns with any of the texts {texts_to_match} ({match_mode}) in the first row.")
+        matcher = build_cell_matcher(texts_to_match, match_mode)
+        if matcher is None or df.empty:
+            return df
 
-        # Normalize first-row values
-        first_row_normalized = df.iloc[0].astype(str).str.strip().str.lower()
-
-        # Normalize texts_to_match
-        texts_to_match = [text.strip().lower() for text in texts_to_match if text.strip()]
-
-        # Find matching columns
-        matching_columns = first_row_normalized[first_row_normalized.isin(texts_to_match)].index.tolist()
-        
-        if matching_columns:
-            logger.info(f"Found matching columns {matching_columns}. Removing them.")
-            df = df.drop(columns=matching_columns, errors='ignore')
+        # The first row as a Series indexed by column position
+        matching = matcher(pd.Series(df.iloc[0].tolist())).to_numpy(dtype=bool)
+        if matching.any():
+            logger.info(f"Found matching columns {df.columns[matching].tolist()}. Removing them.")
+            df = df.iloc[:, ~matching]
         else:
             logger.warning(f"No matching texts {texts_to_match} found in the first row.")
 
-        logger.info(f"DataFrame after column removal:\n{df.head()}")
+        logger.info("DataFrame after column removal:\n%s", lazy(df))
         return df
     except Exception as e:
         logger.error(f"Error in remove_columns_by_row_values: {e}")
         raise
 
-def remove_rows(df, identity_to_remove_row):
+def remove_rows(df, identity_to_remove_row, match_mode="exact"):
     """
     Removes rows from the DataFrame based on specific identifiers.
 
@@ -99,27 +369,25 @@ def remove_rows(df, identity_to_remove_row):
         df (pd.DataFrame): Input DataFrame to process.
         identity_to_remove_row (list): List of identifiers to remove from the DataFrame.
                                        These identifiers can be present in any column.
+        match_mode (str): "exact", "prefix" or "regex"; see build_cell_matcher.
 
     Returns:
         pd.DataFrame: The DataFrame after removing the specified rows.
     """
-    if not identity_to_remove_row:
+    matcher = build_cell_matcher(identity_to_remove_row, match_mode)
+    if matcher is None:
         logger.info("No identifiers provided to remove rows. Returning the original DataFrame.")
         return df
 
-    logger.info(f"Attempting to remove rows with identifiers: {identity_to_remove_row}")
-    
-    # Normalize identifiers for case-insensitive matching
-    identity_to_remove_row = {identifier.strip().lower() for identifier in identity_to_remove_row if identifier.strip()}
-    
-    def row_contains_identifier(row):
-        # Normalize row values and check if any identifier is in the row
-        normalized_row = row.astype(str).str.strip().str.lower()
-        return any(value in identity_to_remove_row for value in normalized_row)
-    
-    # Filter rows
+    logger.info(f"Attempting to remove rows with identifiers: {identity_to_remove_row} ({match_mode})")
+
+    # One vectorized match per column, OR-ed across the row
+    matching = np.zeros(len(df), dtype=bool)
+    for position in range(df.shape[1]):
+        matching |= matcher(df.iloc[:, position]).to_numpy(dtype=bool)
+
     original_shape = df.shape
-    filtered_df = df[~df.apply(row_contains_identifier, axis=1)]
+    filtered_df = df[~matching]
     logger.info(f"Removed rows. Original shape: {original_shape}, New shape: {filtered_df.shape}")
     return filtered_df
 
@@ -168,21 +436,23 @@ def sort_headers_chronologically(df):
 def process_table_data(df, config):
     """
     Processes table data by applying transformations like:
-    - Removing numeric headers
     - Removing specific columns
-    - Converting parentheses to negatives
+    - Removing specific rows
+    - Converting amounts (parentheses negatives, separators, currency) to numbers
+
+    Removal runs first so it matches the text as extracted.
     """
 
-    logger.info(f"Data Frame : {df}")
-    df = convert_parentheses_to_negative(df)
-    logger.info("Crossed the paranthesis update function")
+    logger.debug("Data Frame : %s", lazy(df))
     logger.info(f"Current config: {config}")
 
     if columns := config.get("columnsToRemove", []):
-        df = remove_columns(df, columns)
+        df = remove_columns(df, columns, config.get("columnsToRemoveMatch", "exact"))
     
     if len(config.get("rowsToRemove", [])) > 0:
         rowsToRemove = config.get("rowsToRemove", [])
-        df = remove_rows(df, rowsToRemove)
-    logger.info(f"Data Frame after processing: {df}")
+        df = remove_rows(df, rowsToRemove, config.get("rowsToRemoveMatch", "exact"))
+
+    df = normalize_numeric_columns(df)
+    logger.info("Data Frame after processing: %s", lazy(df))
     return df
\ No newline at end of file
@@ -0,0 +1,198 @@
+"""
+Workbook writer layer shared by the section and consolidated Excel outputs.
+
+EXCEL_WRITER_ENGINE selects the engine:
+- xlsxwriter (default): rows are streamed to disk in constant-memory mode and
+  styles are workbook-level formats created once per file.
+- openpyxl: the whole workbook is built in memory; styles are shared named styles.
+
+Sheets must be written with `write_sheet`: pandas' `to_excel` writes cells column
+by column, which the constant-memory mode cannot store.
+"""
+import os
+import numpy as np
+import pandas as pd
+from openpyxl.styles import Alignment, Font, PatternFill, NamedStyle
+from openpyxl.utils import get_column_letter
+from modules.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+EXCEL_WRITER_ENGINE = os.getenv("EXCEL_WRITER_ENGINE", "xlsxwriter").lower()
+MAX_COLUMN_WIDTH = 50
+
+HEADER_COLOR = "4F81BD"
+HEADER_FONT_COLOR = "FFFFFF"
+HEADER_STYLE_NAME = "Extraction Header"
+# Amounts are stored as numbers; separators and decimals are display formats
+INTEGER_FORMAT = "#,##0"
+DECIMAL_FORMAT = "#,##0.00"
+
+
+def number_format(value):
+    """
+    Returns the display format for a numeric cell value, or None for anything else.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if isinstance(value, float) and not value.is_integer():
+        return DECIMAL_FORMAT
+    return INTEGER_FORMAT
+
+
+def resolve_engine(engine=None):
+    """
+    Returns the engine to write with, falling back to openpyxl when xlsxwriter
+    is not installed or the configured name is unknown.
+    """
+    engine = (engine or EXCEL_WRITER_ENGINE).lower()
+    if engine == "xlsxwriter":
+        try:
+            import xlsxwriter  # noqa: F401
+        except ImportError:
+            logger.warning("EXCEL_WRITER_ENGINE=xlsxwriter but xlsxwriter is not installed; using openpyxl")
+            return "openpyxl"
+        return engine
+    if engine != "openpyxl":
+        logger.warning(f"Unknown EXCEL_WRITER_ENGINE '{engine}'; using openpyxl")
+    return "openpyxl"
+
+
+def open_workbook(path, engine=None):
+    """
+    Opens a pandas ExcelWriter on the configured engine. Use it as a context manager.
+    """
+    engine = resolve_engine(engine)
+    if engine == "xlsxwriter":
+        return pd.ExcelWriter(path, engine="xlsxwriter", engine_kwargs={"options": {"constant_memory": True}})
+    return pd.ExcelWriter(path, engine="openpyxl")
+
+
+def display_lengths(values):
+    """
+    Returns the displayed length of each value; numbers are measured as
+    INTEGER_FORMAT / DECIMAL_FORMAT render them.
+    """
+    lengths = values.astype(str).str.len()
+    if values.dtype == bool:
+        return lengths
+    numbers = pd.to_numeric(values, errors="coerce")
+    magnitude = numbers.abs()
+    digits = np.floor(np.log10(magnitude.where(magnitude >= 1, 1))) + 1
+    formatted = digits + (digits - 1) // 3 + np.where(numbers % 1 != 0, 3, 0) + (numbers < 0)
+    return lengths.where(numbers.isna(), formatted)
+
+
+def column_widths(df, max_column_width=MAX_COLUMN_WIDTH):
+    """
+    Computes each column's display width from the longest header or value, capped at max_column_width.
+    """
+    widths = []
+    for position, header in enumerate(df.columns):
+        values = df.iloc[:, position]
+        longest = display_lengths(values[values.notna()]).max()
+        longest = 0 if pd.isna(longest) else int(longest)
+        widths.append(min(max(longest, len(str(header))) + 2, max_column_width))
+    return widths
+
+
+def write_sheet(writer, df, sheet_name, grid_lines_removal=False, max_column_width=MAX_COLUMN_WIDTH):
+    """
+    Writes a DataFrame (header + rows, no index) with the standard styling:
+    a bold white-on-blue header, wrapped cells, thousands-separated numbers
+    and capped column widths.
+
+    Args:
+        writer (ExcelWriter): Writer returned by `open_workbook`.
+        df (pd.DataFrame): Data to write.
+        sheet_name (str): Sanitized sheet name not yet used in the workbook
+            (see `unique_sheet_name`); xlsxwriter cannot write a sheet twice.
+        grid_lines_removal (bool): Hide the sheet's gridlines.
+        max_column_width (int): Maximum column width.
+    """
+    widths = column_widths(df, max_column_width)
+    if writer.engine == "xlsxwriter":
+        worksheet = _write_xlsxwriter_sheet(writer, df, sheet_name, widths)
+    else:
+        worksheet = _write_openpyxl_sheet(writer, df, sheet_name, widths)
+    if grid_lines_removal:
+        hide_gridlines(worksheet)
+    return worksheet
+
+
+def hide_gridlines(worksheet):
+    if hasattr(worksheet, "hide_gridlines"):  # xlsxwriter
+        worksheet.hide_gridlines(2)
+    else:
+        worksheet.sheet_view.showGridLines = False
+
+
+def _xlsxwriter_formats(writer):
+    formats = getattr(writer, "_shared_formats", None)
+    if formats is None:
+        formats = {
+            "header": writer.book.add_format({
+                "bold": True, "font_color": f"#{HEADER_FONT_COLOR}", "bg_color": f"#{HEADER_COLOR}",
+                "align": "center", "valign": "vcenter", "text_wrap": True,
+            }),
+            "wrap": writer.book.add_format({"text_wrap": True}),
+            INTEGER_FORMAT: writer.book.add_format({"num_format": INTEGER_FORMAT}),
+            DECIMAL_FORMAT: writer.book.add_format({"num_format": DECIMAL_FORMAT}),
+        }
+        writer._shared_formats = formats
+    return formats
+
+
+def _write_xlsxwriter_sheet(writer, df, sheet_name, widths):
+    formats = _xlsxwriter_formats(writer)
+    worksheet = writer.book.add_worksheet(sheet_name)
+    for col_idx, width in enumerate(widths):
+        worksheet.set_column(col_idx, col_idx, width)
+
+    # Rows go out in order so constant-memory mode can flush each one
+    worksheet.write_row(0, 0, [str(header) for header in df.columns], formats["header"])
+    rows = df.astype(object).where(df.notna(), None).values.tolist()
+    wrap = formats["wrap"]
+    for row_idx, row in enumerate(rows, start=1):
+        for col_idx, value in enumerate(row):
+            worksheet.write(row_idx, col_idx, value, formats.get(number_format(value), wrap))
+    return worksheet
+
+
+def _openpyxl_header_style(workbook):
+    if HEADER_STYLE_NAME not in workbook.named_styles:
+        workbook.add_named_style(NamedStyle(
+            name=HEADER_STYLE_NAME,
+            font=Font(bold=True, color=HEADER_FONT_COLOR),
+            fill=PatternFill(start_color=HEADER_COLOR, end_color=HEADER_COLOR, fill_type="solid"),
+            alignment=Alignment(horizontal="center", vertical="center", wrap_text=True),
+        ))
+    return HEADER_STYLE_NAME
+
+
+def style_openpyxl_sheet(worksheet, widths):
+    """
+    Applies the standard styling to an openpyxl worksheet whose first row is the header.
+    """
+    header_style = _openpyxl_header_style(worksheet.parent)
+    wrap = Alignment(wrap_text=True)  # one shared instance for every body cell
+
+    for cell in worksheet[1]:
+        cell.style = header_style
+    for col_idx, width in enumerate(widths, start=1):
+        worksheet.column_dimensions[get_column_letter(col_idx)].width = width
+    for row in worksheet.iter_rows(min_row=2):
+        for cell in row:
+            if cell.value is not None:
+                cell_number_format = number_format(cell.value)
+                if cell_number_format:
+                    cell.number_format = cell_number_format
+                else:
+                    cell.alignment = wrap
+
+
+def _write_openpyxl_sheet(writer, df, sheet_name, widths):
+    df.to_excel(writer, sheet_name=sheet_name, index=False, header=True)
+    worksheet = writer.sheets[sheet_name]
+    style_openpyxl_sheet(worksheet, widths)
+    return worksheet
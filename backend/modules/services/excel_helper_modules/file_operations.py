@@ -1,12 +1,12 @@
 import os
 import pandas as pd
-from modules.logging_util import setup_logger
+from modules.logging_util import setup_logger, lazy, dump_table
 from modules.services.excel_helper_modules.sanitization import consolidate_related_rows_with_order
 logger = setup_logger(__name__)
 from modules.services.excel_helper_modules.excel_operations import (
-    save_sheet,
-    sanitize_sheet_name
+    save_sheet
 )
+from modules.services.excel_helper_modules.excel_writer import open_workbook, write_sheet
 from modules.services.excel_helper_modules.data_processing import (
     process_table_data
 )
@@ -58,44 +58,45 @@ def save_sections_to_excel_and_csv(section_data, filename, output_folder, config
 
     Returns:
         dict: Result dictionary with 'success' or 'failure' status and relevant paths.
+              On success 'sheets' maps each written sheet name to the DataFrame as written,
+              so the workbook can be consolidated without reading it back.
     """
     config = config or {}
     base_filename = os.path.splitext(filename)[0]
     excel_path = os.path.join(output_folder, f"{base_filename}_sections_processed.xlsx")
     combined_csv_path = os.path.join(output_folder, f"{base_filename}_tables.csv")
-    logger.info(f"====section_data====={section_data}")
+    logger.debug("====section_data===== %s", lazy(section_data))
 
     try:
-        has_data = False
         combined_dataframes = []
+        written_sheets = {}
 
-        with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
+        with open_workbook(excel_path) as writer:
             for section, content in section_data.items():
                 table_content = content.get("raw_tables", None)
-                logger.info(f"Table content for section '{section}': {table_content}")
+                logger.debug("Table content for section '%s': %s", section, lazy(table_content))
                 if table_content == None:
                     table_content = content
-                section_dfs = process_and_save_section(table_content, section, writer, config)
+                section_dfs = process_and_save_section(table_content, section, writer, config, written_sheets)
                 combined_dataframes.extend(section_dfs)
                 # Log the combined DataFrames for each section
                 for idx, df in enumerate(section_dfs):
-                    logger.info(f"Combined DataFrame {idx + 1} for section {section}:\n{df}")
-                has_data = True
+                    logger.debug("Combined DataFrame %s for section %s:\n%s", idx + 1, section, lazy(df))
 
-        if not has_data:
-            logger.warning("No valid data found. Adding default placeholder sheet.")
-            pd.DataFrame(["No data available"]).to_excel(writer, sheet_name="Placeholder", index=False)
+            if not written_sheets:
+                logger.warning("No valid data found. Adding default placeholder sheet.")
+                write_sheet(writer, pd.DataFrame(["No data available"]), "Placeholder")
 
         # Combine all DataFrames into a single CSV
         if combined_dataframes:
             combined_df = pd.concat(combined_dataframes, ignore_index=True)
             logger.info(f"Combined DataFrame shape: {combined_df.shape}")
-            logger.info(f"Combined DataFrame content:\n{combined_df}")
+            logger.info("Combined DataFrame content:\n%s", lazy(combined_df))
             combined_df.to_csv(combined_csv_path, index=False, header=True)
             logger.info(f"Saved combined CSV at {combined_csv_path}")
 
         logger.info(f"Processed section data saved to Excel at {excel_path}")
-        return {"result": "success", "excel_path": excel_path, "csv_path": combined_csv_path}
+        return {"result": "success", "excel_path": excel_path, "csv_path": combined_csv_path, "sheets": written_sheets}
     except Exception as e:
         logger.error(f"Failed to save sections to Excel and combined CSV: {e}")
         if excel_path and os.path.exists(excel_path):
@@ -126,7 +127,7 @@ def drop_nan_text_columns(df):
     # Apply the check to each column and drop the empty ones
     return df.loc[:, ~df.apply(is_column_empty)]
 
-def process_and_save_section(content, section, writer, config):
+def process_and_save_section(content, section, writer, config, written_sheets=None):
     """
     Processes a single section and saves its data to Excel by stacking tables vertically without merging columns.
 
@@ -135,6 +136,7 @@ def process_and_save_section(content, section, writer, config):
         section (str): Name of the section.
         writer (ExcelWriter): Excel writer object.
         config (dict): Configuration dictionary.
+        written_sheets (dict, optional): Filled with sheet name -> copy of the DataFrame written to that sheet.
 
     Returns:
         list: List of DataFrames to be combined into a single CSV.
@@ -144,9 +146,12 @@ def process_and_save_section(content, section, writer, config):
     columns_to_remove = section_config.get('columnsToRemove', [])
     grid_lines_removal = section_config.get('gridLinesRemoval', False)
     rows_to_remove = section_config.get('rowsToRemove', [])
+    # "exact" (default), "prefix" or "regex"
+    columns_match = section_config.get('columnsToRemoveMatch', 'exact')
+    rows_match = section_config.get('rowsToRemoveMatch', 'exact')
 
     logger.info(f"Processing section: {section}")
-    logger.info(f"Current Content is: {content}")
+    logger.debug("Current Content is: %s", lazy(content))
 
     # List to accumulate raw table data without aligning columns
     raw_tables = []
@@ -169,7 +174,7 @@ def process_and_save_section(content, section, writer, config):
                 separator = [["---"] * table.shape[1]]
                 raw_tables.append(separator)
 
-                logger.info(f"Raw tables for section {section} after processing table {idx + 1}:\n{raw_tables}")
+                logger.debug("Raw tables for section %s after processing table %s:\n%s", section, idx + 1, lazy(raw_tables))
 
             else:
                 logger.warning(f"Skipping empty or invalid table for section: {section}")
@@ -184,14 +189,14 @@ def process_and_save_section(content, section, writer, config):
 
             # Flatten raw_tables into a single list of lists
             combined_data = [row for table in raw_tables for row in table]
-            logger.info(f"I am here with combined data {combined_data}")
+            logger.debug("I am here with combined data %s", lazy(combined_data))
             logger.info(f"Collected column headers for section {section}: {column_headers}")
 
             # Ensure that combined_data has consistent rows before creating DataFrame
             if all(isinstance(row, list) and len(row) == len(column_headers) for row in combined_data):
                 combined_df = pd.DataFrame(combined_data, columns=column_headers)
             else:
-                logger.error(f"Invalid combined_data format for section {section}: {combined_data}")
+                logger.error("Invalid combined_data format for section %s: %s", section, lazy(combined_data))
                 # Determine the number of columns in combined_data
                 max_columns = max(len(row) for row in combined_data)
                 
@@ -212,22 +217,26 @@ def process_and_save_section(content, section, writer, config):
                 combined_df,
                 {
                     "columnsToRemove": columns_to_remove,
+                    "columnsToRemoveMatch": columns_match,
                     "gridLinesRemoval": grid_lines_removal,
                     "rowsToRemove": rows_to_remove,
+                    "rowsToRemoveMatch": rows_match,
                 }
             )
             logger.info(f"Combined DataFrame for section {section} shape: {combined_df.shape}")
-            logger.info(f"Combined DataFrame content after processing:\n{combined_df}")
+            logger.info("Combined DataFrame content after processing:\n%s", lazy(combined_df))
+            dump_table(combined_df, f"{section}_processed")
             combined_df = drop_nan_text_columns(combined_df)
 
             # Save the sheet
-            safe_sheet_name = sanitize_sheet_name(section)
-            save_sheet(
+            written_name = save_sheet(
                 writer,
                 combined_df,
-                safe_sheet_name,
+                section,
                 {"gridLinesRemoval": grid_lines_removal}
             )
+            if written_name and written_sheets is not None:
+                written_sheets[written_name] = combined_df.copy()
 
             combined_df["Section"] = section
             section_dataframes.append(combined_df)
@@ -239,12 +248,13 @@ def process_and_save_section(content, section, writer, config):
         if not df.empty:
             df = process_table_data(
                 df,
-                {"columnsToRemove": columns_to_remove, "gridLinesRemoval": grid_lines_removal}
+                {"columnsToRemove": columns_to_remove, "columnsToRemoveMatch": columns_match, "gridLinesRemoval": grid_lines_removal}
             )
             df = drop_nan_text_columns(df)
 
-            safe_sheet_name = sanitize_sheet_name(section)
-            save_sheet(writer, df, safe_sheet_name, {"gridLinesRemoval": grid_lines_removal})
+            written_name = save_sheet(writer, df, section, {"gridLinesRemoval": grid_lines_removal})
+            if written_name and written_sheets is not None:
+                written_sheets[written_name] = df.copy()
 
             df["Section"] = section
             section_dataframes.append(df)
@@ -257,12 +267,13 @@ def process_and_save_section(content, section, writer, config):
         if not df.empty:
             df = process_table_data(
                 df,
-                {"columnsToRemove": columns_to_remove, "gridLinesRemoval": grid_lines_removal}
+                {"columnsToRemove": columns_to_remove, "columnsToRemoveMatch": columns_match, "gridLinesRemoval": grid_lines_removal}
             )
             df = drop_nan_text_columns(df)
 
-            safe_sheet_name = sanitize_sheet_name(section)
-            save_sheet(writer, df, safe_sheet_name, {"gridLinesRemoval": grid_lines_removal})
+            written_name = save_sheet(writer, df, section, {"gridLinesRemoval": grid_lines_removal})
+            if written_name and written_sheets is not None:
+                written_sheets[written_name] = df.copy()
 
             df["Section"] = section
             section_dataframes.append(df)
@@ -1,6 +1,7 @@
 import re
 import pandas as pd
 from modules.logging_util import setup_logger
+from modules.timing_util import StageTimer
 
 logger = setup_logger(__name__)
 
@@ -8,6 +9,26 @@ def sanitize_sheet_name(sheet_name):
     """Sanitizes sheet names to meet Excel restrictions."""
     return re.sub(r'[\\/*?:\[\]]', '', sheet_name)[:31]
 
+def unique_sheet_name(sheet_name, existing):
+    """
+    Returns sheet_name, or sheet_name with a " (2)", " (3)", ... suffix when a sheet
+    of that name already exists. Excel compares sheet names case-insensitively and
+    xlsxwriter refuses duplicates, so sections whose names only differ in stripped
+    characters or beyond 31 characters would otherwise collide.
+    """
+    taken = {name.lower() for name in existing}
+    candidate = sheet_name
+    counter = 2
+    while candidate.lower() in taken:
+        suffix = f" ({counter})"
+        candidate = sheet_name[:31 - len(suffix)] + suffix
+        counter += 1
+    return candidate
+
+SUPERSCRIPT_BRACKETS = re.compile(r"⁽.*?⁾")
+BRACKETED_NUMBERING = re.compile(r"\(\s*(?:\b[IVXLCDM]+\b|\d+)\s*\)")
+
+
 def sanitize_text(text):
     """
     Removes content inside superscript brackets ⁽...⁾ along with the brackets themselves.
@@ -19,24 +40,29 @@ def sanitize_text(text):
     Returns:
         str: Sanitized text without superscript brackets and selective content inside simple brackets.
     """
-    logger.info(f"Original Text: '{text}'")
-
     if isinstance(text, str):
         # Remove superscript brackets and their contents
-        sanitized_text = re.sub(r"⁽.*?⁾", "", text).strip()
+        sanitized_text = SUPERSCRIPT_BRACKETS.sub("", text).strip()
 
         # Remove only Roman numerals and numbers inside simple brackets but retain text
-        sanitized_text = re.sub(r"\(\s*(?:\b[IVXLCDM]+\b|\d+)\s*\)", "", sanitized_text).strip()
-
-        logger.info(f"Sanitized Text: '{sanitized_text}'")
-        return sanitized_text
+        return BRACKETED_NUMBERING.sub("", sanitized_text).strip()
 
     return text
 
+def merge_group_values(values):
+    """
+    Returns the distinct non-null values of one column within a group, in first-seen order.
+    """
+    return list(dict.fromkeys(value for value in values if not pd.isna(value)))
+
 def consolidate_related_rows_with_order(df):
     """
     Consolidates rows with the same value in the first column while preserving the original order,
-    ensuring case-insensitive comparisons.
+    ensuring case-insensitive comparisons. The first spelling of a name is kept; a column whose
+    rows disagree is expanded into "col", "col (2)", ... in the order the values appear.
+
+    Rows are grouped in a single pass over the lowercase keys, so the cost is linear in
+    the size of the table rather than rows x distinct names x columns.
 
     Args:
         df (pd.DataFrame): The input DataFrame.
@@ -49,56 +75,46 @@ def consolidate_related_rows_with_order(df):
         logger.warning("Received empty DataFrame for consolidation.")
         return df
 
+    timer = StageTimer("consolidate_related_rows")
     first_column = df.columns[0]
-    logger.info(f"Before Sanitization: {df[first_column].tolist()}")
-    logger.info(f"Before Sanitization length: {len(df[first_column].tolist())}")
-
-    # Apply text sanitization
-    df[first_column] = df[first_column].astype(str).apply(sanitize_text)
-
-    logger.info(f"After Sanitization: {df[first_column].tolist()}")
-    logger.info(f"After Sanitization length: {len(df[first_column].tolist())}")
-
-    # Create a temporary lowercase key column for case-insensitive comparison
-    df["_temp_lowercase_key"] = df[first_column].str.lower()
-
-    # Preserve original order of unique case-insensitive values
-    unique_order = df["_temp_lowercase_key"].drop_duplicates().tolist()
-    consolidated_rows = []
-
-    for lowercase_name in unique_order:
-        # Select group using case-insensitive match, drop temp column immediately
-        group = df[df["_temp_lowercase_key"] == lowercase_name].drop(columns=["_temp_lowercase_key"], errors='ignore')
-
-        # Ensure _temp_lowercase_key does not get added to column headers
-        group_headers = [col for col in group.columns if col != "_temp_lowercase_key"]
-
-        original_name = group[first_column].iloc[0]  # Keep the first case format
-        consolidated_row = {first_column: original_name}
-
-        for col in group_headers[1:]:  # Ignore the first column
-            unique_values = group[col].dropna().unique()
-            if len(unique_values) > 1:
-                for i, value in enumerate(unique_values):
-                    consolidated_row[f"{col} ({i + 1})" if i > 0 else col] = value
-            else:
-                consolidated_row[col] = unique_values[0] if unique_values.size > 0 else ""
-
-        consolidated_rows.append(consolidated_row)
-
-    # Create DataFrame without _temp_lowercase_key
-    consolidated_df = pd.DataFrame(consolidated_rows)
-
-    # **Ensure `_temp_lowercase_key` is removed from final DataFrame**
-    if "_temp_lowercase_key" in consolidated_df.columns:
-        consolidated_df.drop(columns=["_temp_lowercase_key"], errors='ignore', inplace=True)
-
-    # **Drop empty columns after merging**
-    consolidated_df = drop_nan_text_columns(consolidated_df)
-
-    logger.info(f"Final Consolidated DataFrame Shape: {consolidated_df.shape}")
-    logger.info(f"Final Consolidated DataFrame Columns: {consolidated_df.columns.tolist()}")
-    logger.info(f"Final Consolidated DataFrame: {consolidated_df}")
+    other_columns = list(df.columns[1:])
+
+    with timer.stage("sanitize"):
+        names = df[first_column].astype(str).map(sanitize_text).tolist()
+
+    with timer.stage("group"):
+        # lowercase name -> row positions, in first-seen order
+        groups = {}
+        for position, name in enumerate(names):
+            groups.setdefault(name.lower(), []).append(position)
+
+    with timer.stage("merge"):
+        columns = [df.iloc[:, idx].tolist() for idx in range(1, df.shape[1])]
+        consolidated_rows = []
+        for positions in groups.values():
+            consolidated_row = {first_column: names[positions[0]]}  # Keep the first case format
+            for col, values in zip(other_columns, columns):
+                if len(positions) == 1:
+                    value = values[positions[0]]
+                    consolidated_row[col] = "" if pd.isna(value) else value
+                    continue
+                unique_values = merge_group_values(values[position] for position in positions)
+                if len(unique_values) > 1:
+                    for i, value in enumerate(unique_values):
+                        consolidated_row[f"{col} ({i + 1})" if i > 0 else col] = value
+                else:
+                    consolidated_row[col] = unique_values[0] if unique_values else ""
+            consolidated_rows.append(consolidated_row)
+        consolidated_df = pd.DataFrame(consolidated_rows)
+
+    with timer.stage("drop_empty_columns"):
+        # **Drop empty columns after merging**
+        consolidated_df = drop_nan_text_columns(consolidated_df)
+
+    logger.info(
+        f"Consolidated {len(names)} rows into {len(consolidated_df)} "
+        f"(columns: {consolidated_df.columns.tolist()}); {timer.summary()}"
+    )
     return consolidated_df
 
 
@@ -5,12 +5,25 @@ from modules.services.excel_helper_modules.excel_operations import (
 )
 from modules.services.excel_helper_modules.consolidation import (
     consolidate_excel_sheets,
+    consolidate_sheets_in_memory,
     consolidate_dataframes
 )
 from modules.services.excel_helper_modules.file_operations import (
     save_sections_to_excel_and_csv,
     process_and_save_section,
-    process_table_data,
-    sanitize_sheet_name
+    process_table_data
 )
+from modules.services.excel_helper_modules.sanitization import sanitize_sheet_name
 
+
+# Facade over excel_helper_modules: callers import these names from here
+__all__ = [
+    "save_sheet",
+    "consolidate_excel_sheets",
+    "consolidate_sheets_in_memory",
+    "consolidate_dataframes",
+    "save_sections_to_excel_and_csv",
+    "process_and_save_section",
+    "process_table_data",
+    "sanitize_sheet_name",
+]
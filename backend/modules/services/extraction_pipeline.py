@@ -0,0 +1,677 @@
+"""
+The /extract pipeline: download -> slice -> analyze -> Excel -> consolidate -> upload.
+
+Runs outside the HTTP request (see `background_service.extraction_jobs`), so every
+helper takes the values it needs from a config mapping instead of the Flask app.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from PyPDF2 import PdfReader
+from modules.logging_util import setup_logger
+from modules.azure_extraction import extract_with_azure, upload_extraction_results_to_azure
+from modules.page_planner import plan_file_pages
+from modules.progress_tracker import ProgressTracker
+from modules.services.credit_service import validate_credits, reduce_credits
+from modules.services.page_service import calculate_pages_to_process, calculate_file_pages_to_process
+from modules.services.excel_service import consolidate_sheets_in_memory
+from modules.services.excel_helper_modules.data_processing import check_match_config
+from modules.services.document_store import DocumentStore
+from modules.models.user import User
+from modules.extraction_scheduler import get_extraction_scheduler, FILE_LANE, EXTRACTION_FILES_PER_REQUEST
+from modules.analysis_source import source_url_mode_enabled
+import copy
+import fitz  # PyMuPDF
+import tempfile
+import os
+logger = setup_logger(__name__)
+
+# Re-uploading the page-sliced PDF is only needed if something else reads it from blob storage
+REUPLOAD_SLICED_PDF = os.getenv("REUPLOAD_SLICED_PDF", "false").lower() in ['true', '1', 'yes']
+reupload_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sliced-pdf-upload")
+
+
+def run_extraction(data, user_id, config, job_id):
+    """
+    Handles data extraction from PDF files using Azure Form Recognizer
+    and uploads results to Azure Blob Storage.
+
+    :param data: The /extract request body (filenames, extraction_model, page_config).
+    :param user_id: ID of the user who submitted the extraction.
+    :param config: Mapping with AZURE_BLOB_SERVICE, AZURE_ENDPOINT, AZURE_KEY and UPLOAD_FOLDER (e.g. app.config).
+    :param job_id: Job id, also the key under which progress is published.
+    :return: Tuple of (response dict, status code).
+    """
+    # Step 1: Initialize (the /extract route validated the input before queueing the job)
+    azure_blob_service, progress_tracker, page_config, filenames, extraction_model, upload_folder, azure_endpoint, azure_key, progress_key, document_store = initialize_extraction(data, user_id, config, job_id)
+    saved_config = copy.deepcopy(page_config)
+
+    # Step 2: Download Files from Azure
+    progress_tracker.set_stage(progress_key, "downloading")
+    file_paths = download_files_from_azure(filenames, document_store)
+
+    # Step 3: Creating new PDFs with the provided page configs alone
+    # (or, when Azure selects the pages of the stored source, only validating the page configs).
+    progress_tracker.set_stage(progress_key, "slicing")
+    logger.info(f"file_paths: {file_paths}")
+    if source_url_mode_enabled():
+        page_config = select_source_pages(file_paths, page_config)
+    else:
+        file_paths, page_config = create_small_pdf_with_config(file_paths, page_config, user_id, azure_blob_service, document_store)
+    logger.info(f"Updated file_paths: {file_paths}")
+    saved_config = copy.deepcopy(page_config)
+
+    # Step 4: Calculate Pages to Process
+    total_pages, pages_to_process = calculate_pages_and_validate_credits(file_paths, page_config, progress_tracker, user_id, upload_folder)
+
+    # Step 5: Perform Extraction
+    progress_tracker.set_stage(progress_key, "analyzing", total_pages=pages_to_process)
+    results, file_page_counts, failed_files = perform_extraction_with_error_handling(
+        filenames, file_paths, user_id, upload_folder, progress_key, extraction_model,
+        azure_endpoint, azure_key, azure_blob_service, progress_tracker, page_config, pages_to_process,
+        get_extraction_tenant(user_id)
+    )
+
+    # Step 6: Combine the Excel Sheets Kept in Memory
+    progress_tracker.set_stage(progress_key, "consolidating")
+    artifact_manifest = build_artifact_manifest(results)
+    workbooks_to_combine = get_workbooks_to_combine(artifact_manifest, filenames, saved_config)
+    logger.info(f"Workbooks to combine: {[artifacts['excel'] for artifacts in workbooks_to_combine]}")
+    consolidated_file_path = None
+    if workbooks_to_combine:
+        consolidated_file_path = os.path.join(upload_folder, f"{filenames[0].split('.')[0]}_Combined_Sections.xlsx")
+        consolidate_sheets_in_memory([artifacts["sheets"] for artifacts in workbooks_to_combine], consolidated_file_path)
+        logger.info("Excel combining process completed.")
+        try:
+            uploaded_files = azure_blob_service.upload_file(user_id, consolidated_file_path, 'user_extract')
+            logger.info(f"Uploaded consolidated file to Azure: {uploaded_files}")
+        except Exception as e:
+            logger.error(f"Failed to upload consolidated file to Azure: {e}")
+
+    # Step 7: Upload Results to Azure
+    progress_tracker.set_stage(progress_key, "uploading")
+    response, successful_results, failed_results = upload_results_to_azure(results, file_page_counts, page_config, azure_blob_service, user_id, consolidated_file_path)
+
+    # Step 8: Deduct Credits for Successful Pages
+    deduct_credits_for_successful_pages(successful_results, file_page_counts, page_config, user_id)
+
+    progress_tracker.update_progress(progress_key, 0, pages_to_process, True)
+
+    # Step 9: Clean Up Local Files
+    cleanup_local_files(upload_folder, filenames)
+
+    # Include failure details in response
+    response['failed_files_grouped'] = failed_results
+
+    return response, 200 if successful_results else 500
+
+
+def create_small_pdf_with_config(file_paths, page_config, user_id, azure_blob_service, document_store):
+    """
+    Creates smaller PDFs based on page configurations and replaces the local copies with them.
+    A page referenced by several sections is copied once (see page_planner.plan_file_pages),
+    and each of those sections points at the same new page number.
+    The sliced PDF is only re-uploaded to Azure Blob Storage (in the background) when
+    REUPLOAD_SLICED_PDF is enabled; extraction always works from the local copy.
+
+    Args:
+        file_paths (dict): Dictionary where keys are file names and values are input PDF file paths.
+        page_config (dict): Configuration containing page ranges for each PDF.
+        user_id (str): User ID for organizing uploaded files in Azure Blob Storage.
+        azure_blob_service (AzureBlobService): Instance of AzureBlobService to handle uploads.
+        document_store (DocumentStore): Per-request store holding the local copies.
+
+    Returns:
+        tuple: (file_paths, updated_page_config)
+            - file_paths: The same dictionary passed as input.
+            - updated_page_config: Updated page configuration reflecting new page numbers and preserving other attributes.
+    """
+    updated_page_config = {}
+
+    try:
+        for file_name, file_path in file_paths.items():
+            if file_name in page_config:
+                logger.info(f"Processing file: {file_path}")
+                pdf_document = fitz.open(file_path)
+                new_pdf = fitz.open()
+
+                config = page_config[file_name]
+                new_page_config = {}
+                page_plan = plan_file_pages(config, len(pdf_document), file_name)
+                section_pages = dict(page_plan.sections)
+
+                # Every referenced page is copied once; sections sharing a page share its new number
+                new_page_numbers = {}
+                for page_num in page_plan.pages:
+                    new_pdf.insert_pdf(pdf_document, from_page=page_num - 1, to_page=page_num - 1)
+                    new_page_numbers[page_num] = len(new_page_numbers) + 1
+
+                for section, details in config.items():
+                    if section in section_pages:
+                        logger.info(f"Page ranges for {section}: {section_pages[section]}")
+                        updated_section = details.copy()  # Copy all existing keys in section
+                        updated_section['pageRange'] = ",".join(
+                            str(new_page_numbers[page_num]) for page_num in section_pages[section]
+                        )
+                        new_page_config[section] = updated_section
+                    else:
+                        logger.warning(
+                            f"No valid pages for section {section} in file {file_name}. "
+                            "Preserving original config."
+                        )
+                        new_page_config[section] = details  # Preserve original config if no pages are valid
+
+                # Save the new PDF to a temporary file
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_output_file:
+                    new_pdf.save(temp_output_file.name)
+                    modified_file_path = temp_output_file.name
+                    logger.info(f"Modified PDF created at: {modified_file_path}")
+
+                # Close documents
+                pdf_document.close()
+                new_pdf.close()
+
+                # Optionally re-upload the modified file to Azure Blob Storage without blocking extraction
+                if REUPLOAD_SLICED_PDF:
+                    with open(modified_file_path, "rb") as modified_file:
+                        modified_bytes = modified_file.read()
+                    logger.info(f"Scheduling background upload of modified file {file_name} for user {user_id}.")
+                    reupload_executor.submit(
+                        reupload_sliced_pdf, azure_blob_service, user_id, modified_bytes, file_name
+                    )
+
+                # Update the page configuration
+                updated_page_config[file_name] = new_page_config
+
+                file_paths[file_name] = document_store.replace(file_name, modified_file_path)
+                logger.info(f"Replaced original file with modified version: {file_paths[file_name]}")
+
+        return file_paths, updated_page_config
+
+    except Exception as e:
+        logger.error(f"Error processing files: {str(e)}")
+        raise Exception("Error processing files. Please try again later.")
+
+def select_source_pages(file_paths, page_config):
+    """
+    Counterpart of `create_small_pdf_with_config` for server-side page selection: no PDF is
+    built or uploaded, and the sections keep the page numbers of the source file. Each
+    pageRange is rewritten as the explicit list of its pages that exist in the file, the
+    same form the sliced configuration has.
+
+    Args:
+        file_paths (dict): Dictionary where keys are file names and values are local PDF file paths.
+        page_config (dict): Configuration containing page ranges for each PDF.
+
+    Returns:
+        dict: Updated page configuration preserving the other attributes of every section.
+    """
+    updated_page_config = {}
+
+    try:
+        for file_name, file_path in file_paths.items():
+            if file_name in page_config:
+                with fitz.open(file_path) as pdf_document:
+                    page_count = len(pdf_document)
+
+                new_page_config = {}
+                page_plan = plan_file_pages(page_config[file_name], page_count, file_name)
+                section_pages = dict(page_plan.sections)
+                for section, details in page_config[file_name].items():
+                    if section in section_pages:
+                        updated_section = details.copy()
+                        updated_section['pageRange'] = ",".join(map(str, section_pages[section]))
+                        new_page_config[section] = updated_section
+                    else:
+                        logger.warning(
+                            f"No valid pages for section {section} in file {file_name}. "
+                            "Preserving original config."
+                        )
+                        new_page_config[section] = details
+
+                updated_page_config[file_name] = new_page_config
+
+        return updated_page_config
+
+    except Exception as e:
+        logger.error(f"Error processing files: {str(e)}")
+        raise Exception("Error processing files. Please try again later.")
+
+def reupload_sliced_pdf(azure_blob_service, user_id, content, file_name):
+    """
+    Uploads the page-sliced PDF back to the user's upload folder. Runs on a background thread.
+    """
+    try:
+        azure_blob_service.upload_bytes(user_id, content, file_name, folder_type="user_upload")
+        logger.info(f"Uploaded modified file {file_name} for user {user_id} to Azure.")
+    except Exception as e:
+        logger.error(f"Background upload of modified file {file_name} failed: {e}")
+
+
+
+def build_artifact_manifest(results):
+    """
+    Collects the artifacts produced by each successful extraction.
+
+    Args:
+        results (list): Results returned by `extract_with_azure`.
+
+    Returns:
+        dict: Filename -> {"excel", "csv", "json", "text", "sheets"}, where "sheets" holds
+              the DataFrames written to the Excel file, keyed by sheet name.
+    """
+    manifest = {}
+    for result in results:
+        if "error" in result:
+            continue
+        extracted_data = result.get("extracted_data", {})
+        manifest[result["filename"]] = {
+            "excel": extracted_data.get("excel"),
+            "csv": extracted_data.get("csv"),
+            "json": extracted_data.get("json"),
+            "text": extracted_data.get("text"),
+            "sheets": result.get("excel_sheets") or {},
+        }
+    return manifest
+
+
+def get_workbooks_to_combine(artifact_manifest, filenames, page_config):
+    """
+    Retrieves the workbooks to combine, in the order of `filenames`. A workbook is
+    combined when one of its file's sections has the 'combine' flag set in the page_config.
+
+    Args:
+        artifact_manifest (dict): Manifest from `build_artifact_manifest`.
+        filenames (list): List of filenames (e.g., `file1.pdf`, `file2.pdf`).
+        page_config (dict): Configuration dictionary with combine flags.
+
+    Returns:
+        list: Manifest entries with at least one sheet.
+    """
+    workbooks = []
+    for filename in filenames:
+        artifacts = artifact_manifest.get(filename)
+        if not artifacts or not artifacts["sheets"]:
+            continue
+        sections = page_config.get(os.path.basename(filename), {})
+        if any(config.get("excel", {}).get("combine", False) for config in sections.values()):
+            workbooks.append(artifacts)
+    return workbooks
+
+
+
+def cleanup_local_files(user_folder, filenames):
+    """
+    Cleans up only the files listed in the filenames variable and their related extracted files
+    from the user-specific folder.
+
+    Args:
+        user_folder (str): The path to the user's folder.
+        filenames (list): List of filenames (e.g., PDF files) to delete.
+    """
+    try:
+        if not os.path.exists(user_folder):
+            logger.warning(f"User folder {user_folder} does not exist. Skipping cleanup.")
+            return
+
+        # Extract base names without extensions from filenames
+        base_filenames = [os.path.splitext(os.path.basename(filename))[0] for filename in filenames]
+
+        # Define relevant extensions to match extracted files
+        extracted_file_extensions = ['.json', '.csv', '.xlsx', '.txt', 'pdf']
+
+        for file in os.listdir(user_folder):
+            file_path = os.path.join(user_folder, file)
+
+            # Check if the file matches any base filename with an extracted extension
+            if any(file.startswith(base) and file.endswith(ext) for base in base_filenames for ext in extracted_file_extensions):
+                if os.path.isfile(file_path):
+                    os.remove(file_path)
+                    logger.info(f"Removed file: {file_path}")
+
+    except Exception as e:
+        logger.error(f"Error while cleaning up user-specific files: {e}")
+
+
+
+# Step 1: Initialize Extraction
+def initialize_extraction(data, user_id, config, job_id):
+    logger.info(f"Initializing extraction for user {user_id}")
+    page_config = data.get("page_config", {})
+    logger.info(f"Page Config: {page_config}")
+    filenames = data["filenames"]
+    extraction_model = data.get('extraction_model', 'NIRA AI - Printed Text (PB)').strip()
+
+    azure_blob_service = config["AZURE_BLOB_SERVICE"]
+    azure_endpoint = config['AZURE_ENDPOINT']
+    azure_key = config['AZURE_KEY']
+    upload_folder = create_or_get_user_folder(config["UPLOAD_FOLDER"], user_id)
+    progress_tracker = ProgressTracker()
+    document_store = DocumentStore(azure_blob_service, user_id, upload_folder)
+
+    # Progress is published under the job id
+    progress_key = job_id
+    progress_tracker.initialize_progress(progress_key, user_id=user_id)
+    logger.info(f"Progress initialized for job: {progress_key}")
+
+    # No second validate_input: the route validated the request before queueing it, and
+    # a file removed since then fails the download step
+    return azure_blob_service, progress_tracker, page_config, filenames, extraction_model, upload_folder, azure_endpoint, azure_key, progress_key, document_store
+
+# Step 2: Download Files from Azure
+def download_files_from_azure(filenames, document_store):
+    """
+    Makes sure every file is available locally in the user-specific folder.
+    Files already fetched by the document store are not downloaded again.
+    """
+    logger.info("Downloading files from Azure.")
+    try:
+        file_paths = document_store.fetch_all(filenames)
+    except Exception as e:
+        logger.error(f"Failed to download files {filenames}: {e}")
+        raise Exception("Error downloading files from Azure")
+
+    logger.info(f"Local files for extraction: {file_paths}")
+    return file_paths
+
+
+
+# Step 3: Calculate Pages and Validate Credits
+def calculate_pages_and_validate_credits(file_paths, page_config, progress_tracker, user_id, upload_folder):
+    total_pages = progress_tracker.calculate_total_pages(list(file_paths.keys()), upload_folder)
+    logger.info(f"Total Pages in PDF: {total_pages}")
+
+    pages_to_process = calculate_pages_to_process(page_config, total_pages)
+    logger.info(f"Pages to Process: {pages_to_process}")
+    if pages_to_process == 0:
+        raise ValueError("No pages to process based on the configuration.")
+
+    validate_credits(user_id, pages_to_process)
+    return total_pages, pages_to_process
+
+# Step 4: Perform Extraction with Error Handling
+def perform_extraction_with_error_handling(filenames, file_paths, user_id, upload_folder, progress_key, extraction_model, azure_endpoint, azure_key, azure_blob_service, progress_tracker, page_config, pages_to_process, tenant=None):
+    try:
+        results, file_page_counts = perform_extraction(
+            filenames, file_paths, user_id, upload_folder, progress_key, extraction_model,
+            azure_endpoint, azure_key, azure_blob_service, progress_tracker, page_config, pages_to_process, tenant
+        )
+         # Track failures grouped by filename
+        failed_files = {}
+        for result in results:
+            if "error" in result:
+                failed_files[result["filename"]] = result["error"]
+
+        if failed_files:
+            logger.error(f"Extraction failed for the following files: {failed_files}")
+
+        return results, file_page_counts, failed_files  # Return failed files info
+
+    except Exception as e:
+        logger.error(f"Extraction failed: {e}")
+        raise Exception("Extraction process failed. Please try again later.")
+
+
+
+# Step 5: Upload Results to Azure
+def upload_results_to_azure(results, file_page_counts, page_config, azure_blob_service, user_id, consolidated_file_path=None):
+    """
+    Uploads extraction results to Azure Blob Storage and updates the response.
+
+    Args:
+        results (list): List of extraction results.
+        file_page_counts (dict): File page counts for credit calculation.
+        page_config (dict): Configuration for page extraction.
+        azure_blob_service (AzureBlobService): Azure blob service instance.
+        user_id (str): User ID for organizing files.
+        consolidated_file_path (str, optional): Path to the consolidated Excel file.
+
+    Returns:
+        tuple: Response dictionary and list of successful results.
+    """
+    response = {"extracted_files": {}, "failed_files": []}
+    successful_results = []
+    failed_results = {}
+
+    # Process individual extraction results
+    for result in results:
+        filename = result["filename"]
+        if "error" in result:
+            logger.error(f"Extraction failed for {filename}: {result['error']}")
+            response["failed_files"].append(filename)
+            failed_results[filename] = result['error']
+            continue
+        if result['use_credit']:
+            successful_results.append(result)
+
+    # Upload successful extracted results
+    for result in successful_results:
+        filename = result["filename"]
+        upload_extraction_results_to_azure(result["extracted_data"], filename, azure_blob_service, user_id)
+
+    # Process successful results into response components
+    # Handle consolidated Excel upload
+    if consolidated_file_path:
+        try:
+            # Use the prefix from one of the file names in the results
+            prefix = successful_results[0]["filename"].split(".")[0] if successful_results else "Consolidated"
+            consolidated_filename = f"{prefix}_Combined_Sections.xlsx"
+            consolidated_blob_path = azure_blob_service.upload_file(
+                user_id, consolidated_file_path, folder_type='user_extract', destination_filename=consolidated_filename
+            )[0]  # Upload returns a list, take the first item
+            logger.info(f"Uploaded consolidated Excel file to Azure: {consolidated_blob_path}")
+        except Exception as e:
+            logger.error(f"Failed to upload consolidated Excel file to Azure: {e}")
+            combined_excel_paths = None
+    response_data, lines_data, csv_data, text_data, excel_paths, combined_excel_paths = process_results(successful_results, consolidated_file_path)
+    response.update({
+        'json_data': response_data,
+        'lines_data': lines_data,
+        'csv_data': csv_data,
+        'text_data': text_data,
+        'excel_paths': excel_paths,
+        'combined_excel_paths': combined_excel_paths
+    })
+
+
+    return response, successful_results, failed_results
+
+
+
+# Step 6: Deduct Credits for Successful Pages
+def deduct_credits_for_successful_pages(successful_results, file_page_counts, page_config, user_id):
+    logger.info("Starting credit deduction process.")
+    successful_pages = 0
+
+    for result in successful_results:
+        filename = result['filename']
+        logger.info(f"Processing file: {filename}")
+        if filename in file_page_counts:
+            pages_to_process = calculate_file_pages_to_process(page_config.get(filename, None), file_page_counts[filename])
+            successful_pages += pages_to_process
+        else:
+            logger.warning(f"File {filename} not found in file_page_counts.")
+
+    logger.info(f"Total successful pages to deduct credits for: {successful_pages}")
+    if successful_pages > 0:
+        reduce_credits(user_id, successful_pages)
+        logger.info(f"Deducted {successful_pages} credits for user {user_id}.")
+    else:
+        logger.error("Extraction failed due to page config error.")
+        raise ValueError("Extraction failed due to page config error.")
+
+def create_or_get_user_folder(upload_folder, user_id):
+    """
+    Creates a user-specific subfolder under the UPLOAD_FOLDER.
+    """
+    user_folder = os.path.join(upload_folder, user_id)
+    os.makedirs(user_folder, exist_ok=True)
+    logger.info(f"User-specific folder created: {user_folder}")
+    return user_folder
+
+
+def validate_input(data, document_store):
+    """
+    Validates the input data for the extraction request.
+    Ensures page_config is present for files with more than 10 pages.
+    Returns (is_valid, error_body, status_code); error_body is a plain dict for the caller to serialize.
+    Page counts come from the per-request document store, so each file is fetched only once.
+    """
+    if 'filenames' not in data:
+        logger.error('Filenames are required')
+        return False, {'message': 'Filenames are required'}, 400
+
+    page_config = data.get('page_config', {})
+    filenames = data['filenames']
+
+    for filename, file_config in page_config.items():
+        for section, section_config in (file_config.items() if isinstance(file_config, dict) else []):
+            excel_config = section_config.get('excel') if isinstance(section_config, dict) else None
+            if not isinstance(excel_config, dict):
+                continue
+            try:
+                check_match_config(excel_config)
+            except ValueError as e:
+                logger.error(f"Invalid excel config for section {section} of {filename}: {e}")
+                return False, {'message': f'Invalid excel config for section {section} of {filename}: {e}'}, 400
+
+    for filename in filenames:
+        try:
+            total_pages = document_store.page_count(filename)
+            logger.info(f"Total Pages: {total_pages}")
+            if total_pages > 10 and filename not in page_config:
+                logger.error(f"Page configuration is mandatory for files with more than 10 pages. Missing for {filename}")
+                return False, {'message': f'Page configuration is mandatory for {filename} with more than 10 pages'}, 400
+        except Exception as e:
+            logger.error(f"Failed to validate {filename}: {e}")
+            return False, {'message': f'Failed to validate {filename}: {e}'}, 500
+
+    return True, None, None
+
+def process_results(results, consolidated_file_path = None):
+    """
+    Processes the results from concurrent extraction tasks.
+    Dynamically handles table-based and other extractions.
+
+    :param results: List of results from concurrent extraction tasks
+    :return: Processed response data, lines data, CSV paths, text paths, and a list of excel paths
+    """
+    response_data = {}
+    lines_data = {}
+    csv_paths = {}
+    text_paths = {}
+    excel_paths = {}
+    combined_excel_paths = {}
+
+    for result in results:
+        filename = result.get('filename')
+        extracted_data = result.get('extracted_data', {})
+        original_lines = extracted_data.get('original_lines')  # Use original lines for lines_data
+
+        # Initialize storage for the file's data
+        file_data = {
+            "json_data": None,
+            "csv_data": None,
+            "excel_path": None,
+            "text_data": None,
+            "combined_excel_paths": None
+        }
+
+        # Store paths for JSON, CSV, and Excel files
+        file_data["json_data"] = extracted_data.get('json')
+        file_data["csv_data"] = extracted_data.get('csv')
+        file_data["excel_path"] = extracted_data.get('excel')
+        file_data["text_data"] = extracted_data.get('text')
+        file_data["combined_excel_paths"] = consolidated_file_path
+
+        # Append paths to respective lists
+        if file_data["csv_data"]:
+            csv_paths[filename] = file_data["csv_data"]
+        if file_data["excel_path"]:
+            excel_paths[filename] = file_data["excel_path"]
+        if file_data["text_data"]:
+            text_paths[filename] = file_data["text_data"]
+        if file_data["combined_excel_paths"]:
+            combined_excel_paths[filename] = file_data["combined_excel_paths"]
+
+        # Store extracted data and lines data
+        response_data[filename] = file_data["json_data"]
+        lines_data[filename] = original_lines  # Set lines_data using original lines
+    return response_data, lines_data, csv_paths, text_paths, excel_paths, combined_excel_paths
+
+def get_extraction_tenant(user_id):
+    """
+    Returns the key the extraction scheduler shares capacity by: the user's company,
+    or the user itself when it has no company.
+    """
+    try:
+        user = User.query.get(user_id)
+        if user is not None and user.company_id:
+            return f"company:{user.company_id}"
+    except Exception as e:
+        logger.warning(f"Could not look up the company of user {user_id}: {e}")
+    return f"user:{user_id}"
+
+
+def perform_extraction(
+    filenames, file_paths, user_id, upload_folder, progress_key, extraction_model,
+    azure_endpoint, azure_key, azure_blob_service, progress_tracker, page_config=None, pages_to_process = 0, tenant=None
+):
+    """
+    Orchestrates the extraction process for multiple files using Azure Form Recognizer.
+    Files run on the process-wide scheduler's file lane, at most EXTRACTION_FILES_PER_REQUEST at a time.
+    :param filenames: List of filenames to process
+    :param file_paths: Dictionary mapping filenames to their local file paths
+    :param user_id: ID of the user performing the extraction
+    :param upload_folder: Local folder containing uploaded files
+    :param progress_key: Key of the job in the progress store
+    :param extraction_model: Model to use for extraction
+    :param azure_endpoint: Azure Form Recognizer endpoint
+    :param azure_key: Azure Form Recognizer key
+    :param azure_blob_service: Azure Blob service instance
+    :param progress_tracker: Instance of ProgressTracker for updating progress
+    :param page_config: Optional page configurations for each file
+    :param tenant: Scheduler tenant of the request (see get_extraction_tenant)
+    :return: Results and page counts for each file
+    """
+    results = []
+    file_page_counts = {}  # Track page count for each file
+    file_tasks = []
+
+    for filename in filenames:
+        # Get local file path for the current file
+        pdf_path = file_paths.get(filename)
+        if not pdf_path:
+            logger.error(f"File path for {filename} not found.")
+            results.append({"filename": filename, "error": "File path not found."})
+            continue
+
+        # Calculate total pages for the current file
+        try:
+            reader = PdfReader(pdf_path)
+            total_pages = len(reader.pages)
+            logger.info(f"Total pages for {filename}: {total_pages}")
+            file_page_counts[filename] = total_pages
+        except Exception as e:
+            logger.error(f"Error calculating total pages for {filename}: {e}")
+            results.append({"filename": filename, "error": f"Failed to calculate total pages: {e}"})
+            continue
+
+        # Get page config for the current file
+        specified_pages = page_config.get(filename) if page_config else None
+        logger.info(f"Specified pages for {filename}: {specified_pages}")
+        file_tasks.append((filename, pdf_path, total_pages, specified_pages))
+
+    def extract_file(task):
+        filename, pdf_path, total_pages, specified_pages = task
+        return extract_with_azure(
+            filename, user_id, azure_blob_service, upload_folder, pages_to_process,
+            total_pages, progress_key, progress_tracker, extraction_model, azure_endpoint, azure_key, specified_pages,
+            pdf_path
+        )
+
+    scheduler = get_extraction_scheduler()
+    results.extend(scheduler.map_in_order(
+        FILE_LANE, extract_file, file_tasks, EXTRACTION_FILES_PER_REQUEST, tenant=tenant or f"user:{user_id}"
+    ))
+    logger.info(f"Extraction scheduler after {len(file_tasks)} files for user {user_id}: {scheduler.metrics()}")
+
+    return results, file_page_counts
@@ -1,4 +1,5 @@
 # backend/modules/services/page_service.py
+from modules.page_planner import plan_file_pages
 
 def calculate_pages_to_process(page_config, total_pages):
     """
@@ -20,53 +21,21 @@ def calculate_pages_to_process(page_config, total_pages):
                             }
                         }
     :param total_pages: Total number of pages in the PDF.
-    :return: Total number of pages to process.
+    :return: Total number of pages to process, counting each page of a file once.
     """
     if not page_config:
         return total_pages  # No specific page configuration, process the entire PDF
 
-    pages_to_process = 0
+    # A page shared by several sections of a file is analyzed, and charged, once
+    return sum(len(plan_file_pages(sections, file_name=file_name).pages) for file_name, sections in page_config.items())
 
-    for file_name, sections in page_config.items():
-        for section, config in sections.items():
-            # Extract the page range from the section config
-            pages = config.get('pageRange', '')
-
-            if '-' in pages:  # Page range (e.g., "6-9")
-                start, end = map(int, pages.split('-'))
-                pages_to_process += (end - start + 1)
-            elif ',' in pages:  # Specific pages (e.g., "5,6")
-                pages_to_process += len(pages.split(','))
-            elif pages.isdigit():  # Single page (e.g., "2")
-                pages_to_process += 1
-            else:
-                raise ValueError(f"Invalid page range format: {pages}")
-
-    return pages_to_process
 
 def calculate_file_pages_to_process(file_config, total_pages):
     """
-    Calculate pages to process for a specific file configuration.
+    Calculate pages to process for a specific file configuration: its unique pages
+    within the file, however many sections reference them.
     """
     if not file_config:
         return total_pages  # No specific configuration for this file
 
-    pages_to_process = 0
-
-    for section, config in file_config.items():
-        if not isinstance(config, dict):
-            raise ValueError(f"Expected a dictionary for section config, got {type(config).__name__}: {config}")
-
-        pages = config.get('pageRange', '')
-
-        if '-' in pages:  # Page range (e.g., "6-9")
-            start, end = map(int, pages.split('-'))
-            pages_to_process += (end - start + 1)
-        elif ',' in pages:  # Specific pages (e.g., "5,6")
-            pages_to_process += len(pages.split(','))
-        elif pages.isdigit():  # Single page (e.g., "2")
-            pages_to_process += 1
-        else:
-            raise ValueError(f"Invalid page range format: {pages}")
-
-    return pages_to_process
+    return len(plan_file_pages(file_config, total_pages).pages)
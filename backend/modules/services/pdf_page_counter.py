@@ -0,0 +1,259 @@
+"""
+Counts PDF pages from a few ranged reads instead of the whole file.
+
+Only the pieces needed to reach the page tree root are read: the linearization
+dictionary at the head of the file if present and still describing the whole file,
+otherwise the trailer/xref at the end of the file, the catalog and the /Pages object. Both classic xref tables and
+compressed xref/object streams are supported; anything else raises
+`PageCountUnavailable` so callers can fall back to a full download.
+"""
+import re
+import zlib
+from modules.logging_util import setup_logger
+
+logger = setup_logger(__name__)
+
+HEAD_READ_SIZE = 1024
+TAIL_READ_SIZE = 2048
+MAX_TAIL_READ_SIZE = 64 * 1024
+OBJECT_READ_SIZE = 4096
+MAX_OBJECT_READ_SIZE = 1024 * 1024
+MAX_XREF_SECTIONS = 32
+
+LINEARIZED_PATTERN = re.compile(rb"<<\s*/Linearized\s+[\d.]+(.*?)>>", re.DOTALL)
+LINEARIZED_LENGTH_PATTERN = re.compile(rb"/L\s+(\d+)")
+LINEARIZED_PAGES_PATTERN = re.compile(rb"/N\s+(\d+)")
+STARTXREF_PATTERN = re.compile(rb"startxref\s+(\d+)")
+XREF_SUBSECTION_PATTERN = re.compile(rb"\s*(\d+)\s+(\d+)\s*[\r\n]+")
+XREF_ENTRY_PATTERN = re.compile(rb"\s*(\d+)\s+(\d+)\s+([nf])")
+ROOT_PATTERN = re.compile(rb"/Root\s+(\d+)\s+\d+\s+R")
+PREV_PATTERN = re.compile(rb"/Prev\s+(\d+)")
+PAGES_REF_PATTERN = re.compile(rb"/Pages\s+(\d+)\s+\d+\s+R")
+COUNT_PATTERN = re.compile(rb"/Count\s+(\d+)(\s+\d+\s+R)?")
+
+
+class PageCountUnavailable(Exception):
+    """Raised when the page count cannot be determined from ranged reads."""
+
+
+class RangedPdfPageCounter:
+    """
+    Resolves the page count of a remote PDF through a `read_range(offset, length)` callable.
+    """
+
+    def __init__(self, read_range, size):
+        self.read_range = read_range
+        self.size = size
+        self.xref = {}  # object number -> ("offset", offset) or ("compressed", objstm number, index)
+        self.root = None
+        self.bytes_read = 0
+
+    def _read(self, offset, length):
+        offset = max(0, offset)
+        length = max(0, min(length, self.size - offset))
+        if length == 0:
+            return b""
+        data = self.read_range(offset, length)
+        self.bytes_read += len(data)
+        return data
+
+    def count_pages(self):
+        linearized_pages = self._linearized_page_count(self._read(0, HEAD_READ_SIZE))
+        if linearized_pages is not None:
+            return linearized_pages
+
+        self._load_xref_chain(self._find_startxref())
+        if self.root is None:
+            raise PageCountUnavailable("Trailer has no /Root entry")
+
+        catalog = self._read_object(self.root)
+        pages_match = PAGES_REF_PATTERN.search(catalog)
+        if not pages_match:
+            raise PageCountUnavailable("Catalog has no /Pages reference")
+
+        pages = self._read_object(int(pages_match.group(1)))
+        count_match = COUNT_PATTERN.search(pages)
+        if not count_match:
+            raise PageCountUnavailable("Page tree root has no /Count")
+        if count_match.group(2):
+            # /Count stored as an indirect object
+            return int(re.search(rb"obj\s*(\d+)", self._read_object(int(count_match.group(1)))).group(1))
+        return int(count_match.group(1))
+
+    def _linearized_page_count(self, head):
+        """
+        Returns /N of the linearization dictionary, or None when there is none or it is stale:
+        an incremental update appends to the file, so its /L no longer equals the file size.
+        """
+        match = LINEARIZED_PATTERN.search(head)
+        if not match:
+            return None
+        length = LINEARIZED_LENGTH_PATTERN.search(match.group(1))
+        pages = LINEARIZED_PAGES_PATTERN.search(match.group(1))
+        if not length or not pages or int(length.group(1)) != self.size:
+            logger.info("Linearization dictionary does not match the file size; reading the page tree instead")
+            return None
+        return int(pages.group(1))
+
+    def _find_startxref(self):
+        read_size = TAIL_READ_SIZE
+        while True:
+            tail = self._read(self.size - read_size, read_size)
+            matches = STARTXREF_PATTERN.findall(tail)
+            if matches:
+                return int(matches[-1])
+            if read_size >= MAX_TAIL_READ_SIZE or read_size >= self.size:
+                raise PageCountUnavailable("No startxref found near the end of the file")
+            read_size *= 4
+
+    def _read_until(self, offset, marker):
+        """
+        Reads from `offset` until `marker` is found, doubling the window as needed.
+        """
+        read_size = OBJECT_READ_SIZE
+        while True:
+            data = self._read(offset, read_size)
+            if marker in data or offset + read_size >= self.size:
+                return data
+            if read_size >= MAX_OBJECT_READ_SIZE:
+                raise PageCountUnavailable(f"Marker {marker!r} not found within {read_size} bytes of {offset}")
+            read_size *= 4
+
+    def _load_xref_chain(self, offset):
+        seen = set()
+        while offset is not None and offset not in seen and len(seen) < MAX_XREF_SECTIONS:
+            seen.add(offset)
+            head = self._read(offset, 16).lstrip()
+            if head.startswith(b"xref"):
+                trailer = self._load_xref_table(offset)
+            else:
+                trailer = self._load_xref_stream(offset)
+
+            if self.root is None:
+                root_match = ROOT_PATTERN.search(trailer)
+                if root_match:
+                    self.root = int(root_match.group(1))
+            prev_match = PREV_PATTERN.search(trailer)
+            offset = int(prev_match.group(1)) if prev_match else None
+
+    def _load_xref_table(self, offset):
+        data = self._read_until(offset, b"trailer")
+        body, _, trailer = data.partition(b"trailer")
+        position = body.index(b"xref") + 4
+        while True:
+            match = XREF_SUBSECTION_PATTERN.match(body, position)
+            if not match:
+                break
+            first, count = int(match.group(1)), int(match.group(2))
+            position = match.end()
+            for index in range(count):
+                entry = XREF_ENTRY_PATTERN.match(body, position)
+                if not entry:
+                    raise PageCountUnavailable("Truncated xref table")
+                position = entry.end()
+                if entry.group(3) == b"n":
+                    # Newer sections are read first, so earlier entries win
+                    self.xref.setdefault(first + index, ("offset", int(entry.group(1))))
+        if b">>" not in trailer:
+            trailer = self._read_until(offset + len(body) + len(b"trailer"), b">>")
+        return trailer
+
+    def _load_xref_stream(self, offset):
+        dictionary, stream = self._read_stream_object(offset)
+        widths = [int(w) for w in re.search(rb"/W\s*\[\s*([\d\s]+)\]", dictionary).group(1).split()]
+        size = int(re.search(rb"/Size\s+(\d+)", dictionary).group(1))
+        index_match = re.search(rb"/Index\s*\[\s*([\d\s]+)\]", dictionary)
+        index = [int(i) for i in index_match.group(1).split()] if index_match else [0, size]
+
+        row_size = sum(widths)
+        position = 0
+        for first, count in zip(index[0::2], index[1::2]):
+            for number in range(first, first + count):
+                row = stream[position:position + row_size]
+                position += row_size
+                fields, field_position = [], 0
+                for width in widths:
+                    fields.append(int.from_bytes(row[field_position:field_position + width], "big") if width else None)
+                    field_position += width
+                entry_type = 1 if fields[0] is None else fields[0]
+                if entry_type == 1:
+                    self.xref.setdefault(number, ("offset", fields[1]))
+                elif entry_type == 2:
+                    self.xref.setdefault(number, ("compressed", fields[1], fields[2]))
+        return dictionary
+
+    def _read_stream_object(self, offset):
+        """
+        Reads an indirect stream object at `offset` and returns (dictionary bytes, decoded stream bytes).
+        """
+        data = self._read_until(offset, b"stream")
+        dictionary = data[:data.index(b"stream")]
+        length = int(re.search(rb"/Length\s+(\d+)", dictionary).group(1))
+        start = offset + data.index(b"stream") + len(b"stream")
+        raw = self._read(start, length + 2)
+        raw = raw[2:] if raw.startswith(b"\r\n") else raw[1:]
+        raw = raw[:length]
+
+        if b"/FlateDecode" in dictionary:
+            raw = zlib.decompress(raw)
+        elif b"/Filter" in dictionary:
+            raise PageCountUnavailable("Unsupported stream filter")
+
+        predictor_match = re.search(rb"/Predictor\s+(\d+)", dictionary)
+        if predictor_match and int(predictor_match.group(1)) >= 10:
+            columns = int(re.search(rb"/Columns\s+(\d+)", dictionary).group(1))
+            raw = self._undo_png_predictor(raw, columns)
+        return dictionary, raw
+
+    @staticmethod
+    def _undo_png_predictor(data, columns):
+        rows, previous = [], bytearray(columns)
+        for position in range(0, len(data), columns + 1):
+            filter_type, row = data[position], bytearray(data[position + 1:position + 1 + columns])
+            if filter_type == 2:  # Up
+                row = bytearray((row[i] + previous[i]) & 0xFF for i in range(len(row)))
+            elif filter_type != 0:
+                raise PageCountUnavailable(f"Unsupported PNG predictor {filter_type}")
+            rows.append(bytes(row))
+            previous = row
+        return b"".join(rows)
+
+    def _read_object(self, number):
+        entry = self.xref.get(number)
+        if entry is None:
+            raise PageCountUnavailable(f"Object {number} not found in xref")
+
+        if entry[0] == "offset":
+            data = self._read_until(entry[1], b"endobj")
+            return data[:data.index(b"endobj")] if b"endobj" in data else data
+
+        # Object stored inside an object stream
+        objstm_entry = self.xref.get(entry[1])
+        if objstm_entry is None or objstm_entry[0] != "offset":
+            raise PageCountUnavailable(f"Object stream {entry[1]} not found in xref")
+        dictionary, stream = self._read_stream_object(objstm_entry[1])
+        count = int(re.search(rb"/N\s+(\d+)", dictionary).group(1))
+        first = int(re.search(rb"/First\s+(\d+)", dictionary).group(1))
+        header = [int(value) for value in stream[:first].split()[:count * 2]]
+        offsets = dict(zip(header[0::2], header[1::2]))
+        ordered = sorted(offsets.values())
+        start = offsets[number]
+        following = [value for value in ordered if value > start]
+        end = following[0] if following else len(stream) - first
+        return b"%d 0 obj " % number + stream[first + start:first + end]
+
+
+def count_pdf_pages_with_ranged_reads(read_range, size):
+    """
+    Returns (page_count, bytes_read) for a PDF of `size` bytes using `read_range(offset, length)`.
+
+    :raises PageCountUnavailable: If the structure could not be resolved from ranged reads.
+    """
+    counter = RangedPdfPageCounter(read_range, size)
+    try:
+        page_count = counter.count_pages()
+    except PageCountUnavailable:
+        raise
+    except Exception as e:
+        raise PageCountUnavailable(f"Failed to parse PDF structure: {e}")
+    return page_count, counter.bytes_read
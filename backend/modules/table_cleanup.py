@@ -0,0 +1,315 @@
+"""
+Cleanup rules applied to every table extracted by the prebuilt-document model.
+
+The rules run in TABLE_CLEANUP_RULES order. A section can switch rules off
+through the "tableCleanup" key of its page config, e.g.
+{"pageRange": "3-5", "tableCleanup": {"year_column_selection": false}}.
+Each rule is timed separately so the cleanup can be profiled per table.
+"""
+import re
+import pandas as pd
+from .logging_util import setup_logger, lazy
+from .timing_util import StageTimer
+from .financial_keywords import FINANCIAL_CLASSIFIER
+
+logger = setup_logger(__name__)
+
+ROMAN_NUMERAL_PATTERN = re.compile(
+    r"^(I|II|III|IV|V|VI|VII|VIII|IX|X|XI|XII|XIII|XIV|XV|XVI|XVII|XVIII|XIX|XX)$"
+)
+# Roman numerals, numbers or section symbols ("=", "-", ":")
+SHORT_VALUE_PATTERN = re.compile(
+    r"^(?:(?=[MDCLXVI])M{0,4}(?:CM|CD|D?C{0,3})(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3})"
+    r"|\d+(?:\.\d+)?"
+    r"|[=\-:]+)$"
+)
+SHORT_VALUE_MAX_LENGTH = 5
+ROMAN_PREFIX_PATTERN = re.compile(r"^\s*\b(M{0,4}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{0,3}))\b[\s.]*")
+YEAR_HEADER_PATTERN = re.compile(r'^(19|20)\d{2}$')
+YEAR_PATTERN = re.compile(r'(\b(19|20|21)\d{2}\b)')  # Match years from 1900 to 2199
+EMPTY_MARKERS = ["", "nan", "none", "null"]
+
+
+def is_roman_numeral(value):
+    """Check if a string is a Roman numeral (e.g., I, II, III, IV)."""
+    return bool(ROMAN_NUMERAL_PATTERN.match(str(value).strip()))
+
+
+def is_short_or_pattern(value):
+    """Check if value matches short patterns: Roman numerals, numbers, or symbols."""
+    if not isinstance(value, str) or not value.strip():
+        return False
+    return len(value.strip()) <= SHORT_VALUE_MAX_LENGTH and bool(SHORT_VALUE_PATTERN.match(value))
+
+
+def short_value_mask(values):
+    """Vectorized `is_short_or_pattern` for a Series of already stripped strings."""
+    return values.str.len().between(1, SHORT_VALUE_MAX_LENGTH) & values.str.match(SHORT_VALUE_PATTERN)
+
+
+def count_financial_keywords(values, threshold=0.25):
+    """Count financial keywords in the column and return True if above threshold."""
+    ratio = FINANCIAL_CLASSIFIER.column_ratio(values)
+
+    logger.info(f"Financial keyword match count: {round(ratio * len(values))}, Ratio: {ratio:.2f}, Threshold: {threshold}, total values: {len(values)}")
+
+    return ratio >= threshold
+
+
+def should_remove_first_column(df, financial_threshold=0.25):
+    """Determines whether the first column should be removed based on financial keyword presence."""
+    try:
+        if df.empty or len(df.columns) < 2:
+            logger.warning("DataFrame is empty or has less than two columns. Skipping first column removal.")
+            return False
+
+        first_column_values = df[df.columns[0]].dropna().astype(str).str.strip()
+        logger.debug("First column values: %s", lazy(first_column_values.tolist()))
+        total_values = len(first_column_values)
+        if total_values == 0:
+            logger.warning("First column has no values. It will not be removed.")
+            return False
+        # Check if the first and second columns have mostly equal values
+        second_column_values = df[df.columns[1]].dropna().astype(str).str.strip()
+        equal_values_ratio = (first_column_values == second_column_values).sum() / total_values
+
+        if equal_values_ratio > 0.85:
+            logger.info("First column removed due to mostly equal values with the second column.")
+            return True
+
+        # 1️⃣ Priority Check: Financial Keyword Presence
+        if count_financial_keywords(first_column_values, threshold=financial_threshold):
+            logger.info("First column retained due to sufficient financial keywords.")
+            return False
+
+        # Check if the first column contains mostly Roman numerals or numbers with or without empty values
+        numeric_mask = first_column_values.str.isnumeric()
+        roman_or_numeric_mask = (
+            first_column_values.str.match(ROMAN_NUMERAL_PATTERN) | numeric_mask | (first_column_values == "")
+        )
+        roman_or_numeric_ratio = roman_or_numeric_mask.sum() / total_values
+
+        if roman_or_numeric_ratio > 0.40:
+            logger.info("First column removed due to mostly Roman numerals or numeric values with or without empty values.")
+            return True
+
+        # 2️⃣ Pattern Check (Backup if no financial keywords)
+        short_mask = short_value_mask(first_column_values)
+        short_value_ratio = short_mask.sum() / total_values
+
+        # 3️⃣ Repeated Patterns
+        repeated_pattern = first_column_values.nunique() > 5 and bool(short_mask.all())
+
+        # 4️⃣ Numeric-Only Check
+        numeric_only_ratio = numeric_mask.sum() / total_values
+
+        # 5️⃣ Fully Empty Check
+        is_fully_empty = first_column_values.isin(EMPTY_MARKERS).all()
+
+        logger.info(f"Short value ratio: {short_value_ratio:.2f}, "
+                    f"Numeric-only ratio: {numeric_only_ratio:.2f}, "
+                    f"Repeated pattern: {repeated_pattern}, "
+                    f"Fully empty: {is_fully_empty}")
+
+        # Final Removal Decision
+        remove_column = (
+            short_value_ratio > 0.85 or        # Short pattern dominant
+            numeric_only_ratio > 0.9 or        # Numeric only
+            repeated_pattern or                # Repeated pattern
+            is_fully_empty                     # Fully empty
+        )
+
+        logger.info(f"Final Decision to remove first column: {remove_column}")
+        return remove_column
+
+    except Exception as e:
+        logger.error(f"Error determining if first column should be removed: {str(e)}")
+        return False
+
+
+def handle_first_column_removal(df_table):
+    """Handles removal of the first column and adjusts headers if needed."""
+    first_column_name = df_table.columns[0]
+    logger.info(f"First column name: {first_column_name}")
+
+    if should_remove_first_column(df_table):
+        logger.info(f"Removing first column: {first_column_name} and shifting headers")
+
+        # Shift headers if the second column is blank (common in merged headers)
+        if df_table.columns[1].strip() == "":
+            df_table.columns = [df_table.iloc[0, 0]] + df_table.columns[2:].tolist()
+            df_table = df_table.iloc[1:].reset_index(drop=True)
+        else:
+            df_table = df_table.drop(columns=[first_column_name])
+    logger.info(f"Table Columns After First Column Removal: {list(df_table.columns)}")
+    return df_table
+
+
+def remove_roman_numerals(df):
+    """
+    Removes leading Roman numerals from the first column of a DataFrame, ensuring that only valid
+    numerals are removed while preserving regular text.
+
+    Args:
+        df (pd.DataFrame): The input DataFrame with Roman numerals in the first column.
+
+    Returns:
+        pd.DataFrame: The updated DataFrame with Roman numerals removed.
+    """
+    first_column = df.columns[0]
+    df[first_column] = df[first_column].astype(str).str.replace(ROMAN_PREFIX_PATTERN, '', regex=True).str.strip()
+    return df
+
+
+def should_remove_first_row(df):
+    """Determines whether the first row should be removed based on year values in column headers."""
+    try:
+        # Check if any column header contains a year value
+        has_year_header = df.columns.astype(str).str.strip().str.match(YEAR_HEADER_PATTERN).any()
+
+        if not has_year_header:
+            logger.info("First row removed due to absence of year values in column headers.")
+            return True
+
+        logger.info("First row retained due to presence of year values in column headers.")
+        return False
+
+    except Exception as e:
+        logger.error(f"Error determining if first row should be removed: {str(e)}")
+        return False
+
+
+def handle_wrong_header_removal(df_table):
+    if should_remove_first_row(df_table):
+        df_table = df_table[1:].reset_index(drop=True)
+    # Remove the first row if it is a duplicate of the header
+    logger.info(f"First row: {df_table.iloc[0].tolist()}")
+    logger.info(f"Header: {df_table.columns.tolist()}")
+    if df_table.iloc[0].tolist() == df_table.columns.tolist():
+        logger.info("Detected duplicate row matching the header. Removing the first row.")
+        df_table = df_table[1:].reset_index(drop=True)
+        logger.info(f"First row removed. New first row: {df_table.iloc[0].tolist()}")
+    return df_table
+
+
+def extract_year_columns(df):
+    """Extract columns that contain year values."""
+    year_columns = {}
+    for col in df.columns:
+        match = YEAR_PATTERN.search(col)
+        if match:
+            year_columns[col] = int(match.group(1))
+    return year_columns
+
+
+def find_most_recent_year(year_columns):
+    """Find the most recent year from the extracted year columns."""
+    return max(year_columns.values()) if year_columns else None
+
+
+def identify_columns_to_remove(df, year_columns, most_recent_year):
+    """Identify columns to remove based on year values and other criteria."""
+    columns_to_remove = []
+    for i, col in enumerate(df.columns):
+        if col in year_columns and year_columns[col] == most_recent_year:
+            # Remove if the column contains the most recent year
+            columns_to_remove.append(col)
+        elif col not in year_columns and i != 0:
+            # Remove columns that don't have a year (except the first column)
+            columns_to_remove.append(col)
+    return columns_to_remove
+
+
+def handle_unnecessary_column_removal(df):
+    """Handle the removal of unnecessary columns from the DataFrame."""
+    year_columns = extract_year_columns(df)
+    most_recent_year = find_most_recent_year(year_columns)
+
+    # Check if the most recent year is the past year
+    ref_year = pd.Timestamp.now().year - 1
+    if most_recent_year == ref_year:
+        logger.info(f"Most recent year is the current year ({ref_year}). No columns will be removed.")
+        most_recent_year = ""
+    columns_to_remove = identify_columns_to_remove(df, year_columns, most_recent_year)
+    df = df.drop(columns=columns_to_remove, errors='ignore')
+    return df
+
+
+def convert_first_column_to_particulars(df):
+    """Convert the first column header to 'Particulars' if it is not already set."""
+    if df.columns[0].strip().lower() != 'particulars':
+        df.columns = ['Particulars'] + df.columns[1:].tolist()
+    return df
+
+
+def remove_column_with_no_heading(df):
+    """Remove columns that have no heading or only whitespace characters."""
+    df = df.loc[:, df.columns.str.strip() != ""]
+    return df
+
+
+def clean_table(df_table):
+    """Cleans the extracted table by removing duplicates, empty columns, and adjusting headers."""
+    # Remove duplicate columns
+    df_table = df_table.loc[:, ~df_table.columns.duplicated()]
+    logger.info(f"Table Shape After Removing Duplicates: {df_table.shape}")
+
+    # Remove duplicate headers if the first row matches column names
+    if df_table.iloc[0].tolist() == df_table.columns.tolist():
+        logger.info("Detected duplicate column headers in the first row. Removing...")
+        df_table = df_table[1:].reset_index(drop=True)
+
+    # Drop fully empty columns
+    df_table = df_table.dropna(axis=1, how="all")
+    logger.info(f"Table Shape After Dropping Empty Columns: {df_table.shape}")
+
+    # Drop fully empty rows
+    df_table = df_table.dropna(how="all")
+    logger.info(f"Final Processed Table Shape: {df_table.shape}")
+
+    return df_table
+
+
+# (rule name, function) in execution order. The header-row check runs both
+# before and after the year columns are selected; disabling it skips both passes.
+TABLE_CLEANUP_RULES = [
+    ("first_column_removal", handle_first_column_removal),
+    ("roman_numeral_prefix", remove_roman_numerals),
+    ("wrong_header_removal", handle_wrong_header_removal),
+    ("year_column_selection", handle_unnecessary_column_removal),
+    ("wrong_header_removal", handle_wrong_header_removal),
+    ("particulars_header", convert_first_column_to_particulars),
+    ("no_heading_column_removal", remove_column_with_no_heading),
+    ("clean_table", clean_table),
+]
+RULE_NAMES = {name for name, _ in TABLE_CLEANUP_RULES}
+
+
+def get_enabled_rules(cleanup_config=None):
+    """
+    Returns the (name, function) rules to run for a section.
+
+    :param cleanup_config: The section's "tableCleanup" config, mapping rule name -> enabled.
+                           Rules that are not listed stay enabled.
+    """
+    cleanup_config = cleanup_config or {}
+    unknown = set(cleanup_config) - RULE_NAMES
+    if unknown:
+        logger.warning(f"Ignoring unknown table cleanup rules: {sorted(unknown)}")
+    return [(name, rule) for name, rule in TABLE_CLEANUP_RULES if cleanup_config.get(name, True)]
+
+
+def run_table_cleanup(df_table, cleanup_config=None, timer=None):
+    """
+    Runs the enabled cleanup rules on a table whose headers are already set.
+
+    :param cleanup_config: The section's "tableCleanup" config (see `get_enabled_rules`).
+    :param timer: Optional StageTimer that receives one stage per rule.
+    :return: The cleaned DataFrame.
+    """
+    timer = timer or StageTimer("table_cleanup")
+    for name, rule in get_enabled_rules(cleanup_config):
+        with timer.stage(name):
+            df_table = rule(df_table)
+    logger.info(f"Table cleanup timings ({timer.label}): {timer.summary()}")
+    return df_table
@@ -0,0 +1,117 @@
+"""
+Cell grid built from an Azure Form Recognizer table in a single pass over `table.cells`.
+
+The same pass fills the cell contents (row and column spans included), the column
+headers and the text scored by the financial keyword classifier, so the
+financial-table filter and the DataFrame construction do not scan the cells again.
+"""
+import numpy as np
+import pandas as pd
+from .logging_util import setup_logger
+from .financial_keywords import FINANCIAL_CLASSIFIER, FINANCIAL_TABLE_MIN_SCORE
+
+logger = setup_logger(__name__)
+
+
+class TableGrid:
+    """
+    Cell contents of one table plus the data collected while filling them.
+
+    Attributes:
+        cells (np.ndarray): rows x columns object array of cell contents. Rows
+                            without any cell are left out, the others keep their order.
+        headers (list): Column headers taken from the "columnHeader" cells (" " when missing).
+        financial_score (float): Summed weight of the financial keywords found in the cells.
+        financial_keywords (set): The financial keywords found in the cells.
+    """
+
+    def __init__(self, cells, headers, financial_score, financial_keywords):
+        self.cells = cells
+        self.headers = headers
+        self.financial_score = financial_score
+        self.financial_keywords = financial_keywords
+
+    @property
+    def shape(self):
+        return self.cells.shape
+
+    def is_financial(self, min_score=FINANCIAL_TABLE_MIN_SCORE):
+        """Determine if a table is a financial table based on keywords only."""
+        return self.financial_score >= min_score
+
+    def to_dataframe(self):
+        """Returns the cells as a DataFrame with default integer column labels."""
+        return pd.DataFrame(self.cells)
+
+
+def build_table_grid(table, classifier=FINANCIAL_CLASSIFIER):
+    """
+    Fills a TableGrid from `table.cells`.
+
+    Spanning cells repeat their content in every cell they span: the spanned columns
+    of their row and the same columns of the following `row_span - 1` rows. In the
+    first row the extra columns stay empty to keep the headers clean. A column-spanning
+    header cell names the last column it spans.
+
+    Args:
+        table: DocumentTable (or an object with the same attributes, camelCase accepted).
+        classifier (FinancialKeywordClassifier): Scores the cell text.
+
+    Returns:
+        TableGrid
+    """
+    max_columns = table.column_count
+    row_count = getattr(table, "row_count", None) or 0
+    cells = np.full((row_count, max_columns), "", dtype=object)
+    filled_rows = np.zeros(row_count, dtype=bool)
+    headers = [" "] * max_columns
+    texts = []
+
+    for cell in table.cells:
+        row_index = getattr(cell, "row_index", None)
+        if row_index is None:
+            row_index = getattr(cell, "rowIndex", None)
+        col_index = getattr(cell, "column_index", None)
+        if col_index is None:
+            col_index = getattr(cell, "columnIndex", None)
+        column_span = getattr(cell, "column_span", None) or getattr(cell, "columnSpan", 1)
+        row_span = getattr(cell, "row_span", None) or getattr(cell, "rowSpan", 1)
+
+        if row_index is None or col_index is None:
+            continue
+
+        if row_index >= len(filled_rows):
+            # row_count is missing or too small; grow the grid to fit
+            extra = row_index + 1 - len(filled_rows)
+            cells = np.vstack([cells, np.full((extra, max_columns), "", dtype=object)])
+            filled_rows = np.concatenate([filled_rows, np.zeros(extra, dtype=bool)])
+
+        content = cell.content
+        filled_rows[row_index] = True
+        span_end = min(col_index + column_span, max_columns)
+        if column_span > 1:
+            cells[row_index, col_index:span_end] = content if row_index != 0 else ""
+        cells[row_index, col_index] = content
+        if row_span > 1:
+            # Rows past the grid are not added; those rows have no cells of their own
+            cells[row_index + 1:row_index + row_span, col_index:span_end] = content
+
+        if getattr(cell, "kind", "") == "columnHeader":
+            header = content.strip() if isinstance(content, str) else ""
+            if column_span > 1:
+                target_index = col_index + column_span - 1
+                if target_index < max_columns:
+                    headers[target_index] = header
+            else:
+                headers[col_index] = header
+
+        if isinstance(content, str):
+            texts.append(content)
+
+    financial_score, financial_keywords = classifier.scan_texts(texts)
+    grid = TableGrid(cells[filled_rows], headers, financial_score, financial_keywords)
+    logger.info(
+        f"Table grid: {grid.shape[0]} rows x {grid.shape[1]} columns, headers: {headers}, "
+        f"financial score: {financial_score} {sorted(financial_keywords)}"
+    )
+    return grid
@@ -0,0 +1,38 @@
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations for the named stages of a unit of work
+    (e.g. one Azure chunk) so they can be logged or aggregated afterwards.
+    """
+
+    def __init__(self, label=""):
+        self.label = label
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Context manager that adds the elapsed time of the block to `name`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + (time.perf_counter() - start)
+
+    def total(self):
+        return sum(self.timings.values())
+
+    def as_dict(self):
+        """
+        Returns the recorded timings in milliseconds, rounded for logging/JSON.
+        """
+        return {name: round(seconds * 1000, 1) for name, seconds in self.timings.items()}
+
+    def summary(self):
+        parts = [f"{name}={ms}ms" for name, ms in self.as_dict().items()]
+        parts.append(f"total={round(self.total() * 1000, 1)}ms")
+        return ", ".join(parts)
@@ -0,0 +1,810 @@
+"""
+Micro-benchmarks for the extraction post-processing hot paths.
+
+Usage (from the backend folder):
+    python scripts/benchmarks.py                 # run every benchmark
+    python scripts/benchmarks.py consolidation   # run selected benchmarks
+"""
+import os
+import sys
+import time
+import argparse
+import random
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Make `modules` importable when run as a script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.services.excel_helper_modules import consolidation
+
+# The app's logging sends uncaught exceptions to app.log only; a failing benchmark should print its traceback
+sys.excepthook = sys.__excepthook__
+
+
+def timed(function, *args, repeat=3):
+    """
+    Returns (best wall time in seconds, result of the last call).
+    """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def print_table(title, header, rows):
+    print(f"\n{title}")
+    widths = [max(len(str(value)) for value in column) for column in zip(header, *rows)]
+    for line in [header] + rows:
+        print("  ".join(str(value).rjust(width) for value, width in zip(line, widths)))
+
+
+##############################################################
+################ Consolidation ###############################
+##############################################################
+def make_statement_frames(row_count, years=3, seed=7):
+    """
+    Builds `years` statement-like DataFrames that share most of their line items.
+    """
+    rng = random.Random(seed)
+    items = [f"Line item {i}" for i in range(int(row_count * 1.2))]
+    frames = []
+    for year in range(years):
+        keys = rng.sample(items, row_count)
+        frames.append(pd.DataFrame({
+            "Particulars": keys,
+            f"FY {2020 + year}": [rng.choice(["", f"{rng.randint(1, 99999):,}", np.nan]) for _ in keys],
+            "Note": [rng.choice(["", str(rng.randint(1, 30))]) for _ in keys],
+        }))
+    return frames
+
+
+def legacy_consolidate_rows(df, consolidated_df, first_column, seen_keys):
+    """
+    Row-by-row implementation replaced by RowConsolidator, kept here as the reference.
+    """
+    context_group = None
+    for _, row in df.iterrows():
+        key = row[first_column]
+        if pd.isna(row.drop(first_column).dropna().iloc[0]):
+            context_group = key
+        if key in consolidated_df[first_column].values:
+            idx_existing = consolidated_df[consolidated_df[first_column] == key].index[0]
+            for col in df.columns[1:]:
+                if pd.notna(row[col]) and (pd.isna(consolidated_df.at[idx_existing, col]) or consolidated_df.at[idx_existing, col] == ""):
+                    consolidated_df.at[idx_existing, col] = row[col]
+        else:
+            if context_group and key != context_group:
+                key = f"{context_group} | {key}"
+            unique_key = consolidation.add_unique_suffix(key, seen_keys)
+            row[first_column] = unique_key
+            new_row = {col: "" for col in consolidated_df.columns}
+            for col in row.index:
+                new_row[col] = row[col]
+            consolidated_df = pd.concat([consolidated_df, pd.DataFrame([new_row])], ignore_index=True)
+    return consolidated_df
+
+
+def legacy_consolidate_dataframes(dataframes):
+    first_column = consolidation.validate_and_standardize_first_column(dataframes)
+    all_columns, dataframes = consolidation.collect_and_apply_unique_columns(dataframes, first_column)
+    aligned_dataframes = consolidation.align_dataframes(dataframes, all_columns)
+    consolidated_df = pd.DataFrame(columns=all_columns)
+    seen_keys = {}
+    for df in aligned_dataframes:
+        consolidated_df = legacy_consolidate_rows(df, consolidated_df, first_column, seen_keys)
+    return consolidation.update_column_suffixes(consolidated_df, first_column).reset_index(drop=True)
+
+
+def benchmark_consolidation(sizes=(250, 500, 1000, 2000, 4000, 8000), legacy_max_rows=2000):
+    rows = []
+    for size in sizes:
+        frames = make_statement_frames(size)
+        new_time, new_df = timed(lambda: consolidation.consolidate_dataframes([f.copy() for f in frames]))
+        legacy_time, matches = "-", "-"
+        if size <= legacy_max_rows:
+            legacy_time, legacy_df = timed(lambda: legacy_consolidate_dataframes([f.copy() for f in frames]), repeat=1)
+            matches = new_df.astype(object).equals(legacy_df.astype(object))
+            legacy_time = f"{legacy_time:.3f}"
+        rows.append([size, len(new_df), f"{new_time:.3f}", f"{new_time / size * 1e6:.1f}", legacy_time, matches])
+    print_table(
+        "consolidate_dataframes (3 statements)",
+        ["rows/stmt", "out rows", "new s", "new us/row", "legacy s", "identical"],
+        rows
+    )
+
+
+def benchmark_workbook_consolidation(sizes=(250, 1000, 4000), files=3):
+    """
+    Combining the per-file workbooks: re-reading the written xlsx vs the sheets kept in memory.
+    """
+    from modules.services.excel_service import (
+        save_sections_to_excel_and_csv, consolidate_excel_sheets, consolidate_sheets_in_memory
+    )
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            excel_paths, sheet_sets = [], []
+            for index, frame in enumerate(make_statement_frames(size, years=files)):
+                saved = save_sections_to_excel_and_csv(
+                    {"Balance Sheet": {"raw_tables": [frame.fillna("")]}}, f"file_{size}_{index}.pdf", folder
+                )
+                excel_paths.append(saved["excel_path"])
+                sheet_sets.append(saved["sheets"])
+            reread_path = os.path.join(folder, f"reread_{size}.xlsx")
+            memory_path = os.path.join(folder, f"memory_{size}.xlsx")
+            reread_time, _ = timed(consolidate_excel_sheets, excel_paths, reread_path, repeat=1)
+            memory_time, _ = timed(consolidate_sheets_in_memory, sheet_sets, memory_path, repeat=1)
+            matches = pd.read_excel(reread_path, None)["Balance Sheet"].equals(pd.read_excel(memory_path, None)["Balance Sheet"])
+            rows.append([size, f"{reread_time:.3f}", f"{memory_time:.3f}", f"{reread_time / memory_time:.1f}x", matches])
+    print_table(
+        f"combined workbook from {files} files",
+        ["rows/file", "re-read s", "in-memory s", "speedup", "identical"],
+        rows
+    )
+
+
+##############################################################
+################ Excel writing ###############################
+##############################################################
+def legacy_write_sheet(path, df, max_column_width=50):
+    """
+    openpyxl to_excel followed by the per-cell beautify_excel loops that write_sheet replaced.
+    """
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        df.to_excel(writer, sheet_name="Sheet", index=False, header=True)
+        worksheet = writer.sheets["Sheet"]
+        for row in worksheet.iter_rows(min_row=1, max_row=1):
+            for cell in row:
+                cell.font = Font(bold=True, color="FFFFFF")
+                cell.fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+                cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+        for col_idx, column_cells in enumerate(worksheet.columns, start=1):
+            max_length = max(len(str(cell.value)) if cell.value is not None else 0 for cell in column_cells)
+            worksheet.column_dimensions[get_column_letter(col_idx)].width = min(max_length + 2, max_column_width)
+            for cell in column_cells:
+                if cell.value:
+                    cell.alignment = Alignment(wrap_text=True)
+
+
+def benchmark_excel_writer(sizes=(1000, 10000, 50000)):
+    from modules.services.excel_helper_modules.excel_writer import open_workbook, write_sheet
+
+    def write_with(engine, path, df):
+        with open_workbook(path, engine) as writer:
+            write_sheet(writer, df, "Sheet")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            statement = make_statement_frames(size, years=1)[0]
+            df = pd.concat([statement] + [statement.iloc[:, 1:].add_suffix(f" {i}") for i in range(3)], axis=1)
+            legacy_time, _ = timed(legacy_write_sheet, os.path.join(folder, "legacy.xlsx"), df, repeat=1)
+            openpyxl_time, _ = timed(write_with, "openpyxl", os.path.join(folder, "openpyxl.xlsx"), df, repeat=1)
+            xlsxwriter_time, _ = timed(write_with, "xlsxwriter", os.path.join(folder, "xlsxwriter.xlsx"), df, repeat=1)
+            matches = all(
+                pd.read_excel(os.path.join(folder, "legacy.xlsx")).equals(pd.read_excel(os.path.join(folder, name)))
+                for name in ("openpyxl.xlsx", "xlsxwriter.xlsx")
+            )
+            rows.append([size, df.shape[1], f"{legacy_time:.3f}", f"{openpyxl_time:.3f}", f"{xlsxwriter_time:.3f}", matches])
+    print_table(
+        "write one styled sheet",
+        ["rows", "cols", "legacy s", "openpyxl s", "xlsxwriter s", "identical"],
+        rows
+    )
+
+
+##############################################################
+################ Numeric normalization #######################
+##############################################################
+def make_wide_financial_table(rows, columns, seed=11):
+    rng = random.Random(seed)
+
+    def amount():
+        value = f"{rng.randint(1, 9999999):,}"
+        return rng.choice([value, f"({value})", "-", "", f"\u20b9 {value}", f"{value}.{rng.randint(0, 99):02d}"])
+
+    # A year row and a Notes column ("3.1" and "3.10" are different notes), both kept as text
+    table = {"Particulars": ["Year"] + [f"Line item {i}" for i in range(1, rows)]}
+    table["Notes"] = [""] + [f"{rng.randint(1, 30)}.{rng.randint(1, 12)}" for _ in range(1, rows)]
+    for year in range(columns - 1):
+        table[f"FY {1990 + year}"] = [str(1990 + year)] + [amount() for _ in range(1, rows)]
+    return pd.DataFrame(table)
+
+
+def legacy_convert_parentheses_to_negative(df):
+    """
+    The applymap implementation replaced by normalize_numeric_columns.
+    """
+    def format_number_with_commas(number):
+        if isinstance(number, float) and number.is_integer():
+            return "{:,}".format(int(number))
+        elif isinstance(number, float):
+            return "{:,.2f}".format(number)
+        return "{:,}".format(number)
+
+    def safe_convert(value):
+        if isinstance(value, str) and value.startswith('(') and value.endswith(')'):
+            try:
+                return format_number_with_commas(-float(value.replace(',', '').strip('()')))
+            except ValueError:
+                return value
+        elif isinstance(value, (int, float)):
+            return format_number_with_commas(value)
+        return value
+
+    return df.applymap(safe_convert)
+
+
+def benchmark_numeric_normalization(shapes=((1000, 10), (5000, 40), (20000, 40))):
+    from modules.services.excel_helper_modules.data_processing import normalize_numeric_columns, parse_amount
+    rows = []
+    for row_count, column_count in shapes:
+        df = make_wide_financial_table(row_count, column_count)
+        legacy_time, _ = timed(legacy_convert_parentheses_to_negative, df)
+        applymap_time, _ = timed(lambda: df.iloc[:, 1:].applymap(parse_amount))
+        new_time, normalized = timed(normalize_numeric_columns, df)
+        cells = row_count * column_count
+        numbers = normalized.iloc[:, 1:].applymap(lambda value: isinstance(value, (int, float)) and value == value)
+        text_kept = (normalized["Notes"] == df["Notes"]).all() and (normalized.iloc[0] == df.iloc[0]).all()
+        rows.append([
+            f"{row_count}x{column_count + 1}", f"{legacy_time:.3f}", f"{applymap_time:.3f}", f"{new_time:.3f}",
+            f"{new_time / cells * 1e9:.0f}", f"{int(numbers.values.sum())}/{cells}", text_kept
+        ])
+    print_table(
+        "amount parsing (legacy only rewrites parentheses, as text; applymap = same rules per cell)",
+        ["shape", "legacy s", "applymap s", "new s", "new ns/cell", "numeric cells", "notes/years kept"],
+        rows
+    )
+
+
+##############################################################
+################ Related-row consolidation ###################
+##############################################################
+def make_table_with_repeated_names(rows, columns=6, repeat_share=0.3, seed=5):
+    """
+    A statement table where ~repeat_share of the rows repeat an earlier name in a different case.
+    """
+    rng = random.Random(seed)
+    names = []
+    for i in range(rows):
+        if names and rng.random() < repeat_share:
+            names.append(rng.choice(names).upper())
+        else:
+            names.append(f"Line item {i} (ii)")
+    table = {"Particulars": names}
+    for column in range(columns):
+        table[f"FY {2015 + column}"] = [rng.choice([np.nan, "", str(rng.randint(1, 999))]) for _ in names]
+    return pd.DataFrame(table)
+
+
+def legacy_consolidate_related_rows_with_order(df):
+    """
+    The per-name re-filtering implementation replaced by the single-pass grouping.
+    """
+    from modules.services.excel_helper_modules.sanitization import sanitize_text, drop_nan_text_columns
+    first_column = df.columns[0]
+    df[first_column] = df[first_column].astype(str).apply(sanitize_text)
+    df["_temp_lowercase_key"] = df[first_column].str.lower()
+    consolidated_rows = []
+    for lowercase_name in df["_temp_lowercase_key"].drop_duplicates().tolist():
+        group = df[df["_temp_lowercase_key"] == lowercase_name].drop(columns=["_temp_lowercase_key"])
+        consolidated_row = {first_column: group[first_column].iloc[0]}
+        for col in list(group.columns)[1:]:
+            unique_values = group[col].dropna().unique()
+            if len(unique_values) > 1:
+                for i, value in enumerate(unique_values):
+                    consolidated_row[f"{col} ({i + 1})" if i > 0 else col] = value
+            else:
+                consolidated_row[col] = unique_values[0] if unique_values.size > 0 else ""
+        consolidated_rows.append(consolidated_row)
+    return drop_nan_text_columns(pd.DataFrame(consolidated_rows))
+
+
+def benchmark_related_rows(sizes=(200, 1000, 5000)):
+    from modules.services.excel_helper_modules.sanitization import consolidate_related_rows_with_order
+    rows = []
+    for size in sizes:
+        table = make_table_with_repeated_names(size)
+        legacy_time, legacy_df = timed(lambda: legacy_consolidate_related_rows_with_order(table.copy()), repeat=1)
+        new_time, new_df = timed(lambda: consolidate_related_rows_with_order(table.copy()))
+        rows.append([size, len(new_df), f"{legacy_time:.3f}", f"{new_time:.3f}", new_df.equals(legacy_df)])
+    print_table(
+        "consolidate_related_rows_with_order (30% repeated names)",
+        ["rows", "out rows", "legacy s", "new s", "identical"],
+        rows
+    )
+
+
+##############################################################
+################ Row filtering ###############################
+##############################################################
+def legacy_remove_rows(df, identity_to_remove_row):
+    """
+    The per-row df.apply implementation replaced by the per-column matcher.
+    """
+    identity_to_remove_row = {identifier.strip().lower() for identifier in identity_to_remove_row if identifier.strip()}
+
+    def row_contains_identifier(row):
+        normalized_row = row.astype(str).str.strip().str.lower()
+        return any(value in identity_to_remove_row for value in normalized_row)
+
+    return df[~df.apply(row_contains_identifier, axis=1)]
+
+
+def benchmark_row_filtering(sizes=(1000, 10000, 50000), identifier_count=200):
+    from modules.services.excel_helper_modules.data_processing import remove_rows
+    rows = []
+    for size in sizes:
+        table = make_wide_financial_table(size, 8)
+        identifiers = [f"line item {i}" for i in range(0, size, max(1, size // identifier_count))]
+        legacy_time, legacy_df = timed(legacy_remove_rows, table, identifiers, repeat=1)
+        new_time, new_df = timed(remove_rows, table, identifiers)
+        prefix_time, _ = timed(remove_rows, table, ["line item 1"], "prefix")
+        rows.append([size, len(identifiers), f"{legacy_time:.3f}", f"{new_time:.3f}", f"{prefix_time:.3f}", new_df.equals(legacy_df)])
+    print_table(
+        "remove_rows (9 columns)",
+        ["rows", "identifiers", "legacy s", "exact s", "prefix s", "identical"],
+        rows
+    )
+
+
+##############################################################
+################ Table cleanup ###############################
+##############################################################
+def make_extracted_table(rows, seed=13):
+    """
+    A table as process_table sees it: string cells, a numbered first column and year headers.
+    """
+    rng = random.Random(seed)
+    numerals = ["I", "II", "III", "IV", "V", "1", "2", "(a)", ""]
+    return pd.DataFrame(
+        [[rng.choice(numerals), f"Line item {i}", f"{rng.randint(1, 99999):,}", f"{rng.randint(1, 99999):,}", ""]
+         for i in range(rows)],
+        columns=[" ", "Particulars", "31 March 2024", "31 March 2023", "Note"]
+    )
+
+
+def benchmark_table_cleanup(sizes=(50, 500, 5000)):
+    from modules.table_cleanup import run_table_cleanup
+    from modules.timing_util import StageTimer
+    rows = []
+    for size in sizes:
+        table = make_extracted_table(size)
+        timer = StageTimer(f"{size} rows")
+        run_table_cleanup(table.copy(), timer=timer)
+        rows.extend([size, name, ms] for name, ms in timer.as_dict().items())
+        rows.append([size, "total", round(timer.total() * 1000, 1)])
+    print_table("run_table_cleanup per rule", ["rows", "rule", "ms"], rows)
+
+
+##############################################################
+################ Table grid ##################################
+##############################################################
+def make_azure_table(rows, columns, seed=17):
+    """
+    A stand-in for DocumentTable: header row with spanning cells, then body cells.
+    """
+    from types import SimpleNamespace
+    rng = random.Random(seed)
+    words = ["Revenue from operations", "Other income", "Total expenses", "Profit before tax", "12,345", "(1,234)", ""]
+    cells = []
+    for row_index in range(rows):
+        col_index = 0
+        while col_index < columns:
+            span = rng.choice([1, 1, 1, 2]) if row_index == 0 else 1
+            cells.append(SimpleNamespace(
+                row_index=row_index, column_index=col_index, column_span=span,
+                kind="columnHeader" if row_index == 0 else "content", content=rng.choice(words)
+            ))
+            col_index += span
+    return SimpleNamespace(row_count=rows, column_count=columns, cells=cells)
+
+
+def legacy_table_frame(table, keywords):
+    """
+    extract_structured_rows + is_financial_table + extract_headers, each scanning the cells.
+    """
+    structured_rows = {}
+    for cell in table.cells:
+        row = structured_rows.setdefault(cell.row_index, [""] * table.column_count)
+        row[cell.column_index] = cell.content
+        for span_offset in range(1, cell.column_span):
+            if cell.column_index + span_offset < table.column_count:
+                row[cell.column_index + span_offset] = cell.content if cell.row_index != 0 else ""
+    rows = [structured_rows[row] for row in sorted(structured_rows)]
+    text = " ".join(" ".join(row).lower() for row in rows)
+    is_financial = sum(keyword in text for keyword in keywords) >= 3
+    headers = [" "] * table.column_count
+    for cell in table.cells:
+        if cell.kind == "columnHeader":
+            headers[cell.column_index + cell.column_span - 1] = cell.content.strip()
+    df = pd.DataFrame(rows)
+    df.columns = headers
+    return is_financial, df
+
+
+def benchmark_table_grid(shapes=((20, 5), (200, 8), (2000, 8))):
+    from modules.table_grid import build_table_grid
+    from modules.financial_keywords import DEFAULT_FINANCIAL_LEXICON
+    rows = []
+    for row_count, columns in shapes:
+        table = make_azure_table(row_count, columns)
+        legacy_time, (legacy_financial, legacy_df) = timed(legacy_table_frame, table, list(DEFAULT_FINANCIAL_LEXICON))
+
+        def build_frame():
+            grid = build_table_grid(table)
+            df = grid.to_dataframe()
+            df.columns = grid.headers
+            return grid.is_financial(), df
+
+        new_time, (financial, df) = timed(build_frame)
+        rows.append([
+            f"{row_count}x{columns}", len(table.cells), f"{legacy_time * 1000:.1f}", f"{new_time * 1000:.1f}",
+            financial == legacy_financial and df.equals(legacy_df)
+        ])
+    print_table(
+        "table grid (cells -> financial filter + DataFrame)",
+        ["shape", "cells", "legacy ms", "grid ms", "identical"],
+        rows
+    )
+
+
+##############################################################
+################ Financial keywords ##########################
+##############################################################
+def legacy_keyword_scores(rows, first_column, keywords):
+    """
+    is_financial_table (keyword `in` the joined rows) and count_financial_keywords
+    (alternation regex per value), as they were before the shared classifier.
+    """
+    import re
+    text = " ".join(" ".join(row).lower() for row in rows)
+    table_hits = sum(keyword in text for keyword in keywords)
+    pattern = re.compile("|".join(keywords), re.IGNORECASE)
+    column_ratio = sum(bool(pattern.search(value)) for value in first_column) / len(first_column)
+    return table_hits, column_ratio
+
+
+def benchmark_financial_keywords(sizes=(100, 1000, 10000), extra_keywords=(0, 500)):
+    from modules.financial_keywords import FinancialKeywordClassifier, DEFAULT_FINANCIAL_LEXICON
+    rows = []
+    for extra in extra_keywords:
+        lexicon = dict(DEFAULT_FINANCIAL_LEXICON)
+        # Stand-ins for a larger multilingual lexicon: terms that never match the sample text
+        lexicon.update({f"term{index}q": {"weight": 1.0} for index in range(extra)})
+        keywords = list(lexicon)
+        classifier = FinancialKeywordClassifier(lexicon)
+        for size in sizes:
+            table = make_wide_financial_table(size, 6).astype(str)
+            table_rows = table.values.tolist()
+            first_column = table.iloc[:, 0].tolist()
+            legacy_time, (legacy_hits, legacy_ratio) = timed(legacy_keyword_scores, table_rows, first_column, keywords)
+
+            def classify():
+                score, found = classifier.scan_texts(value for row in table_rows for value in row)
+                return len(found), classifier.column_ratio(first_column)
+
+            new_time, (hits, ratio) = timed(classify)
+            rows.append([
+                len(keywords), size, f"{legacy_time * 1000:.1f}", f"{new_time * 1000:.1f}",
+                hits == legacy_hits and abs(ratio - legacy_ratio) < 1e-9
+            ])
+    print_table(
+        "financial keyword scoring (table score + first-column ratio)",
+        ["keywords", "rows", "legacy ms", "automaton ms", "identical"],
+        rows
+    )
+
+
+##############################################################
+################ Logging #####################################
+##############################################################
+def benchmark_logging(sizes=(100, 1000, 10000), calls=20):
+    """
+    Cost of logging a table: an eager f-string vs a lazy payload, with INFO on and off.
+    """
+    import logging
+    from modules.logging_util import lazy
+    logger = logging.getLogger("benchmarks.logging")
+    logger.propagate = False
+    logger.addHandler(logging.StreamHandler(open(os.devnull, "w")))
+    rows = []
+    for size in sizes:
+        table = make_wide_financial_table(size, 6)
+        timings = []
+        for level in (logging.INFO, logging.WARNING):
+            logger.setLevel(level)
+            eager_time, _ = timed(lambda: [logger.info(f"Final cleaned table data: {table}") for _ in range(calls)])
+            lazy_time, _ = timed(lambda: [logger.info("Final cleaned table data: %s", lazy(table)) for _ in range(calls)])
+            timings += [f"{eager_time / calls * 1000:.2f}", f"{lazy_time / calls * 1000:.2f}"]
+        rows.append([size] + timings)
+    print_table(
+        "logging a table (ms per call)",
+        ["rows", "INFO eager", "INFO lazy", "WARNING eager", "WARNING lazy"],
+        rows
+    )
+
+
+##############################################################
+################ Extraction scheduler ########################
+##############################################################
+def benchmark_scheduler(large_files=(8, 32), chunks_per_file=4, chunk_seconds=0.01):
+    """
+    Latency of a one-file request queued behind a large batch of another company:
+    one shared FIFO pool vs the round-robin extraction scheduler.
+    Chunk analyses are simulated with sleeps.
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from modules.extraction_scheduler import ExtractionScheduler, FILE_LANE, CHUNK_LANE
+
+    def analyze(_):
+        time.sleep(chunk_seconds)
+
+    def small_request_latency(run_request, file_count):
+        started = threading.Event()
+        large = threading.Thread(target=lambda: (started.set(), run_request("company:large", file_count)))
+        large.start()
+        started.wait()
+        time.sleep(chunk_seconds)  # let the large batch fill the queues first
+        begin = time.perf_counter()
+        run_request("company:small", 1)
+        latency = time.perf_counter() - begin
+        large.join()
+        return latency
+
+    rows = []
+    for file_count in large_files:
+        with ThreadPoolExecutor(max_workers=2) as file_pool, ThreadPoolExecutor(max_workers=2) as chunk_pool:
+            def fifo_file(_):
+                list(chunk_pool.map(analyze, range(chunks_per_file)))
+
+            def fifo_request(_, count):
+                list(file_pool.map(fifo_file, range(count)))
+
+            fifo_latency = small_request_latency(fifo_request, file_count)
+
+        scheduler = ExtractionScheduler(file_workers=2, chunk_workers=2)
+
+        def scheduled_file(_):
+            scheduler.map_in_order(CHUNK_LANE, analyze, range(chunks_per_file), chunks_per_file)
+
+        def scheduled_request(tenant, count):
+            scheduler.map_in_order(FILE_LANE, scheduled_file, range(count), 2, tenant=tenant)
+
+        scheduled_latency = small_request_latency(scheduled_request, file_count)
+        rows.append([file_count, f"{fifo_latency * 1000:.0f}", f"{scheduled_latency * 1000:.0f}"])
+    print_table(
+        "one-file request behind a large batch (ms until done)",
+        ["large batch files", "shared FIFO pool", "scheduler"],
+        rows
+    )
+
+
+##############################################################
+################ Azure rate limiter ##########################
+##############################################################
+class SimulatedQuota:
+    """
+    Sliding one-second window quota answering 429 with a Retry-After above `tps` submissions.
+    """
+
+    def __init__(self, tps):
+        import threading
+        from collections import deque
+        self.tps = tps
+        self.lock = threading.Lock()
+        self.accepted = deque()
+        self.throttled = 0
+
+    def submit(self):
+        from azure.core.exceptions import HttpResponseError
+        with self.lock:
+            now = time.monotonic()
+            while self.accepted and now - self.accepted[0] >= 1:
+                self.accepted.popleft()
+            if len(self.accepted) < self.tps:
+                self.accepted.append(now)
+                return True
+            self.throttled += 1
+            retry_after = 1 - (now - self.accepted[0])
+
+        class ThrottledResponse:
+            status_code = 429
+            reason = "Too Many Requests"
+            headers = {"Retry-After": f"{retry_after:.3f}"}
+
+            def text(self):
+                return ""
+
+        raise HttpResponseError(message="throttled", response=ThrottledResponse())
+
+
+def benchmark_rate_limiter(tps=10, workers=16, submissions=60):
+    """
+    Submissions against a simulated quota: workers retrying 429s on their own
+    (as the SDK retry policy did) vs the shared adaptive token bucket.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from azure.core.exceptions import HttpResponseError
+    from modules.azure_rate_limiter import AzureRateLimiter, InMemoryTokenBucket, parse_retry_after
+
+    def unpaced(quota):
+        def submit(_):
+            for _attempt in range(4):
+                try:
+                    return quota.submit()
+                except HttpResponseError as e:
+                    time.sleep(parse_retry_after(e.response.headers))
+            return False
+        return submit
+
+    def paced(quota):
+        limiter = AzureRateLimiter(InMemoryTokenBucket(), max_rate=tps)
+
+        def submit(_):
+            try:
+                return limiter.run(quota.submit)
+            except HttpResponseError:
+                return False
+        return submit
+
+    rows = []
+    for name, make_submit in (("own retries", unpaced), ("shared token bucket", paced)):
+        quota = SimulatedQuota(tps)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            accepted = sum(pool.map(make_submit(quota), range(submissions)))
+        elapsed = time.perf_counter() - started
+        rows.append([name, accepted, submissions - accepted, quota.throttled, f"{elapsed:.2f}", f"{accepted / elapsed:.1f}"])
+    print_table(
+        f"{submissions} submissions from {workers} workers against a {tps}/s quota",
+        ["pacing", "accepted", "dropped", "429s", "seconds", "accepted/s"],
+        rows
+    )
+
+
+##############################################################
+################ Chunk planning ##############################
+##############################################################
+def make_sectioned_pdf(path, pages, scanned_every=4):
+    """
+    Writes a PDF of text pages with a page lacking a text layer (a "scan") every `scanned_every` pages.
+    """
+    import fitz  # PyMuPDF
+    with fitz.open() as document:
+        for page_number in range(1, pages + 1):
+            page = document.new_page()
+            if page_number % scanned_every:
+                page.insert_text((72, 72), f"Statement of profit and loss, page {page_number}\n" * 30)
+        document.save(path)
+
+
+def benchmark_chunk_planner(page_counts=(10, 40, 200), section_pages=3):
+    """
+    Analyze requests per file: fixed two-page chunks per section vs the size-aware chunk plan,
+    for files split into sections of `section_pages` pages (prebuilt-document).
+    """
+    from modules.chunk_planner import plan_chunks
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for page_count in page_counts:
+            path = os.path.join(folder, f"sections_{page_count}.pdf")
+            make_sectioned_pdf(path, page_count)
+            pages = list(range(1, page_count + 1))
+            sections = [(f"section {index}", pages[index:index + section_pages]) for index in range(0, page_count, section_pages)]
+            fixed_calls = sum(-(-len(section) // 2) for _, section in sections)
+            plan_time, plan = timed(plan_chunks, path, sections, "prebuilt-document")
+            summary = plan.summary()
+            rows.append([
+                page_count, len(sections), fixed_calls, summary["expected_calls"], summary["merged_chunks"],
+                f"{summary['largest_chunk_bytes'] / 1024:.0f}", f"{plan_time * 1000:.1f}"
+            ])
+    print_table(
+        "analyze requests per file",
+        ["pages", "sections", "fixed 2-page calls", "planned calls", "merged", "largest chunk KB", "plan ms"],
+        rows
+    )
+
+
+def benchmark_analysis_source(page_counts=(10, 40), section_pages=3):
+    """
+    Request preparation per file: chunk PDFs built and uploaded with every request vs
+    server-side page selection on the stored source (plan and page ranges only).
+    """
+    from modules.chunk_planner import plan_chunks
+    from modules.chunk_builder import build_chunk_document
+    from modules.analysis_source import format_page_ranges
+
+    def chunk_pdfs(path, sections):
+        plan = plan_chunks(path, sections, "prebuilt-document")
+        return sum(len(build_chunk_document(path, chunk.pages, text_pages=chunk.text_pages)[0]) for chunk in plan.chunks)
+
+    def page_selection(path, sections):
+        plan = plan_chunks(path, sections, "prebuilt-document", max_bytes=None)
+        return [format_page_ranges(chunk.pages) for chunk in plan.chunks]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for page_count in page_counts:
+            path = os.path.join(folder, f"source_{page_count}.pdf")
+            make_sectioned_pdf(path, page_count)
+            pages = list(range(1, page_count + 1))
+            sections = [(f"section {index}", pages[index:index + section_pages]) for index in range(0, page_count, section_pages)]
+            chunk_time, chunk_bytes = timed(chunk_pdfs, path, sections, repeat=1)
+            selection_time, _ = timed(page_selection, path, sections)
+            rows.append([page_count, f"{chunk_time * 1000:.0f}", f"{chunk_bytes / 1024:.0f}", f"{selection_time * 1000:.1f}", 0])
+    print_table(
+        "request preparation per file",
+        ["pages", "chunk PDFs ms", "chunk PDF KB sent", "page selection ms", "page selection KB sent"],
+        rows
+    )
+
+
+def benchmark_page_dedup(page_counts=(12, 48), section_pages=4, overlap=2):
+    """
+    Pages analyzed and charged per file when consecutive sections of `section_pages` pages
+    overlap by `overlap` pages (e.g. "Balance Sheet" 5-8 and "Notes" 7-10): one copy per
+    section reference vs each physical page once.
+    """
+    from modules.chunk_planner import plan_chunks
+    from modules.services.page_service import calculate_file_pages_to_process
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for page_count in page_counts:
+            path = os.path.join(folder, f"overlap_{page_count}.pdf")
+            make_sectioned_pdf(path, page_count)
+            step = section_pages - overlap
+            sections = [
+                (f"section {start}", list(range(start, min(page_count, start + section_pages - 1) + 1)))
+                for start in range(1, page_count - overlap + 1, step)
+            ]
+            file_config = {section: {"pageRange": ",".join(map(str, pages))} for section, pages in sections}
+            referenced = sum(len(pages) for _, pages in sections)
+            plan_time, plan = timed(plan_chunks, path, sections, "prebuilt-document")
+            summary = plan.summary()
+            rows.append([
+                page_count, len(sections), referenced, summary["pages"], summary["expected_calls"],
+                calculate_file_pages_to_process(file_config, page_count), f"{plan_time * 1000:.1f}"
+            ])
+    print_table(
+        "pages per file with overlapping sections",
+        ["pages", "sections", "section pages", "analyzed pages", "calls", "charged pages", "plan ms"],
+        rows
+    )
+
+
+BENCHMARKS = {
+    "consolidation": benchmark_consolidation,
+    "workbooks": benchmark_workbook_consolidation,
+    "writer": benchmark_excel_writer,
+    "numeric": benchmark_numeric_normalization,
+    "related_rows": benchmark_related_rows,
+    "row_filtering": benchmark_row_filtering,
+    "table_cleanup": benchmark_table_cleanup,
+    "table_grid": benchmark_table_grid,
+    "financial_keywords": benchmark_financial_keywords,
+    "logging": benchmark_logging,
+    "scheduler": benchmark_scheduler,
+    "rate_limiter": benchmark_rate_limiter,
+    "chunk_planner": benchmark_chunk_planner,
+    "analysis_source": benchmark_analysis_source,
+    "page_dedup": benchmark_page_dedup,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run post-processing micro-benchmarks.")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all). Available: {', '.join(BENCHMARKS)}")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -76,26 +76,6 @@ const App = () => {
         setSnackbarOpen(false);
     };
 
-    // Simulate progress update
-    useEffect(() => {
-        if (loading) {
-            const interval = setInterval(() => {
-                axios
-                    .get('/progress')
-                    .then((response) => {
-                        setProgress(response.data.progress);
-                        if (response.data.progress >= 100) {
-                            clearInterval(interval);
-                        }
-                    })
-                    .catch((error) => {
-                        console.error('Error fetching progress:', error);
-                    });
-            }, 5000);
-            return () => clearInterval(interval);
-        }
-    }, [loading]);
-
     // Fetch available extraction models
     useEffect(() => {
         axios.get('/extraction-models')
@@ -170,26 +150,75 @@ const App = () => {
             page_config: pageConfig,
         };
 
+        const handleExtractionResult = (result) => {
+            console.log('Data extracted successfully:', result);
+            setExtractedData(result);
+            setOriginalLines(result.lines_data || {});
+            // Check for failed files in response
+            if (result.failed_files && result.failed_files.length > 0) {
+                setFailedFiles(result.failed_files);
+            } 
+            showToast('Data extracted successfully.', 'success');
+            setMessage('Data extracted successfully.');
+        };
+
+        const handleExtractionError = (errorMessage) => {
+            console.error('Error extracting data:', errorMessage);
+            setMessage(errorMessage || 'An unexpected error occurred.');
+            setLoading(false);
+        };
+
+        // Extraction runs as a background job: poll its status until it finishes
+        const pollJob = (jobId) => {
+            axios
+                .get(`/jobs/${jobId}`)
+                .then((response) => {
+                    const job = response.data;
+                    if (job.status === 'completed') {
+                        handleExtractionResult(job.result);
+                        setLoading(false);
+                    } else if (job.status === 'failed') {
+                        handleExtractionError(job.error || job.result?.message);
+                    } else {
+                        // Progress of this job; /progress would follow the user's latest job
+                        setProgress(job.progress || 0);
+                        setTimeout(() => pollJob(jobId), 3000);
+                    }
+                })
+                .catch((error) => {
+                    handleExtractionError(error.response?.data?.message);
+                });
+        };
+
+        // Progress is pushed over Server-Sent Events; fall back to polling if the stream is unavailable
+        const watchJob = (jobId, eventsUrl) => {
+            if (typeof EventSource === 'undefined' || !eventsUrl) {
+                pollJob(jobId);
+                return;
+            }
+            // The events URL carries a short-lived token for this job only, never the session JWT
+            const source = new EventSource(eventsUrl);
+            source.addEventListener('progress', (event) => {
+                const update = JSON.parse(event.data);
+                setProgress(update.progress || 0);
+                if (update.stage === 'completed' || update.stage === 'failed') {
+                    source.close();
+                    pollJob(jobId);
+                }
+            });
+            source.onerror = () => {
+                source.close();
+                pollJob(jobId);
+            };
+        };
+
         axios
             .post('/extract', data)
             .then((response) => {
-                console.log('Data extracted successfully:', response.data);
-                setExtractedData(response.data);
-                setOriginalLines(response.data.lines_data || {});
-                // Check for failed files in response
-                if (response.data.failed_files && response.data.failed_files.length > 0) {
-                    setFailedFiles(response.data.failed_files);
-                } 
-                showToast('Data extracted successfully.', 'success');
-                setMessage('Data extracted successfully.');
+                watchJob(response.data.job_id, response.data.events_url);
             })
             .catch((error) => {
-                console.error('Error extracting data:', error);
-                const errorMessage = error.response?.data?.message || 'An unexpected error occurred.';
-                setMessage(errorMessage);
-            })
-            .finally(() => {
-                setLoading(false);
+                handleExtractionError(error.response?.data?.message);
             });
     };
 